@@ -1,25 +1,415 @@
+import atexit
+import itertools
 import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+def record_factory(cls):
+    """
+    sqlite3 row factory that builds `cls` records by column name via
+    cls.from_row(row, columns), so listings survive added columns.
+    """
+    cache = [None, None]  # (cursor.description, column names)
+
+    def factory(cursor, row):
+        if cache[0] is not cursor.description:
+            cache[0] = cursor.description
+            cache[1] = tuple(d[0] for d in cursor.description)
+        return cls.from_row(row, cache[1])
+    return factory
+
+class ConnectionPool:
+    """
+    Hands out one sqlite3 connection per thread, with at most `max_size`
+    connections checked out at once. Connections are opened in WAL mode so
+    readers don't block on the writer.
+    """
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",
+        "PRAGMA synchronous = NORMAL",   # safe with WAL, one fsync per checkpoint
+        "PRAGMA cache_size = -20000",    # ~20 MB page cache per connection
+        "PRAGMA temp_store = MEMORY",
+    )
+    _memory_ids = itertools.count(1)
+
+    def __init__(self, db_name, max_size=8, timeout=30.0, busy_timeout_ms=5000):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self._uri = False
+        if db_name == ":memory:":
+            # a private in-memory DB per connection would be useless to a pool
+            self.db_name = f"file:library_mem_{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._uri = True
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._idle = []
+        self._all = []
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False, uri=self._uri)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def current(self):
+        """The connection checked out by the calling thread, or None."""
+        return getattr(self._local, "conn", None)
+
+    def acquire(self):
+        conn = self.current()
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection free after {self.timeout}s")
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._open()
+                with self._lock:
+                    self._all.append(conn)
+        except Exception:
+            self._slots.release()
+            raise
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self):
+        conn = self.current()
+        if conn is None:
+            return
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        if conn.in_transaction:
+            conn.rollback()  # never hand uncommitted work to another thread
+        self._local.conn = None
+        with self._lock:
+            self._idle.append(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release()
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._idle.clear()
+        self._local = threading.local()
+
+
+class QueryStats:
+    """
+    Per-statement call counts, latency percentiles and row counts, keyed by
+    normalized SQL, plus an optional slow-query log with query plans.
+    """
+    def __init__(self, slow_query_ms=None, slow_log_path="slow_queries.log", max_samples=10000):
+        # imported here so uninstrumented startups don't pay for them
+        import random
+        import re
+        self._randrange = random.randrange
+        self._literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+        self.slow_query_ms = slow_query_ms
+        self.slow_log_path = slow_log_path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._normalized = {}
+        self._entries = {}  # sql -> [calls, total_ms, rows, samples]
+
+    def normalize(self, query):
+        sql = self._normalized.get(query)
+        if sql is None:
+            sql = self._literals.sub("?", " ".join(query.split()))
+            self._normalized[query] = sql
+        return sql
+
+    def record(self, conn, query, params, elapsed, rows):
+        sql = self.normalize(query)
+        ms = elapsed * 1000
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is None:
+                entry = self._entries[sql] = [0, 0.0, 0, []]
+            entry[0] += 1
+            entry[1] += ms
+            entry[2] += max(rows, 0)
+            samples = entry[3]
+            if len(samples) < self.max_samples:
+                samples.append(ms)
+            else:
+                # reservoir sampling keeps percentiles honest on long runs
+                i = self._randrange(entry[0])
+                if i < self.max_samples:
+                    samples[i] = ms
+        if self.slow_query_ms is not None and ms >= self.slow_query_ms:
+            self._log_slow(conn, query, sql, params, ms)
+
+    def _log_slow(self, conn, query, sql, params, ms):
+        from datetime import datetime
+        plan = []
+        if params is not None:  # None: executemany batch
+            try:
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+            except sqlite3.Error:
+                pass  # DDL, PRAGMA, BEGIN... have no plan
+        shown = "<executemany batch>" if params is None else params
+        lines = [f"{datetime.now().isoformat(timespec='seconds')} {ms:.2f} ms: {sql}",
+                 f"    params: {shown}"]
+        lines += [f"    plan: {p}" for p in plan]
+        with self._lock, open(self.slow_log_path, "a", encoding="utf-8") as log:
+            log.write("\n".join(lines) + "\n")
+
+    @staticmethod
+    def _percentile(sorted_samples, pct):
+        if not sorted_samples:
+            return 0.0
+        idx = min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))
+        return sorted_samples[idx]
+
+    def summary(self):
+        """List of dicts, most total time first."""
+        with self._lock:
+            items = [(sql, e[0], e[1], e[2], sorted(e[3])) for sql, e in self._entries.items()]
+        result = []
+        for sql, calls, total_ms, rows, samples in items:
+            result.append({
+                "sql": sql, "calls": calls, "total_ms": total_ms, "rows": rows,
+                "p50_ms": self._percentile(samples, 50),
+                "p95_ms": self._percentile(samples, 95),
+                "p99_ms": self._percentile(samples, 99),
+            })
+        result.sort(key=lambda r: r["total_ms"], reverse=True)
+        return result
+
+    def dump(self, out=None, limit=30):
+        out = out or sys.stderr
+        rows = self.summary()
+        if not rows:
+            return
+        fmt = "{:>7} {:>10} {:>8} {:>8} {:>8} {:>9}  {}"
+        print("\n" + fmt.format("calls", "total ms", "p50", "p95", "p99", "rows", "statement"), file=out)
+        for r in rows[:limit]:
+            print(fmt.format(r["calls"], f"{r['total_ms']:.1f}", f"{r['p50_ms']:.3f}",
+                             f"{r['p95_ms']:.3f}", f"{r['p99_ms']:.3f}", r["rows"],
+                             r["sql"][:90]), file=out)
+
 
 class DatabaseManager:
-    def __init__(self, db_name="library.db"):
+    def __init__(self, db_name="library.db", pool_size=8, instrument=False,
+                 slow_query_ms=None, slow_log_path="slow_queries.log", dump_stats_on_exit=False):
         self.db_name = db_name
-        self.connection = None
-        self.cursor = None
+        self.pool_size = pool_size
+        self.pool = None
+        self._local = threading.local()
+        self._rollback_listeners = []
+        self.stats = None
+        if instrument or slow_query_ms is not None:
+            self.enable_instrumentation(slow_query_ms, slow_log_path, dump_stats_on_exit)
+
+    def enable_instrumentation(self, slow_query_ms=None, slow_log_path="slow_queries.log",
+                               dump_on_exit=False):
+        self.stats = QueryStats(slow_query_ms, slow_log_path)
+        if dump_on_exit:
+            atexit.register(self.stats.dump)
+        return self.stats
+
+    def disable_instrumentation(self):
+        self.stats = None
+
+    def on_rollback(self, callback):
+        """
+        Call `callback()` whenever transaction() rolls back, savepoints
+        included: caches holding rows written in the block must drop them.
+        """
+        self._rollback_listeners.append(callback)
+
+    def _rolled_back(self):
+        for callback in self._rollback_listeners:
+            callback()
 
     def connect(self):
-        self.connection = sqlite3.connect(self.db_name)
-        self.cursor = self.connection.cursor()
+        self.pool = ConnectionPool(self.db_name, max_size=self.pool_size)
+        # the connecting thread keeps its connection for the whole session
+        self.pool.acquire()
+
+    @property
+    def connection(self):
+        """
+        The calling thread's connection. Threads that never checked one out
+        get one for the rest of their life; worker threads should prefer
+        `checkout()` or `transaction()` so the slot goes back to the pool.
+        """
+        if self.pool is None:
+            return None
+        return self.pool.current() or self.pool.acquire()
+
+    @property
+    def cursor(self):
+        conn = self.connection
+        cur = getattr(self._local, "cursor", None)
+        if cur is None or cur.connection is not conn:
+            cur = self._local.cursor = conn.cursor()
+        return cur
+
+    def checkout(self):
+        """Context manager that checks a connection out of the pool for this thread."""
+        return self.pool.connection()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """
+        Run the block in one transaction on this thread's connection: commit
+        on success, roll back on error. `immediate=True` takes the write lock
+        up front (BEGIN IMMEDIATE). Nested calls join the outer transaction
+        as a savepoint: an error undoes only the inner block's writes.
+        """
+        with self.checkout() as conn:
+            depth = getattr(self._local, "tx_depth", 0)
+            if depth:
+                savepoint = f"sp{depth}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+                self._local.tx_depth = depth + 1
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                    self._rolled_back()
+                    raise
+                else:
+                    conn.execute(f"RELEASE {savepoint}")
+                finally:
+                    self._local.tx_depth = depth
+                return
+            if conn.in_transaction:
+                conn.commit()  # flush implicit work from execute_query callers
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._local.tx_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                self._rolled_back()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.tx_depth = 0
 
     def execute_query(self, query, params=()):
-        self.cursor.execute(query, params)
+        cur = self.cursor
+        if self.stats is None:
+            cur.execute(query, params)
+            return cur
+        start = time.perf_counter()
+        cur.execute(query, params)
+        self.stats.record(cur.connection, query, params, time.perf_counter() - start, cur.rowcount)
+        return cur
+
+    def execute_many(self, query, seq_of_params):
+        cur = self.cursor
+        if self.stats is None:
+            cur.executemany(query, seq_of_params)
+            return cur.rowcount
+        start = time.perf_counter()
+        cur.executemany(query, seq_of_params)
+        self.stats.record(cur.connection, query, None, time.perf_counter() - start, cur.rowcount)
+        return cur.rowcount
 
     def commit(self):
+        # inside transaction() the block's own commit (or rollback) decides
+        if getattr(self._local, "tx_depth", 0):
+            return
         self.connection.commit()
 
     def fetch_all(self, query, params=()):
-        self.cursor.execute(query, params)
-        return self.cursor.fetchall()
+        cur = self.cursor
+        if self.stats is None:
+            cur.execute(query, params)
+            return cur.fetchall()
+        start = time.perf_counter()
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        self.stats.record(cur.connection, query, params, time.perf_counter() - start, len(rows))
+        return rows
+
+    def iter_query(self, query, params=(), batch_size=500, row_factory=None):
+        """
+        Yield result rows in batches of `batch_size` (fetchmany) instead of
+        materializing them all. Uses its own cursor, so other queries can run
+        while iterating. `row_factory` is an sqlite3-style (cursor, row)
+        callable applied to each row.
+        """
+        cur = self.connection.cursor()
+        if row_factory is not None:
+            cur.row_factory = row_factory
+        stats = self.stats
+        start = time.perf_counter() if stats is not None else 0.0
+        elapsed = 0.0
+        rows = 0
+        try:
+            cur.execute(query, params)
+            while True:
+                batch = cur.fetchmany(batch_size)
+                if stats is not None:
+                    elapsed += time.perf_counter() - start
+                    rows += len(batch)
+                if not batch:
+                    break
+                yield from batch
+                if stats is not None:
+                    start = time.perf_counter()
+        finally:
+            cur.close()
+            if stats is not None:
+                stats.record(self.connection, query, params, elapsed, rows)
+
+    def get_schema_version(self):
+        return self.fetch_all("PRAGMA user_version")[0][0]
+
+    def migrate(self, migrations):
+        """
+        Apply (version, description, steps) migrations newer than the stored
+        PRAGMA user_version, in version order. Each step is an SQL string or a
+        callable taking this DatabaseManager; a migration runs in one
+        transaction together with its version bump.
+        """
+        current = self.get_schema_version()
+        for version, description, steps in sorted(migrations, key=lambda m: m[0]):
+            if version <= current:
+                continue
+            with self.transaction():
+                for step in steps:
+                    if callable(step):
+                        step(self)
+                    else:
+                        self.execute_query(step)
+                self.execute_query(f"PRAGMA user_version = {int(version)}")
+            current = version
+            print(f"Applied schema migration {version}: {description}")
+        return current
+
+    def explain_query_plan(self, query, params=()):
+        """Return the EXPLAIN QUERY PLAN detail lines for `query`."""
+        return [row[3] for row in self.fetch_all("EXPLAIN QUERY PLAN " + query, params)]
 
     def close(self):
-        if self.connection:
-            self.connection.close()
\ No newline at end of file
+        if self.pool:
+            self.pool.close_all()
+            self.pool = None
@@ -1,28 +1,76 @@
 
+import importlib
+import os
 import sys
-from datetime import datetime
 from database import DatabaseManager
-from scripts.employee import EmployeeManager
-from scripts.book import BookManager, Book
-from scripts.member import MemberManager, Member
-from scripts.borrow import BorrowManager
+from migrations import ensure_schema
+
+class LazyManager:
+    """Imports `module` and builds `cls(db)` the first time it is used."""
+
+    def __init__(self, module, cls, db):
+        self._spec = (module, cls, db)
+        self._obj = None
+
+    def __getattr__(self, name):
+        if self._obj is None:
+            module, cls, db = self._spec
+            self._obj = getattr(importlib.import_module(module), cls)(db)
+        return getattr(self._obj, name)
+
+def scan_ids(prompt):
+    # one ID per line (barcode scanner) or comma separated; blank line ends
+    print(f"{prompt} (blank line to finish):")
+    ids = []
+    while True:
+        line = input("> ").strip()
+        if not line:
+            return ids
+        ids.extend(int(x) for x in line.replace(",", " ").split())
+
+def import_workers():
+    # LIBRARY_IMPORT_WORKERS=<n> parses menu imports in n processes; only for
+    # files without multi-line quoted fields (see scripts/ingest.py)
+    return int(os.environ.get("LIBRARY_IMPORT_WORKERS") or 1)
+
+def open_db(path="library.db"):
+    # LIBRARY_DB_STATS=1 prints per-statement timings on exit;
+    # LIBRARY_SLOW_QUERY_MS=<ms> logs slower statements to slow_queries.log
+    slow_ms = os.environ.get("LIBRARY_SLOW_QUERY_MS")
+    db = DatabaseManager(path,
+                         instrument=bool(os.environ.get("LIBRARY_DB_STATS")),
+                         slow_query_ms=float(slow_ms) if slow_ms else None,
+                         dump_stats_on_exit=bool(os.environ.get("LIBRARY_DB_STATS")))
+    db.connect()
+    # Setup Tables: one PRAGMA when the schema stamp is current;
+    # LIBRARY_SCHEMA_CHECK=full re-runs every CREATE ... IF NOT EXISTS
+    ensure_schema(db, force=os.environ.get("LIBRARY_SCHEMA_CHECK") == "full")
+    # LIBRARY_FINE_PER_DAY / LIBRARY_GRACE_DAYS set the fine policy for
+    # returns and the overdue report alike
+    fine_per_day = os.environ.get("LIBRARY_FINE_PER_DAY")
+    grace_days = os.environ.get("LIBRARY_GRACE_DAYS")
+    if fine_per_day or grace_days:
+        from scripts.borrow import set_fine_policy
+        set_fine_policy(fine_per_day or None, grace_days or None)
+    return db
 
 def main():
-    db = DatabaseManager("library.db")
-    
+    if len(sys.argv) > 1:
+        # scripted use: `python main.py --help`, `python main.py --batch FILE`
+        from scripts.commands import cli
+        sys.exit(cli(sys.argv[1:], open_db))
+
+    db = None
     try:
-        db.connect()
-        # Initialize
-        emp_mgr = EmployeeManager(db)
-        book_mgr = BookManager(db)
-        mem_mgr = MemberManager(db)
-        borrow_mgr = BorrowManager(db)
-        
-        # Setup Tables
-        emp_mgr.create_table()
-        book_mgr.create_tables()
-        mem_mgr.create_table()
-        borrow_mgr.create_table()
+        db = open_db()
+
+        # Initialize (each module is imported on first use)
+        emp_mgr = LazyManager("scripts.employee", "EmployeeManager", db)
+        book_mgr = LazyManager("scripts.book", "BookManager", db)
+        mem_mgr = LazyManager("scripts.member", "MemberManager", db)
+        borrow_mgr = LazyManager("scripts.borrow", "BorrowManager", db)
+        overdue_mgr = LazyManager("scripts.overdue", "OverdueManager", db)
+        analytics = LazyManager("scripts.analytics", "AnalyticsManager", db)
 
         while True:
             print("\n=== LIBRARY MANAGEMENT SYSTEM ===")
@@ -30,13 +78,25 @@ def main():
             print("2. Book Module")
             print("3. Member Module")
             print("4. Circulation (Issue/Return)")
-            print("5. Exit")
+            print("5. Reports")
+            print("6. Exit")
             
             choice = input("\nEnter choice: ")
 
             if choice == "1":
-                print("\n[Employee Menu]\n1. Import CSV\n2. View All")
-                if input("Choice: ") == "1": emp_mgr.import_from_csv("emp.csv")
+                print("\n[Employee Menu]\n1. Import CSV\n2. View All\n3. Payroll Report"
+                      "\n4. Staff by Role\n5. Staff Joined Between Dates")
+                c = input("Choice: ")
+                if c == "1": emp_mgr.import_from_csv("emp.csv")
+                elif c == "3": emp_mgr.show_payroll_report()
+                elif c == "4": emp_mgr.show_employees(emp_mgr.get_employees_by_role(input("Role: ").strip()))
+                elif c == "5":
+                    try:
+                        emp_mgr.show_employees(emp_mgr.get_employees_joined(
+                            input("From (DD-MM-YYYY, blank = any): ").strip() or None,
+                            input("To (DD-MM-YYYY, blank = any): ").strip() or None))
+                    except ValueError as e:
+                        print(f"Error: {e}")
                 else: emp_mgr.show_all_employees()
 
             elif choice == "2":
@@ -45,8 +105,10 @@ def main():
                 print("2. Add Manual Book")
                 print("3. View/Search Books")
                 print("4. CATEGORY MANAGEMENT")
+                print("5. Update Catalog from CSV (new/changed rows only, resumable)")
                 c = input("Choice: ")
-                if c == "1": book_mgr.import_books_from_csv("books.csv")
+                if c == "1": book_mgr.import_books_from_csv("books.csv", workers=import_workers())
+                elif c == "5": book_mgr.upsert_books_from_csv("books.csv")
                 elif c == "2":
                     t = input("Title: ")
                     a= input("Author: ")
@@ -64,13 +126,25 @@ def main():
                                     ("Copies: ", 5),
                                     ("Location: ", "Desk")]
                         # book_mgr.add_book(Book(t, input("Author: "), 1, "N/A", "Self", 2024, "Eng", 100, 5, "Desk"))
+                        from scripts.book import Book
                         book_mgr.add_book(Book(t,a,*[(i := input(p)) and type(d)(i) or d for p, d in fields]))
                 elif c == "3": 
                     print("\n1. View All (Paged)")
                     print("2. Search by Keyword")
+                    print("3. Typeahead (title/author suggestions)")
+                    print("4. Fuzzy Search (tolerates typos)")
                     sc = input("Choice: ")
                     if sc == "1": book_mgr.show_all_books()
                     elif sc == "2": book_mgr.search_books(input("Enter Keyword: "))
+                    elif sc == "3":
+                        if book_mgr.typeahead is None:
+                            s = book_mgr.enable_typeahead().stats()
+                            print(f"Indexed {s['books']} books in {s['build_seconds']:.1f}s "
+                                  f"({s['memory_mib']:.0f} MiB).")
+                        while text := input("Type (blank to finish): ").strip():
+                            for bid, title, author, loans in book_mgr.suggest_books(text):
+                                print(f"  {bid:<7} {title[:45]:<47} {author[:20]:<22} {loans} loans")
+                    elif sc == "4": book_mgr.search_books(input("Enter Keyword: "), fuzzy=True)
                 elif c == "4":
                     print("\n[Category Manager]")
                     print("1. View Categories")
@@ -122,6 +196,7 @@ def main():
                 print("2. Update Member Details")
                 print("3. Deactivate Member")
                 print("4. View All Members")
+                print("5. Import CSV")
                 c = input("Choice: ")
                 
                 if c == "1":
@@ -132,6 +207,8 @@ def main():
                     email = input("Email ID: ")
                     id_type = input("ID Proof Type (e.g., Student ID/Aadhaar): ")
                     id_num = input("ID Proof Number: ")
+                    from datetime import datetime
+                    from scripts.member import Member
                     join_date = datetime.now().strftime("%Y-%m-%d")
                     
                     new_mem = Member(name, address, phone, email, id_type, id_num, join_date)
@@ -143,13 +220,13 @@ def main():
                         # Fetch existing to show user what they are changing
                         old_data = mem_mgr.get_member_by_id(mid)
                         if old_data:
-                            print(f"Editing Member: {old_data[1]}")
+                            print(f"Editing Member: {old_data.name}")
                             # Ask for new values, press Enter to keep old ones
-                            n_name = input(f"Name ({old_data[1]}): ") or old_data[1]
-                            n_addr = input(f"Address ({old_data[2]}): ") or old_data[2]
-                            n_phone = input(f"Phone ({old_data[3]}): ") or old_data[3]
-                            n_email = input(f"Email ({old_data[4]}): ") or old_data[4]
-                            n_status = input(f"Status ({old_data[8]}): ") or old_data[8]
+                            n_name = input(f"Name ({old_data.name}): ") or old_data.name
+                            n_addr = input(f"Address ({old_data.address}): ") or old_data.address
+                            n_phone = input(f"Phone ({old_data.contact_number}): ") or old_data.contact_number
+                            n_email = input(f"Email ({old_data.email}): ") or old_data.email
+                            n_status = input(f"Status ({old_data.active_status}): ") or old_data.active_status
                             
                             mem_mgr.update_member(mid, n_name, n_phone, n_email, n_addr, n_status)
                         else:
@@ -168,22 +245,54 @@ def main():
 
                 elif c == "4":
                     mem_mgr.show_all_members()
+                elif c == "5":
+                    mem_mgr.import_from_csv("members.csv", workers=import_workers())
             elif choice == "4":
                 print("\n[Circulation]\n1. Issue Book\n2. Return Book\n3. View Active")
+                print("4. Issue Many (scan)\n5. Return Many (scan)\n6. Overdue Report")
                 c = input("Choice: ")
                 try:
                     if c == "1": borrow_mgr.issue_book(int(input("Member ID: ")), int(input("Book ID: ")))
                     elif c == "2": borrow_mgr.return_book(int(input("Borrow ID: ")))
                     elif c == "3": borrow_mgr.show_active_borrows()
+                    elif c == "4":
+                        mid = int(input("Member ID: "))
+                        borrow_mgr.issue_books(mid, scan_ids("Scan Book IDs"))
+                    elif c == "5": borrow_mgr.return_books(scan_ids("Scan Borrow IDs"))
+                    elif c == "6": overdue_mgr.show_overdue_report()
                 except ValueError: print("Invalid Input.")
 
             elif choice == "5":
+                print("\n[Reports]\n1. Dashboard\n2. Most Borrowed Titles\n3. Most Active Members")
+                print("4. Loans per Category per Month\n5. Stock Utilization\n6. Rebuild Analytics")
+                print("7. Export Data (CSV/JSONL)")
+                c = input("Choice: ")
+                if c == "1": analytics.show_dashboard()
+                elif c == "2": analytics.show_top_books()
+                elif c == "3": analytics.show_top_members()
+                elif c == "4": analytics.show_category_months()
+                elif c == "5": analytics.show_stock_utilization()
+                elif c == "6":
+                    analytics.rebuild()
+                    print("Analytics rebuilt.")
+                elif c == "7":
+                    dataset = input("Dataset (books/members/loans): ").strip().lower()
+                    path = input("Output file (.csv/.jsonl, add .gz to compress): ").strip()
+                    since = input("Only changed since (YYYY-MM-DD, blank = all): ").strip() or None
+                    from scripts.export import export
+                    try:
+                        count = export(db, dataset, path, filters={"since": since})
+                        print(f"Exported {count} {dataset} to {path}")
+                    except (KeyError, ValueError, OSError) as e:
+                        print(f"Export failed: {e}")
+
+            elif choice == "6":
                 break
 
     except Exception as e:
         print(f"CRITICAL ERROR: {e}")
     finally:
-        if db.connection:
+        if db and db.connection:
             db.close()
 
 if __name__ == "__main__":
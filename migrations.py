@@ -0,0 +1,132 @@
+"""
+Ordered schema migrations, applied once by DatabaseManager.migrate().
+
+Append new migrations to the end with the next version number; never edit
+a migration that has already shipped. Startup skips all DDL when the database
+is already stamped with SCHEMA_VERSION, so every schema change (new tables
+included) needs a migration, even one with no steps of its own.
+
+Manager modules are imported inside the steps, so loading this module (on
+every launch) stays cheap.
+"""
+
+
+def _normalize_employee_table(db):
+    from scripts.employee import EmployeeManager
+    EmployeeManager.normalize_table(db)
+
+
+def _add_book_content_hash(db):
+    from scripts.book import BookManager
+    BookManager.add_content_hash_column(db)
+
+
+def _create_fuzzy_search_tables(db):
+    from scripts.fuzzy import FuzzyIndex
+    FuzzyIndex.create_tables(db)
+
+
+def _index_search_terms(db):
+    from scripts.fuzzy import FuzzyIndex
+    FuzzyIndex(db).catch_up()
+
+
+def add_column(table, column, ddl):
+    """Migration step: ALTER TABLE ADD COLUMN unless `table` already has it."""
+    def step(db):
+        columns = [row[1] for row in db.fetch_all(f"PRAGMA table_info({table})")]
+        if columns and column not in columns:
+            db.execute_query(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+    return step
+
+
+def touch_triggers(table, key, columns):
+    """
+    Triggers that keep `table`.updated_at current: stamped on insert when
+    the column default could not be used (tables that got the column from
+    ALTER TABLE) and on updates of `columns`.
+    """
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_touch_ai AFTER INSERT ON {table}
+            WHEN new.updated_at IS NULL BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE {key} = new.{key};
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {table}_touch_au AFTER UPDATE OF {", ".join(columns)} ON {table}
+            WHEN new.updated_at IS old.updated_at BEGIN
+                UPDATE {table} SET updated_at = CURRENT_TIMESTAMP WHERE {key} = new.{key};
+            END""",
+    ]
+
+
+MIGRATIONS = [
+    (1, "indexes for circulation and catalog hot queries", [
+        # show_books_by_category: WHERE category_id = ? ORDER BY title, book_id
+        "CREATE INDEX IF NOT EXISTS idx_book_category_title ON book(category_id, title)",
+        # circulation joins / member and book loan history
+        "CREATE INDEX IF NOT EXISTS idx_borrow_member ON borrow(member_id)",
+        "CREATE INDEX IF NOT EXISTS idx_borrow_book ON borrow(book_id)",
+        # open loans only: stays small however much history `borrow` holds,
+        # and covers show_active_borrows / overdue lookups
+        """CREATE INDEX IF NOT EXISTS idx_borrow_active
+           ON borrow(due_date, member_id, book_id, borrow_date)
+           WHERE borrow_status = 'Issued'""",
+    ]),
+    (2, "typed employee columns and payroll/seniority indexes", [
+        # salary '1,06,826' -> 106826, working_from DD-MM-YYYY -> ISO,
+        # year_worked '6.8 years' -> 6.8 (rebuilds the table, dropping indexes)
+        _normalize_employee_table,
+        # get_employees_by_role / payroll_by_role (covering for the aggregates)
+        "CREATE INDEX IF NOT EXISTS idx_employee_role_salary ON employee(role, salary)",
+        # get_employees_joined / hires_by_year
+        "CREATE INDEX IF NOT EXISTS idx_employee_working_from ON employee(working_from)",
+    ]),
+    (3, "content hash for incremental catalog imports", [
+        _add_book_content_hash,
+    ]),
+    (4, "updated_at on book and member for change-based exports", [
+        add_column("book", "updated_at", "VARCHAR(20)"),
+        add_column("member", "updated_at", "VARCHAR(20)"),
+        # when existing rows last changed is unknown: the first sync takes them all
+        "UPDATE book SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL",
+        "UPDATE member SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL",
+        # stock movements (quantity_available) are circulation, not catalog changes
+        *touch_triggers("book", "book_id", ("title", "author", "category_id", "isbn", "publisher",
+                                            "publication_year", "language", "pages",
+                                            "quantity_total", "shelf_location")),
+        *touch_triggers("member", "member_id", ("name", "address", "contact_number", "email",
+                                                "id_proof_type", "id_proof_number", "active_status")),
+    ]),
+    (5, "title/author word trigrams for typo-tolerant search", [
+        _create_fuzzy_search_tables,
+        # one pass over the existing catalog; adds and imports keep it current
+        _index_search_terms,
+    ]),
+]
+
+SCHEMA_VERSION = max(version for version, _, _ in MIGRATIONS)
+
+
+def ensure_schema(db, force=False):
+    """
+    Make sure the database has every table and migration. A database whose
+    user_version is already SCHEMA_VERSION is trusted as is: one PRAGMA, no
+    DDL, no commit. Otherwise (new or older database, or `force`) all tables
+    are created and pending migrations applied. Returns True if DDL ran.
+    """
+    if not force and db.get_schema_version() >= SCHEMA_VERSION:
+        return False
+    from scripts.analytics import AnalyticsManager
+    from scripts.book import BookManager
+    from scripts.borrow import BorrowManager
+    from scripts.employee import EmployeeManager
+    from scripts.member import MemberManager
+    from scripts.overdue import OverdueManager
+
+    EmployeeManager(db).create_table()
+    BookManager(db).create_tables()
+    MemberManager(db).create_table()
+    BorrowManager(db).create_table()
+    OverdueManager(db).create_tables()
+    AnalyticsManager(db).create_tables()
+    db.migrate(MIGRATIONS)
+    return True
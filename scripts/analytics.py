@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Circulation analytics kept up to date by triggers.
+
+Run from the project root to rebuild the summaries from scratch:
+    python -m scripts.analytics --db library.db rebuild
+"""
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+
+from database import DatabaseManager
+
+# the summary tables; stats_totals is a single row (id = 1)
+TABLES = ("stats_book", "stats_member", "stats_category", "stats_category_month", "stats_totals")
+
+class AnalyticsManager:
+    """
+    Aggregate tables for the Reports menu.
+
+    Triggers on `borrow` and `book` update the summaries in the same
+    transaction as the change, so every write path (single and batch
+    circulation, imports, the service) keeps them current and reports never
+    scan `borrow`. A loan counts towards the category and month it was
+    issued in (rebuild() uses each book's current category); moving an
+    existing loan to another member or book is not tracked and needs a
+    rebuild().
+    """
+
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    def create_tables(self):
+        existed = self.db.fetch_all("SELECT 1 FROM sqlite_master WHERE name = 'stats_totals'")
+        self.db.execute_query("""
+        CREATE TABLE IF NOT EXISTS stats_book(
+            book_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            on_loan INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        # most borrowed titles
+        self.db.execute_query("CREATE INDEX IF NOT EXISTS idx_stats_book_loans ON stats_book(loans)")
+        self.db.execute_query("""
+        CREATE TABLE IF NOT EXISTS stats_member(
+            member_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            on_loan INTEGER NOT NULL DEFAULT 0,
+            last_loan VARCHAR(20)
+        );
+        """)
+        self.db.execute_query("CREATE INDEX IF NOT EXISTS idx_stats_member_loans ON stats_member(loans)")
+        # copies and loans per category (category 0 = books without one)
+        self.db.execute_query("""
+        CREATE TABLE IF NOT EXISTS stats_category(
+            category_id INTEGER PRIMARY KEY,
+            copies INTEGER NOT NULL DEFAULT 0,
+            on_loan INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        self.db.execute_query("""
+        CREATE TABLE IF NOT EXISTS stats_category_month(
+            month VARCHAR(7) NOT NULL,
+            category_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, category_id)
+        );
+        """)
+        self.db.execute_query("""
+        CREATE TABLE IF NOT EXISTS stats_totals(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            loans INTEGER NOT NULL DEFAULT 0,
+            on_loan INTEGER NOT NULL DEFAULT 0,
+            copies INTEGER NOT NULL DEFAULT 0,
+            active_members INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        self.db.execute_query("INSERT OR IGNORE INTO stats_totals(id) VALUES (1)")
+        self._create_triggers()
+        if not existed:
+            self.rebuild()  # pick up whatever loans and books already exist
+        else:
+            self.db.commit()
+
+    def _create_triggers(self):
+        # `on_loan` / `loans` are the deltas for the row; `sign` says whether a
+        # member's open-loan count went up or down, so active_members only
+        # moves when that count crosses zero
+        def loan_change(row, sign, on_loan, loans):
+            return f"""
+            INSERT INTO stats_book(book_id, loans, on_loan) VALUES ({row}.book_id, {loans}, {on_loan})
+                ON CONFLICT(book_id) DO UPDATE SET loans = loans + {loans}, on_loan = on_loan + {on_loan};
+            INSERT INTO stats_member(member_id, loans, on_loan, last_loan)
+                VALUES ({row}.member_id, {loans}, {on_loan}, {row}.borrow_date)
+                ON CONFLICT(member_id) DO UPDATE SET loans = loans + {loans}, on_loan = on_loan + {on_loan},
+                    last_loan = MAX(COALESCE(last_loan, ''), COALESCE(excluded.last_loan, ''));
+            INSERT INTO stats_category(category_id, on_loan)
+                VALUES (COALESCE((SELECT category_id FROM book WHERE book_id = {row}.book_id), 0), {on_loan})
+                ON CONFLICT(category_id) DO UPDATE SET on_loan = on_loan + {on_loan};
+            UPDATE stats_totals SET loans = loans + {loans}, on_loan = on_loan + {on_loan},
+                active_members = active_members + {sign} * (
+                    SELECT COUNT(*) FROM stats_member
+                    WHERE member_id = {row}.member_id AND on_loan = ({sign} > 0) AND {on_loan} != 0)
+                WHERE id = 1;
+            """
+
+        issued_new = "(new.borrow_status = 'Issued')"
+        issued_old = "(old.borrow_status = 'Issued')"
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_borrow_ai AFTER INSERT ON borrow BEGIN
+            {loan_change("new", 1, issued_new, 1)}
+            INSERT INTO stats_category_month(month, category_id, loans)
+                VALUES (substr(new.borrow_date, 1, 7),
+                        COALESCE((SELECT category_id FROM book WHERE book_id = new.book_id), 0), 1)
+                ON CONFLICT(month, category_id) DO UPDATE SET loans = loans + 1;
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_borrow_issue AFTER UPDATE OF borrow_status ON borrow
+        WHEN {issued_new} AND NOT {issued_old} BEGIN
+            {loan_change("new", 1, 1, 0)}
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_borrow_return AFTER UPDATE OF borrow_status ON borrow
+        WHEN {issued_old} AND NOT {issued_new} BEGIN
+            {loan_change("old", -1, -1, 0)}
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_borrow_ad AFTER DELETE ON borrow BEGIN
+            {loan_change("old", -1, f"-{issued_old}", -1)}
+            UPDATE stats_category_month SET loans = loans - 1
+            WHERE month = substr(old.borrow_date, 1, 7)
+              AND category_id = COALESCE((SELECT category_id FROM book WHERE book_id = old.book_id), 0);
+        END;
+        """)
+
+        # copies per category follow book inserts, stock changes and recategorization
+        def copies_change(row, sign):
+            return f"""
+            INSERT INTO stats_category(category_id, copies, on_loan)
+                VALUES (COALESCE({row}.category_id, 0), {sign} * {row}.quantity_total,
+                        {sign} * COALESCE((SELECT on_loan FROM stats_book WHERE book_id = {row}.book_id), 0))
+                ON CONFLICT(category_id) DO UPDATE SET copies = copies + excluded.copies,
+                                                       on_loan = on_loan + excluded.on_loan;
+            UPDATE stats_totals SET copies = copies + {sign} * {row}.quantity_total WHERE id = 1;
+            """
+
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_book_ai AFTER INSERT ON book BEGIN
+            {copies_change("new", 1)}
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_book_au AFTER UPDATE OF quantity_total, category_id ON book
+        WHEN old.quantity_total IS NOT new.quantity_total OR old.category_id IS NOT new.category_id BEGIN
+            {copies_change("old", -1)}
+            {copies_change("new", 1)}
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS stats_book_ad AFTER DELETE ON book BEGIN
+            {copies_change("old", -1)}
+        END;
+        """)
+
+    @contextmanager
+    def paused(self):
+        """
+        Drop the triggers for a bulk load and rebuild once at the end; one
+        set-based rebuild is far cheaper than firing the triggers per row.
+        Only for single-writer maintenance jobs.
+        """
+        triggers = [name for (name,) in self.db.fetch_all(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'stats!_%' ESCAPE '!'")]
+        for name in triggers:
+            self.db.execute_query(f"DROP TRIGGER {name}")
+        self.db.commit()
+        try:
+            yield
+        finally:
+            if triggers:
+                self._create_triggers()
+                self.rebuild()
+
+    def rebuild(self):
+        """Recompute every summary from `borrow` and `book` in one transaction."""
+        with self.db.transaction(immediate=True):
+            for table in TABLES:
+                self.db.execute_query(f"DELETE FROM {table}")
+            self.db.execute_query("""
+                INSERT INTO stats_book(book_id, loans, on_loan)
+                SELECT book_id, COUNT(*), SUM(borrow_status = 'Issued') FROM borrow GROUP BY book_id
+            """)
+            self.db.execute_query("""
+                INSERT INTO stats_member(member_id, loans, on_loan, last_loan)
+                SELECT member_id, COUNT(*), SUM(borrow_status = 'Issued'), MAX(borrow_date)
+                FROM borrow GROUP BY member_id
+            """)
+            self.db.execute_query("""
+                INSERT INTO stats_category(category_id, copies, on_loan)
+                SELECT COALESCE(b.category_id, 0), SUM(b.quantity_total), COALESCE(SUM(s.on_loan), 0)
+                FROM book b LEFT JOIN stats_book s ON s.book_id = b.book_id
+                GROUP BY COALESCE(b.category_id, 0)
+            """)
+            self.db.execute_query("""
+                INSERT INTO stats_category_month(month, category_id, loans)
+                SELECT substr(br.borrow_date, 1, 7), COALESCE(b.category_id, 0), COUNT(*)
+                FROM borrow br LEFT JOIN book b ON b.book_id = br.book_id
+                GROUP BY 1, 2
+            """)
+            self.db.execute_query("""
+                INSERT INTO stats_totals(id, loans, on_loan, copies, active_members)
+                SELECT 1,
+                       (SELECT COALESCE(SUM(loans), 0) FROM stats_book),
+                       (SELECT COALESCE(SUM(on_loan), 0) FROM stats_book),
+                       (SELECT COALESCE(SUM(quantity_total), 0) FROM book),
+                       (SELECT COUNT(*) FROM stats_member WHERE on_loan > 0)
+            """)
+
+    def totals(self):
+        """(loans ever, on loan now, copies, members with a loan out)."""
+        return self.db.fetch_all("SELECT loans, on_loan, copies, active_members FROM stats_totals WHERE id = 1")[0]
+
+    def top_books(self, limit=10):
+        return self.db.fetch_all("""
+            SELECT s.book_id, b.title, s.loans, s.on_loan
+            FROM stats_book s LEFT JOIN book b ON b.book_id = s.book_id
+            ORDER BY s.loans DESC LIMIT ?
+        """, (limit,))
+
+    def top_members(self, limit=10):
+        return self.db.fetch_all("""
+            SELECT s.member_id, m.name, s.loans, s.on_loan, s.last_loan
+            FROM stats_member s LEFT JOIN member m ON m.member_id = s.member_id
+            ORDER BY s.loans DESC LIMIT ?
+        """, (limit,))
+
+    def loans_by_category_month(self, months=6):
+        """(month, category name, loans) for the last `months` calendar months."""
+        now = datetime.now()
+        first = (now.year * 12 + now.month - 1) - (months - 1)
+        since = f"{first // 12:04d}-{first % 12 + 1:02d}"
+        return self.db.fetch_all("""
+            SELECT s.month, COALESCE(c.category_name, 'Uncategorized'), s.loans
+            FROM stats_category_month s LEFT JOIN category c ON c.category_id = s.category_id
+            WHERE s.month >= ? AND s.loans > 0
+            ORDER BY s.month, s.loans DESC
+        """, (since,))
+
+    def stock_utilization(self):
+        """(category name, copies, on loan) per category, busiest first."""
+        return self.db.fetch_all("""
+            SELECT COALESCE(c.category_name, 'Uncategorized'), s.copies, s.on_loan
+            FROM stats_category s LEFT JOIN category c ON c.category_id = s.category_id
+            WHERE s.copies > 0 OR s.on_loan > 0
+            ORDER BY CAST(s.on_loan AS REAL) / MAX(s.copies, 1) DESC
+        """)
+
+    def show_dashboard(self):
+        loans, on_loan, copies, active = self.totals()
+        print("\n" + "="*80)
+        print(f"Loans recorded: {loans}   On loan now: {on_loan}   Copies: {copies}   "
+              f"Utilization: {on_loan / copies if copies else 0:.1%}   Members with loans: {active}")
+        print("="*80 + "\n")
+
+    def show_top_books(self, limit=10):
+        rows = self.top_books(limit)
+        if not rows:
+            print("No loans recorded.")
+            return
+        print(f"\n{'ID':<8} {'Title':<55} {'Loans':>8} {'Out':>5}")
+        print("-" * 80)
+        for b_id, title, loans, out in rows:
+            print(f"{b_id:<8} {str(title).strip()[:53]:<55} {loans:>8} {out:>5}")
+
+    def show_top_members(self, limit=10):
+        rows = self.top_members(limit)
+        if not rows:
+            print("No loans recorded.")
+            return
+        print(f"\n{'ID':<8} {'Member':<35} {'Loans':>8} {'Out':>5} {'Last Loan':>12}")
+        print("-" * 72)
+        for m_id, name, loans, out, last in rows:
+            print(f"{m_id:<8} {str(name).strip()[:33]:<35} {loans:>8} {out:>5} {str(last):>12}")
+
+    def show_category_months(self, months=6):
+        rows = self.loans_by_category_month(months)
+        if not rows:
+            print("No loans in that period.")
+            return
+        print(f"\n{'Month':<9} {'Category':<30} {'Loans':>8}")
+        print("-" * 49)
+        for month, name, loans in rows:
+            print(f"{month:<9} {str(name)[:28]:<30} {loans:>8}")
+
+    def show_stock_utilization(self):
+        rows = self.stock_utilization()
+        if not rows:
+            print("No books found.")
+            return
+        print(f"\n{'Category':<30} {'Copies':>10} {'On Loan':>10} {'Used':>8}")
+        print("-" * 61)
+        for name, copies, out in rows:
+            print(f"{str(name)[:28]:<30} {copies:>10} {out:>10} {out / copies if copies else 0:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Circulation analytics maintenance.")
+    parser.add_argument("--db", default="library.db")
+    parser.add_argument("command", choices=["rebuild", "show"])
+    args = parser.parse_args()
+    db = DatabaseManager(args.db)
+    db.connect()
+    analytics = AnalyticsManager(db)
+    if args.command == "rebuild":
+        analytics.create_tables()
+        analytics.rebuild()
+        print("Analytics rebuilt.")
+    analytics.show_dashboard()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
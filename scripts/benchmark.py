@@ -0,0 +1,899 @@
+#!/usr/bin/env python3
+"""
+Benchmarks and consistency checks for the library database.
+
+Run from the project root, e.g.:
+    python -m scripts.benchmark check
+    python -m scripts.benchmark suite --books 1000000 --output bench.json
+    python -m scripts.benchmark suite --compare bench.json
+    python -m scripts.benchmark search --books 100000 1000000
+
+`check` runs the consistency checks at sizes that take seconds and exits
+with status 1 if any of them fails; run it before committing.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from database import DatabaseManager
+from scripts import categorize_books
+from scripts.book import BOOK_UPSERT_QUERY, Book, BookManager
+from scripts.borrow import BorrowManager
+from scripts.datagen import (SURNAMES, WORDS, create_schema, fill_books, fill_borrows,
+                             fill_members, write_books_csv)
+from scripts.member import MemberManager
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def bench_search(sizes, repeat=50):
+    rng = random.Random(7)
+    queries = ["grisham", "tolk",                      # common author / prefix
+               rng.choice(WORDS),                       # rare title word
+               f"{rng.choice(WORDS)} {rng.choice(WORDS)}",  # multi-word
+               rng.choice(WORDS)[:4],                   # title prefix
+               "zzzz"]                                  # no match
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(os.path.join(tmp, "bench.db"))
+            db.connect()
+            books = BookManager(db)
+            books.create_tables()
+            fill_books(db, size)
+
+            print(f"\n{size:,} books")
+            print(f"{'query':<22} {'FTS p50 ms':>11} {'FTS p95 ms':>11} {'LIKE p50 ms':>12}")
+            for q in queries:
+                books.fts_enabled = True
+                fts = timed(lambda: books.find_books(q), repeat)
+                books.fts_enabled = False
+                like = timed(lambda: books.find_books(q), max(3, repeat // 10))
+                print(f"{q:<22} {fts[0]:>11.3f} {fts[1]:>11.3f} {like[0]:>12.3f}")
+            db.close()
+
+
+def bench_classify(rows, seed=42):
+    """Parity check and rows/sec for categorize_books.classify_text."""
+    rng = random.Random(seed)
+    publishers = ["Penguin Books", "Harlequin", "Scholastic", "Ballantine Books",
+                  "Dover Publications", "O'Reilly", "Tor Books", "Bantam"]
+    texts = [" ".join([" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))),
+                       f"{rng.choice(SURNAMES)}", rng.choice(publishers)])
+             for _ in range(rows)]
+    # real-world phrasing that hits prefix/overlap cases
+    texts += ["The Hobbit J.R.R. Tolkien", "Science Fiction Stories", "Self-Help Guidebook",
+              "A Children's Cookbook", "legend of the galaxy", "How to Be Happy"] * 100
+
+    mismatches = [t for t in texts if categorize_books.classify_text(t)
+                  != categorize_books.classify_text_reference(t)]
+    for name, fn in (("reference", categorize_books.classify_text_reference),
+                     ("compiled", categorize_books.classify_text)):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {len(texts) / elapsed:>12,.0f} rows/sec")
+    print(f"parity: {len(texts) - len(mismatches)}/{len(texts)} identical")
+    return 1 if mismatches else 0
+
+
+def quiet():
+    """Silence the managers' console output while timing them."""
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {"p50_ms": samples[len(samples) // 2],
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))]}
+
+
+def sample_ms(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(books, members, borrows, seed=42, circulation_ops=2000):
+    """
+    End-to-end benchmark on freshly generated data. Returns a dict of
+    metrics; every value is "higher is better" (…_per_sec) or a latency (…_ms).
+    """
+    rng = random.Random(seed)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_csv = os.path.join(tmp, "books.csv")
+        categorized_csv = os.path.join(tmp, "books_categorized.csv")
+        write_books_csv(raw_csv, books, seed)
+
+        # categorize_books.process
+        start = time.perf_counter()
+        with quiet():
+            categorize_books.process(raw_csv, categorized_csv)
+        metrics["categorize_rows_per_sec"] = books / (time.perf_counter() - start)
+
+        db = DatabaseManager(os.path.join(tmp, "suite.db"))
+        db.connect()
+        with quiet():
+            create_schema(db)
+        book_mgr = BookManager(db)
+
+        # CSV import (with Category column from the step above)
+        with quiet():
+            stats = book_mgr.import_books_from_csv(categorized_csv)
+        metrics["import_rows_per_sec"] = stats["rows_per_sec"]
+
+        start = time.perf_counter()
+        fill_members(db, members, seed)
+        fill_borrows(db, borrows, members, books, seed=seed)
+        metrics["datagen_db_s"] = time.perf_counter() - start
+
+        # keyword search: rare words, multi-word, prefixes, popular authors
+        queries = ([(rng.choice(WORDS),) for _ in range(30)]
+                   + [(f"{rng.choice(WORDS)} {rng.choice(WORDS)}",) for _ in range(30)]
+                   + [(rng.choice(WORDS)[:4],) for _ in range(30)]
+                   + [(rng.choice(SURNAMES),) for _ in range(30)])
+        for name, q in sample_ms(book_mgr.find_books, queries).items():
+            metrics[f"search_{name}"] = q
+
+        # paging: first page vs a page 90% deep, keyset and OFFSET
+        depth = int(books * 0.9)
+        deep_token = BookManager._encode_page_token("next", (depth,), "all")
+        for name, q in sample_ms(book_mgr.get_books_page, [()] * 30).items():
+            metrics[f"page_first_{name}"] = q
+        for name, q in sample_ms(book_mgr.get_books_page, [(deep_token,)] * 30).items():
+            metrics[f"page_deep_keyset_{name}"] = q
+        offset_query = """
+            SELECT b.book_id, b.title, b.author, c.category_name, b.quantity_available, b.shelf_location
+            FROM book b LEFT JOIN category c ON b.category_id = c.category_id
+            LIMIT 100 OFFSET ?
+        """
+        for name, q in sample_ms(db.fetch_all, [(offset_query, (depth,))] * 10).items():
+            metrics[f"page_deep_offset_{name}"] = q
+
+        # category listing: first page of every category
+        cat_args = [(cid,) for cid, _, _ in book_mgr.get_all_categories()] * 5
+        for name, q in sample_ms(book_mgr.get_category_books_page, cat_args).items():
+            metrics[f"category_page_{name}"] = q
+
+        # circulation: single issue/return round trips, then 10-item batches
+        borrow_mgr = BorrowManager(db)
+        active = [m for (m,) in db.fetch_all(
+            "SELECT member_id FROM member WHERE active_status = 'Active' LIMIT 100")]
+        with quiet():
+            start = time.perf_counter()
+            loans = [borrow_mgr.issue_book(rng.choice(active), rng.randint(1, books))
+                     for _ in range(circulation_ops)]
+            metrics["issue_per_sec"] = circulation_ops / (time.perf_counter() - start)
+            start = time.perf_counter()
+            for loan in loans:
+                if loan is not None:
+                    borrow_mgr.return_book(loan)
+            metrics["return_per_sec"] = circulation_ops / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            batch_loans = []
+            for _ in range(circulation_ops // 10):
+                results = borrow_mgr.issue_books(rng.choice(active),
+                                                 [rng.randint(1, books) for _ in range(10)])
+                batch_loans.append([r["borrow_id"] for r in results if r["borrow_id"]])
+            metrics["batch_issue_items_per_sec"] = circulation_ops / (time.perf_counter() - start)
+            start = time.perf_counter()
+            for ids in batch_loans:
+                borrow_mgr.return_books(ids)
+            metrics["batch_return_items_per_sec"] = circulation_ops / (time.perf_counter() - start)
+        db.close()
+    return metrics
+
+
+def bench_suite(args):
+    started = datetime.now().isoformat(timespec="seconds")
+    metrics = run_suite(args.books, args.members, args.borrows, args.seed)
+    report = {
+        "meta": {
+            "started": started,
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {"books": args.books, "members": args.members,
+                       "borrows": args.borrows, "seed": args.seed},
+        },
+        "metrics": metrics,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+    print(f"{'metric':<34} {'value':>14}" + (f" {'baseline':>14} {'change':>8}" if baseline else ""))
+    for name, value in metrics.items():
+        line = f"{name:<34} {value:>14,.3f}"
+        if baseline and name in baseline and baseline[name]:
+            old = baseline[name]
+            # latencies improve downwards, throughputs upwards
+            better = old / value if name.endswith("_ms") or name.endswith("_s") else value / old
+            line += f" {old:>14,.3f} {better:>7.2f}x"
+        print(line)
+    print(f"\nWrote {args.output}")
+    return 0
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _run_main(cwd, extra_env=None, python_args=()):
+    # launch main.py, choose Exit at the first menu; returns (seconds, stderr)
+    env = dict(os.environ, PYTHONPATH=ROOT, **(extra_env or {}))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *python_args, os.path.join(ROOT, "main.py")], cwd=cwd,
+                          input="6\n", capture_output=True, text=True, env=env, check=True)
+    return time.perf_counter() - start, proc.stderr
+
+
+def import_profile(stderr):
+    """(total self µs, module count, top-level modules by cumulative µs) from -X importtime."""
+    total, count, top = 0, 0, []
+    for line in stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m:
+            total += int(m.group(1))
+            count += 1
+            if not m.group(3):
+                top.append((int(m.group(2)), m.group(4)))
+    return total, count, sorted(top, reverse=True)
+
+
+def bench_startup(runs=20, max_ms=None):
+    """
+    Wall-clock time from launch to the first menu and back out, for a
+    database already at the current schema version, against the same launch
+    forced through the full CREATE/migrate path (LIBRARY_SCHEMA_CHECK=full).
+    Fails (exit 1) if the median exceeds `max_ms`.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        _run_main(tmp)  # creates library.db and stamps it
+        floor = statistics.median(
+            timed_run(lambda: subprocess.run([sys.executable, "-c", "pass"], check=True), runs))
+        stamped = statistics.median(timed_run(lambda: _run_main(tmp), runs))
+        full = statistics.median(
+            timed_run(lambda: _run_main(tmp, {"LIBRARY_SCHEMA_CHECK": "full"}), runs))
+        _, stderr = _run_main(tmp, python_args=("-X", "importtime"))
+    total_us, modules, top = import_profile(stderr)
+    print(f"interpreter floor (python -c pass): {floor * 1000:8.1f} ms")
+    print(f"startup, schema stamp current:      {stamped * 1000:8.1f} ms "
+          f"(+{(stamped - floor) * 1000:.1f} ms over the floor)")
+    print(f"startup, forced full schema check:  {full * 1000:8.1f} ms "
+          f"(+{(full - floor) * 1000:.1f} ms over the floor)")
+    print(f"\n-X importtime: {modules} modules, {total_us / 1000:.1f} ms self time; heaviest top-level:")
+    for cumulative, name in top[:8]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+    if max_ms is not None and stamped * 1000 > max_ms:
+        print(f"\nFAIL: median startup {stamped * 1000:.1f} ms > {max_ms} ms")
+        return 1
+    return 0
+
+
+def timed_run(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_streaming(sizes):
+    """
+    Peak traced memory of listing all members: streamed show_all_members vs
+    materializing the table with fetch_all. Streaming must stay flat.
+    """
+    peaks = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(os.path.join(tmp, "bench.db"))
+            db.connect()
+            members = MemberManager(db)
+            members.create_table()
+            fill_members(db, size)
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                streamed = peak_kib(members.show_all_members)
+            materialized = peak_kib(lambda: db.fetch_all("SELECT * FROM member"))
+            db.close()
+        peaks.append(streamed)
+        print(f"{size:>10,} members: streamed peak {streamed:>9.1f} KiB, "
+              f"fetch_all peak {materialized:>10.1f} KiB")
+    # flat: the largest table may not need more than 2x the smallest one's peak
+    flat = max(peaks) <= 2 * min(peaks) + 64
+    print("streaming memory is flat" if flat else "FAIL: streaming memory grows with table size")
+    return 0 if flat else 1
+
+
+def stress_circulation(threads=8, copies=25, attempts=20):
+    """
+    Many desks issue the same book and then return the same loans at once.
+    Stock must never go negative and every loan must be returned exactly once.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, "stress.db"), pool_size=threads + 1)
+        db.connect()
+        create_schema(db)
+        fill_members(db, threads)
+        fill_books(db, 1)
+        db.execute_query("UPDATE book SET quantity_total = ?, quantity_available = ?", (copies, copies))
+        db.commit()
+        borrow = BorrowManager(db)
+        issued, returned = [], []
+
+        def run(target):
+            barrier = threading.Barrier(threads)
+            workers = [threading.Thread(target=target, args=(i, barrier)) for i in range(threads)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+
+        def issue(i, barrier):
+            with db.checkout():
+                barrier.wait()
+                for _ in range(attempts):
+                    borrow_id = borrow.issue_book(i + 1, 1)
+                    if borrow_id is not None:
+                        issued.append(borrow_id)
+
+        def give_back(i, barrier):
+            with db.checkout():
+                barrier.wait()
+                for borrow_id in list(issued):  # every desk tries every loan
+                    if borrow.return_book(borrow_id) is not None:
+                        returned.append(borrow_id)
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            run(issue)
+            after_issue = db.fetch_all("SELECT quantity_available FROM book")[0][0]
+            run(give_back)
+            elapsed = time.perf_counter() - start
+        final = db.fetch_all("SELECT quantity_available FROM book")[0][0]
+        db.close()
+
+    ok = (len(issued) == copies and after_issue == 0 and final == copies
+          and sorted(returned) == sorted(issued))
+    print(f"{threads} desks, {copies} copies: issued {len(issued)}, stock after issue {after_issue}, "
+          f"returned {len(returned)} (unique {len(set(returned))}), final stock {final}, "
+          f"{elapsed:.2f}s")
+    print("ok" if ok else "FAIL: stock or loan state inconsistent")
+    return 0 if ok else 1
+
+
+def bench_batch(commands, commit_every=(0, 1000), seed=42):
+    """
+    Drop-box style work (returns, category moves, deactivations) run one
+    commit per command, as the menu does, vs `main.py --batch`. Every mode
+    starts from the same database and must end in the same state.
+    """
+    import shutil
+    from scripts.commands import BatchParser, Session, run_batch, run_command
+
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        db = DatabaseManager(template)
+        db.connect()
+        create_schema(db)
+        fill_books(db, 20_000, seed=seed)
+        fill_members(db, 5_000, seed=seed)
+        fill_borrows(db, 2 * commands, 5_000, 20_000, open_ratio=0.5, seed=seed)
+        open_loans = [r[0] for r in db.fetch_all("SELECT borrow_id FROM borrow WHERE borrow_status = 'Issued'")]
+        db.close()
+        lines = []
+        for i in range(commands):
+            kind = i % 10
+            if kind < 7 and open_loans:
+                lines.append(f"return {open_loans.pop(rng.randrange(len(open_loans)))}")
+            elif kind < 9:
+                lines.append(f"move-category {rng.randint(1, 20_000)} {rng.randint(1, 5)}")
+            else:
+                lines.append(f"deactivate {rng.randint(1, 5_000)}")
+
+        def state(path):
+            conn = sqlite3.connect(path)
+            try:
+                return (conn.execute("SELECT borrow_id, borrow_status, fine_amount FROM borrow ORDER BY 1").fetchall(),
+                        conn.execute("SELECT book_id, category_id, quantity_available FROM book ORDER BY 1").fetchall(),
+                        conn.execute("SELECT member_id, active_status FROM member ORDER BY 1").fetchall())
+            finally:
+                conn.close()
+
+        def run(label, fn):
+            path = os.path.join(tmp, f"{label}.db")
+            shutil.copy(template, path)
+            db = DatabaseManager(path)
+            db.connect()
+            start = time.perf_counter()
+            fn(Session(db))
+            elapsed = time.perf_counter() - start
+            db.close()
+            print(f"{label:<22} {elapsed:>8.2f}s {commands / elapsed:>10,.0f} commands/sec")
+            return state(path)
+
+        def one_by_one(session):
+            parser = BatchParser()
+            for line in lines:
+                run_command(session, parser.parse(line))
+
+        print(f"{commands:,} commands")
+        expected = run("commit per command", one_by_one)
+        same = True
+        for every in commit_every:
+            with open(os.devnull, "w") as devnull:
+                got = run(f"batch, commit every {every or 'end'}",
+                          lambda session: run_batch(session, lines, every, out=devnull))
+            same = same and got == expected
+        # a category added in a rolled-back chunk must not outlive it in the
+        # category cache: adding it again has to create it for real
+        path = os.path.join(tmp, "rollback.db")
+        shutil.copy(template, path)
+        db = DatabaseManager(path)
+        db.connect()
+        session = Session(db)
+        with open(os.devnull, "w") as devnull:
+            run_batch(session, ["add-category Doomed", "return 0"], stop_on_error=True, out=devnull)
+            run_batch(session, ["add-category Doomed"], out=devnull)
+        cid = session.books.get_category_id("Doomed")
+        no_stale_id = cid is not None and bool(
+            db.fetch_all("SELECT 1 FROM category WHERE category_id = ? AND category_name = 'Doomed'", (cid,)))
+        db.close()
+        print("rolled-back category dropped from the cache" if no_stale_id
+              else f"FAIL: category cache kept id {cid} of a rolled-back category")
+        # a first run creates the schema; stdout must still be only JSON
+        proc = subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--db",
+                               os.path.join(tmp, "fresh.db"), "--batch", "-"],
+                              input="add-category Fresh\nsearch fresh\n", capture_output=True, text=True,
+                              env=dict(os.environ, PYTHONPATH=ROOT))
+        try:
+            records = [json.loads(line) for line in proc.stdout.splitlines()]
+            json_only = len(records) == 3
+        except ValueError:
+            json_only = False
+        print("fresh database: JSON-only output" if json_only
+              else f"FAIL: fresh database run printed non-JSON output:\n{proc.stdout}")
+    ok = same and no_stale_id and json_only
+    print("same final state" if same else "FAIL: batch and one-by-one runs differ")
+    return 0 if ok else 1
+
+
+def bench_typeahead(sizes, queries=2000, seed=42):
+    """
+    In-memory typeahead at each catalog size: build time, memory, lookup
+    latency for one- and two-word prefixes, parity with a brute-force scan
+    and with a fresh build after incremental imports.
+    """
+    from scripts.typeahead import TypeaheadIndex, words
+
+    failed = 0
+    for n, size in enumerate(sizes):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(os.path.join(tmp, "bench.db"))
+            db.connect()
+            create_schema(db)
+            fill_books(db, size, seed=seed)
+            fill_members(db, 10_000, seed=seed)
+            fill_borrows(db, size // 2, 10_000, size, seed=seed)
+            books = BookManager(db)
+            index = books.enable_typeahead()
+            stats = index.stats()
+            print(f"\n{size:,} books: built in {stats['build_seconds']:.1f}s, {stats['words']:,} words, "
+                  f"{stats['crowded_prefixes']:,} precomputed prefixes, {stats['memory_mib']:.0f} MiB")
+
+            rng = random.Random(seed)
+            sample = db.fetch_all("SELECT title, author FROM book ORDER BY RANDOM() LIMIT ?", (queries,))
+            single, multi = [], []
+            for title, author in sample:
+                have = words(f"{title} {author}")
+                w = rng.choice(have)
+                q = w[:rng.randint(1, min(6, len(w)))]
+                if rng.random() < 0.3:
+                    w = rng.choice(have)
+                    multi.append(f"{q} {w[:rng.randint(1, min(6, len(w)))]}")
+                else:
+                    single.append(q)
+            for label, qs in (("one word", single), ("two words", multi)):
+                samples = []
+                for q in qs:
+                    start = time.perf_counter()
+                    index.suggest(q, 10)
+                    samples.append((time.perf_counter() - start) * 1000)
+                samples.sort()
+                print(f"{label:<10} {len(qs):>5} queries: p50 {samples[len(samples) // 2]:.3f} ms, "
+                      f"p99 {samples[int(len(samples) * 0.99)]:.3f} ms, max {samples[-1]:.3f} ms")
+
+            if n == 0:
+                rows = db.fetch_all("""
+                    SELECT b.book_id, b.title, b.author, COALESCE(s.loans, 0) AS loans
+                    FROM book b LEFT JOIN stats_book s ON s.book_id = b.book_id
+                    ORDER BY loans DESC, b.book_id""")
+
+                def brute(q, k=10):
+                    want, found = words(q), []
+                    for row in rows:
+                        have = words(f"{row[1]} {row[2]}")
+                        if all(any(w.startswith(x) for w in have) for x in want):
+                            found.append(tuple(row))
+                            if len(found) == k:
+                                break
+                    return found
+
+                checked = (single[:40] + multi[:20])
+                wrong = [q for q in checked if index.suggest(q, 10) != brute(q)]
+                print(f"brute-force parity: {len(checked) - len(wrong)}/{len(checked)}")
+
+                # same ISBNs with other titles (upsert re-indexes them), then
+                # the same rows under new ISBNs (plain import appends them)
+                changed = os.path.join(tmp, "changed_books.csv")
+                added = os.path.join(tmp, "new_books.csv")
+                write_books_csv(changed, 2_000, seed=seed + 1)
+                with open(changed, encoding="latin-1") as src, \
+                        open(added, "w", encoding="latin-1") as dst:
+                    dst.write(src.readline())
+                    for line in src:
+                        dst.write('"N' + line[1:])
+                with quiet():
+                    books.upsert_books_from_csv(changed)
+                    books.import_books_from_csv(added)
+                    books.add_book(Book("Zyxwv Typeahead", "Q. Incremental", 1, "TA-1", "Self",
+                                        2024, "English", 1, 1, 1, "Desk"))
+                fresh = TypeaheadIndex.build(db)
+                checked += ["zyxwv", "incre typ"]
+                stale = [q for q in checked if index.suggest(q, 10) != fresh.suggest(q, 10)]
+                print(f"incremental vs fresh build: {len(checked) - len(stale)}/{len(checked)} "
+                      f"({len(index):,} vs {len(fresh):,} books)")
+                failed += len(wrong) + len(stale) + (len(index) != len(fresh))
+            db.close()
+    print("ok" if not failed else "FAIL: typeahead results differ")
+    return 1 if failed else 0
+
+
+def bench_fuzzy(sizes, queries=1000, seed=42):
+    """
+    Typo-tolerant search at each catalog size: time to index the words,
+    latency of find_books(fuzzy=True) for misspelt one- and two-word
+    queries, and how often the intended word / book is found. Also checks
+    known misspellings and that new and edited books are picked up.
+    """
+    from scripts.typeahead import words
+
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def typo(word):
+        i = rng.randrange(len(word))
+        kind = rng.randrange(4)
+        if kind == 0:
+            return word[:i] + word[i + 1:]
+        if kind == 1:
+            return word[:i] + rng.choice(letters) + word[i:]
+        if kind == 2:
+            return word[:i] + rng.choice(letters.replace(word[i], "")) + word[i + 1:]
+        i = min(i, len(word) - 2)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+    def latency(samples):
+        samples.sort()
+        return (f"{len(samples)} queries: p50 {samples[len(samples) // 2]:.2f} ms, "
+                f"p99 {samples[int(len(samples) * 0.99)]:.2f} ms, max {samples[-1]:.2f} ms")
+
+    failed = 0
+    for n, size in enumerate(sizes):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(os.path.join(tmp, "bench.db"))
+            db.connect()
+            create_schema(db)
+            fill_books(db, size, seed=seed)
+            books = BookManager(db)
+            start = time.perf_counter()
+            books.sync_search_terms()  # fill_books writes behind the manager's back
+            terms = db.fetch_all("SELECT COUNT(*) FROM search_term")[0][0]
+            grams = db.fetch_all("SELECT COUNT(*) FROM search_term_gram")[0][0]
+            print(f"\n{size:,} books: indexed {terms:,} words ({grams:,} trigram rows) "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+            single, double = [], []
+            for book_id, title, author in db.fetch_all(
+                    "SELECT book_id, title, author FROM book ORDER BY RANDOM() LIMIT ?", (queries,)):
+                have = words(f"{title} {author}")
+                long_words = [w for w in have if len(w) >= 5]
+                if not long_words:
+                    continue
+                word = rng.choice(long_words)
+                misspelt = typo(word)
+                other = rng.choice([w for w in have if w != word] or [word])
+                single.append((misspelt, word))
+                double.append((f"{misspelt} {other}", book_id))
+
+            samples, corrected = [], 0
+            for misspelt, word in single:
+                start = time.perf_counter()
+                books.find_books(misspelt, 20, fuzzy=True)
+                samples.append((time.perf_counter() - start) * 1000)
+                corrected += word.startswith(misspelt) or word in books.fuzzy.corrections(misspelt)
+            print(f"one word  {latency(samples)}; intended word among corrections "
+                  f"{corrected}/{len(single)}")
+            samples, hits = [], 0
+            for query, book_id in double:
+                start = time.perf_counter()
+                rows = books.find_books(query, 20, fuzzy=True)
+                samples.append((time.perf_counter() - start) * 1000)
+                hits += any(row[0] == book_id for row in rows)
+            print(f"two words {latency(samples)}; misspelt book in top 20 {hits}/{len(double)}")
+            failed += corrected < 0.95 * len(single)
+
+            if n == 0:
+                checks = [("grisam", "Grisham"), ("tolkein", "Tolkien"), ("austin", "Austen")]
+                with quiet():
+                    books.add_book(Book("Quixotic Zephyrwind", "M. Pemberley", 1, "FZ-1", "Self",
+                                        2024, "English", 1, 1, 1, "Desk"))
+                db.execute_query("UPDATE book SET title = 'Marvellous Ornithopter' WHERE book_id = 1")
+                # the catalog upsert renaming a book twice: the second rename
+                # finds the book already queued for re-indexing
+                try:
+                    with db.transaction():
+                        for title, digest in (("Wandering Petrel", "r1"), ("Wandering Albatross", "r2")):
+                            db.execute_query(BOOK_UPSERT_QUERY, (title, "K. Seabird", 1, f"{1:010d}", "Self",
+                                                                 2024, "English", 1, 1, 1, "Desk", digest))
+                except sqlite3.Error as e:
+                    failed += 1
+                    print(f"FAIL  upsert renaming a queued book: {e}")
+                db.commit()
+                # searches read the index as it stands: a stale one must not
+                # make them write (they run on the service's reader threads)
+                changes = db.connection.total_changes
+                books.find_books("albatros", 5, fuzzy=True)
+                if db.connection.total_changes != changes or db.connection.in_transaction:
+                    failed += 1
+                    print("FAIL  fuzzy search wrote to the database")
+                books.sync_search_terms()
+                checks += [("zephirwind", "Zephyrwind"), ("pembrley quix", "Pemberley"),
+                           ("ornitopter", "Ornithopter"), ("albatros", "Albatross")]
+                for query, want in checks:
+                    rows = books.find_books(query, 5, fuzzy=True)
+                    ok = bool(rows) and want in f"{rows[0][1]} {rows[0][2]}"
+                    failed += not ok
+                    print(f"{'ok' if ok else 'FAIL':<5} {query!r} -> "
+                          f"{(rows[0][1] + ' / ' + rows[0][2]) if rows else 'nothing'}")
+            db.close()
+    print("ok" if not failed else "FAIL: fuzzy search missed")
+    return 1 if failed else 0
+
+
+class DictBook:
+    # the pre-__slots__ Book layout, for comparison
+    def __init__(self, *values):
+        for name, value in zip(Book.TABLE_COLUMNS, values):
+            setattr(self, name, value)
+
+
+def bench_records(count):
+    """Bytes per in-memory book record: dict-backed class vs slotted Book vs tuple."""
+    # shared field values, so only the per-record container cost is measured
+    values = (1, "Title", "Author", 1, "0000000000", "Publisher", 2001, "English", 0, 5, 5, "Stack A")
+    builders = (
+        ("class with __dict__", lambda: [DictBook(*values) for _ in range(count)]),
+        ("__slots__ Book", lambda: [Book.from_row(values) for _ in range(count)]),
+        ("plain tuple row", lambda: [tuple([*values]) for _ in range(count)]),
+    )
+    for name, build in builders:
+        tracemalloc.start()
+        records = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del records
+        print(f"{name:<20} {current / count:>7.1f} bytes/record  ({current / 2**20:,.1f} MiB for {count:,})")
+    return 0
+
+
+# (name, sql, params, required index or None) for queries that must never
+# regress to a full table scan
+HOT_QUERIES = [
+    ("active borrows", """
+        SELECT br.borrow_id, m.name, b.title, br.borrow_date, br.due_date
+        FROM borrow br
+        JOIN member m ON br.member_id = m.member_id
+        JOIN book b ON br.book_id = b.book_id
+        WHERE br.borrow_status = 'Issued'
+     """, (), "idx_borrow_active"),
+    ("books by category", """
+        SELECT book_id, title, author, quantity_available, shelf_location
+        FROM book WHERE category_id = ? AND (title, book_id) > (?, ?)
+        ORDER BY title ASC, book_id ASC LIMIT ?
+     """, (1, "", 0, 101), "idx_book_category_title"),
+    ("overdue loans", """
+        SELECT member_id, COUNT(*), SUM((julianday(?) - julianday(due_date) - ?) * ?), MIN(due_date)
+        FROM borrow WHERE borrow_status = 'Issued' AND due_date < ? GROUP BY +member_id
+     """, ("2025-01-01", 0, 10.0, "2025-01-01"), "idx_borrow_active"),
+    ("category by name", "SELECT category_id FROM category WHERE category_name = ?", ("General",), None),
+    ("loans of member", "SELECT borrow_id FROM borrow WHERE member_id = ?", (1,), "idx_borrow_member"),
+    ("loans of book", "SELECT borrow_id FROM borrow WHERE book_id = ?", (1,), "idx_borrow_book"),
+    ("employees by role", "SELECT * FROM employee WHERE role = ? ORDER BY salary DESC",
+     ("Archivist",), "idx_employee_role_salary"),
+    ("payroll by role", """
+        SELECT role, COUNT(*), SUM(salary), AVG(salary), MIN(salary), MAX(salary)
+        FROM employee GROUP BY role
+     """, (), "idx_employee_role_salary"),
+    ("employees joined", "SELECT * FROM employee WHERE working_from BETWEEN ? AND ? ORDER BY working_from",
+     ("2020-01-01", "9999-12-31"), "idx_employee_working_from"),
+    ("most borrowed titles", "SELECT book_id, loans FROM stats_book ORDER BY loans DESC LIMIT ?",
+     (10,), "idx_stats_book_loans"),
+    ("loans per category month", "SELECT month, category_id, loans FROM stats_category_month WHERE month >= ?",
+     ("2025-01",), "sqlite_autoindex_stats_category_month_1"),
+    ("fuzzy trigram lookup", """
+        SELECT term, COUNT(*) FROM search_term_gram
+        WHERE gram IN (?, ?, ?) AND length BETWEEN ? AND ?
+        GROUP BY term HAVING COUNT(*) >= ?
+     """, ("  t", " to", "tol", 6, 8, 2), None),
+]
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def check_plans():
+    """
+    Fail (exit 1) if any hot query's plan contains a full table scan or does
+    not use the index it was built for.
+    """
+    db = DatabaseManager(":memory:")
+    db.connect()
+    create_schema(db)
+    failed = False
+    for name, sql, params, index in HOT_QUERIES:
+        plan = db.explain_query_plan(sql, params)
+        bad = any(FULL_SCAN.match(line) for line in plan)
+        if index and not any(f"INDEX {index}" in line for line in plan):
+            bad = True
+        failed = failed or bad
+        print(f"{'FAIL' if bad else 'ok':<5} {name}: {' | '.join(plan)}")
+    db.close()
+    return 1 if failed else 0
+
+
+# (name, check) run by `check`: each returns 0 when it passes
+CHECKS = [
+    ("plans", check_plans),
+    ("classify", lambda: bench_classify(20_000)),
+    ("streaming", lambda: bench_streaming([2_000, 50_000])),
+    ("stress", stress_circulation),
+]
+
+
+def run_checks():
+    failed = []
+    for name, check in CHECKS:
+        print(f"== {name}")
+        if check():
+            failed.append(name)
+    print("all checks passed" if not failed else f"FAIL: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("check", help="all consistency checks at small sizes (exit 1 on failure)")
+
+    p = sub.add_parser("suite", help="end-to-end benchmark on generated data, JSON output")
+    p.add_argument("--books", type=int, default=100_000)
+    p.add_argument("--members", type=int, default=20_000)
+    p.add_argument("--borrows", type=int, default=500_000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--output", default="bench_results.json")
+    p.add_argument("--compare", help="earlier results JSON to compare against")
+
+    p = sub.add_parser("search", help="FTS5 vs LIKE keyword search latency")
+    p.add_argument("--books", type=int, nargs="+", default=[100_000, 1_000_000])
+    p.add_argument("--repeat", type=int, default=50)
+
+    sub.add_parser("plans", help="EXPLAIN QUERY PLAN guard for hot queries")
+
+    p = sub.add_parser("startup", help="main.py launch time and -X importtime profile")
+    p.add_argument("--runs", type=int, default=20)
+    p.add_argument("--max-ms", type=float, help="fail if the median startup is slower")
+
+    p = sub.add_parser("streaming", help="tracemalloc peak of streamed member listing")
+    p.add_argument("--members", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+
+    p = sub.add_parser("stress", help="concurrent issue/return consistency check")
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--copies", type=int, default=25)
+
+    p = sub.add_parser("batch", help="main.py --batch vs one commit per command")
+    p.add_argument("--commands", type=int, default=5_000)
+    p.add_argument("--commit-every", type=int, nargs="+", default=[0, 1000])
+
+    p = sub.add_parser("typeahead", help="in-memory title/author typeahead latency and memory")
+    p.add_argument("--books", type=int, nargs="+", default=[100_000, 1_000_000])
+    p.add_argument("--queries", type=int, default=2000)
+
+    p = sub.add_parser("fuzzy", help="typo-tolerant search latency and recall")
+    p.add_argument("--books", type=int, nargs="+", default=[100_000, 1_000_000])
+    p.add_argument("--queries", type=int, default=1000)
+
+    p = sub.add_parser("records", help="memory per in-memory book record")
+    p.add_argument("--count", type=int, default=1_000_000)
+
+    p = sub.add_parser("classify", help="keyword classifier parity and throughput")
+    p.add_argument("--rows", type=int, default=200_000)
+
+    args = parser.parse_args()
+    if args.command == "check":
+        return run_checks()
+    elif args.command == "suite":
+        return bench_suite(args)
+    elif args.command == "startup":
+        return bench_startup(args.runs, args.max_ms)
+    elif args.command == "search":
+        bench_search(args.books, args.repeat)
+    elif args.command == "plans":
+        return check_plans()
+    elif args.command == "streaming":
+        return bench_streaming(args.members)
+    elif args.command == "stress":
+        return stress_circulation(args.threads, args.copies)
+    elif args.command == "batch":
+        return bench_batch(args.commands, args.commit_every)
+    elif args.command == "typeahead":
+        return bench_typeahead(args.books, args.queries)
+    elif args.command == "fuzzy":
+        return bench_fuzzy(args.books, args.queries)
+    elif args.command == "records":
+        return bench_records(args.count)
+    elif args.command == "classify":
+        return bench_classify(args.rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,66 @@
 
-import csv
+import base64
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+BOOK_INSERT_QUERY = """
+INSERT OR IGNORE INTO book(title, author, category_id, isbn, publisher,
+                           publication_year, language, pages, quantity_total,
+                           quantity_available, shelf_location)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# incremental import: insert new ISBNs, update rows whose content hash changed
+# and leave unchanged rows alone (the WHERE makes them a no-op, not a write).
+# Stock moves by the change in quantity_total so open loans stay counted.
+BOOK_UPSERT_QUERY = """
+INSERT INTO book(title, author, category_id, isbn, publisher,
+                 publication_year, language, pages, quantity_total,
+                 quantity_available, shelf_location, content_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(isbn) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    category_id = excluded.category_id,
+    publisher = excluded.publisher,
+    publication_year = excluded.publication_year,
+    language = excluded.language,
+    quantity_available = MAX(0, quantity_available + excluded.quantity_total - quantity_total),
+    quantity_total = excluded.quantity_total,
+    shelf_location = excluded.shelf_location,
+    content_hash = excluded.content_hash
+WHERE content_hash IS NOT excluded.content_hash
+"""
+
+# keyword search through book_fts; fts5 rank is bm25(book_fts)
+BOOK_FTS_QUERY = """
+SELECT b.book_id, b.title, b.author, c.category_name, b.quantity_available
+FROM book_fts f
+JOIN book b ON b.book_id = f.rowid
+LEFT JOIN category c ON b.category_id = c.category_id
+WHERE book_fts MATCH ?
+ORDER BY f.rank
+LIMIT ?
+"""
 
 class Book:
+    __slots__ = ("book_id", "title", "author", "category_id", "isbn", "publisher",
+                 "publication_year", "language", "pages", "quantity_total",
+                 "quantity_available", "shelf_location")
+    # INSERT column order used by to_params()
+    COLUMNS = ("title", "author", "category_id", "isbn", "publisher", "publication_year",
+               "language", "pages", "quantity_total", "quantity_available", "shelf_location")
+    # `SELECT * FROM book` column order
+    TABLE_COLUMNS = ("book_id",) + COLUMNS
+
     def __init__(self, title, author, category_id, isbn, publisher, 
                  publication_year, language, pages, quantity_total, 
-                 shelf_location, quantity_available=None):
+                 shelf_location, quantity_available=None, book_id=None):
+        self.book_id = book_id
         self.title = title
         self.author = author
         self.category_id = category_id
@@ -21,9 +77,70 @@ class Book:
         else:
             self.quantity_available = quantity_available
 
+    @classmethod
+    def from_row(cls, row, columns=TABLE_COLUMNS):
+        """Build a Book from a row whose column names are `columns`."""
+        d = dict(zip(columns, row))
+        return cls(d.get("title"), d.get("author"), d.get("category_id"), d.get("isbn"),
+                   d.get("publisher"), d.get("publication_year"), d.get("language"),
+                   d.get("pages"), d.get("quantity_total"), d.get("shelf_location"),
+                   d.get("quantity_available"), d.get("book_id"))
+
+    def to_params(self):
+        """Values in COLUMNS order, for INSERT statements."""
+        return (self.title, self.author, self.category_id, self.isbn, self.publisher,
+                self.publication_year, self.language, self.pages, self.quantity_total,
+                self.quantity_available, self.shelf_location)
+
+def _parse_book_row(row):
+    # import params with the category *name* in the category_id slot; the
+    # writer resolves it (module level so ingest worker processes can use it)
+    category_name = ""
+    for key in ("Category", "Book-Category", "Genre"):
+        if row.get(key):
+            category_name = row.get(key).strip()
+            break
+    return BookManager._book_params_from_row(row, category_name)
+
+def _parse_book_row_hashed(row):
+    # upsert params: import params plus a hash of them (category by name)
+    import hashlib
+    params = _parse_book_row(row)
+    if not params[3]:
+        raise ValueError("ISBN is required for an incremental import")
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=8).hexdigest()
+    return params + (digest,)
+
 class BookManager:
     def __init__(self, db_manager):
         self.db = db_manager
+        self._fts_enabled = None
+        # read-through category cache, loaded on first use; shared by the
+        # service's threads, and dropped when a transaction rolls back
+        self._cat_lock = threading.RLock()
+        self._cat_by_name = {}
+        self._cat_by_id = {}
+        self._cat_loaded = False
+        db_manager.on_rollback(self.invalidate_category_cache)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # optional in-memory title/author typeahead (enable_typeahead)
+        self.typeahead = None
+        # typo-tolerant search over book_fts (find_books(fuzzy=True))
+        self.fuzzy = None
+
+    @property
+    def fts_enabled(self):
+        # detected once from the schema, so managers that never ran
+        # create_tables() (services, tools) still use the index
+        if self._fts_enabled is None:
+            self._fts_enabled = bool(self.db.fetch_all(
+                "SELECT 1 FROM sqlite_master WHERE name = 'book_fts'"))
+        return self._fts_enabled
+
+    @fts_enabled.setter
+    def fts_enabled(self, value):
+        self._fts_enabled = value
 
     def create_tables(self):
         query_cat = """
@@ -49,27 +166,161 @@ class BookManager:
             quantity_total INTEGER NOT NULL,
             quantity_available INTEGER NOT NULL,
             shelf_location VARCHAR(20),
+            content_hash VARCHAR(16),
+            updated_at VARCHAR(20) DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (category_id) REFERENCES category(category_id)
         );
         """
         self.db.execute_query(query_book)
+        self.create_search_index()
+        from scripts.fuzzy import FuzzyIndex
+        FuzzyIndex.create_tables(self.db)
         self.add_category("General", "Default category")
+
+    def create_search_index(self):
+        """
+        Create the FTS5 index over title/author/publisher and the triggers
+        that keep it in sync with `book`. Falls back to LIKE search when the
+        SQLite build has no FTS5.
+        """
+        existed = self.db.fetch_all("SELECT 1 FROM sqlite_master WHERE name = 'book_fts'")
+        try:
+            self.db.execute_query("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+                title, author, publisher,
+                content='book', content_rowid='book_id'
+            );
+            """)
+        except sqlite3.OperationalError:
+            self.fts_enabled = False
+            return
+
+        self.db.execute_query("""
+        CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+            INSERT INTO book_fts(rowid, title, author, publisher)
+            VALUES (new.book_id, new.title, new.author, new.publisher);
+        END;
+        """)
+        self.db.execute_query("""
+        CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author, publisher)
+            VALUES ('delete', old.book_id, old.title, old.author, old.publisher);
+        END;
+        """)
+        # only fire when indexed columns change, not on every stock update
+        self.db.execute_query("""
+        CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, author, publisher ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author, publisher)
+            VALUES ('delete', old.book_id, old.title, old.author, old.publisher);
+            INSERT INTO book_fts(rowid, title, author, publisher)
+            VALUES (new.book_id, new.title, new.author, new.publisher);
+        END;
+        """)
+        self.fts_enabled = True
+        if not existed:
+            # index created over an existing catalog
+            self.rebuild_search_index()
+
+    def rebuild_search_index(self):
+        if self.fts_enabled:
+            self.db.execute_query("INSERT INTO book_fts(book_fts) VALUES ('rebuild')")
+            self.db.commit()
     
+    def _cache_category(self, category_id, name):
+        with self._cat_lock:
+            old = self._cat_by_id.get(category_id)
+            if old is not None and old != name:
+                self._cat_by_name.pop(old, None)
+            self._cat_by_id[category_id] = name
+            self._cat_by_name[name] = category_id
+
+    def _load_categories(self):
+        with self._cat_lock:
+            self.cache_misses += 1
+            self._cat_by_name.clear()
+            self._cat_by_id.clear()
+            for cid, name in self.db.fetch_all("SELECT category_id, category_name FROM category"):
+                self._cache_category(cid, name)
+            self._cat_loaded = True
+
+    def invalidate_category_cache(self):
+        with self._cat_lock:
+            self._cat_loaded = False
+            self._cat_by_name.clear()
+            self._cat_by_id.clear()
+
+    def category_cache_stats(self):
+        with self._cat_lock:
+            return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self._cat_by_id)}
+
+    def get_category_id(self, name):
+        """Category id for `name`, or None if there is no such category."""
+        with self._cat_lock:
+            if not self._cat_loaded:
+                self._load_categories()
+                return self._cat_by_name.get(name)
+            if name in self._cat_by_name:
+                self.cache_hits += 1
+                return self._cat_by_name[name]
+            # may have been added by another process since the cache loaded
+            self.cache_misses += 1
+            res = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = ?", (name,))
+            if not res:
+                return None
+            self._cache_category(res[0][0], name)
+            return res[0][0]
+
+    def get_category_name(self, category_id):
+        """Category name for `category_id`, or None if there is no such category."""
+        with self._cat_lock:
+            if not self._cat_loaded:
+                self._load_categories()
+                return self._cat_by_id.get(category_id)
+            if category_id in self._cat_by_id:
+                self.cache_hits += 1
+                return self._cat_by_id[category_id]
+            self.cache_misses += 1
+            res = self.db.fetch_all("SELECT category_name FROM category WHERE category_id = ?", (category_id,))
+            if not res:
+                return None
+            self._cache_category(category_id, res[0][0])
+            return res[0][0]
+
     def get_all_categories(self):
-        return self.db.fetch_all("SELECT category_id, category_name, description FROM category")
+        cats = self.db.fetch_all("SELECT category_id, category_name, description FROM category")
+        # a full listing is a free cache refresh
+        with self._cat_lock:
+            self._cat_by_name.clear()
+            self._cat_by_id.clear()
+            for cid, name, _ in cats:
+                self._cache_category(cid, name)
+            self._cat_loaded = True
+        return cats
+
+    def _insert_category(self, name, description=""):
+        # caller commits; INSERT OR IGNORE makes concurrent adds harmless
+        self.db.execute_query("INSERT OR IGNORE INTO category(category_name, description) VALUES (?, ?)",
+                              (name, description))
+        res = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = ?", (name,))
+        self._cache_category(res[0][0], name)
+        return res[0][0]
+
     def add_category(self, name, description=""):
+        """Returns the category's id (new or existing), or None on error."""
         try:
-            exists = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = ?", (name,))
-            if not exists:
-                query = "INSERT INTO category(category_name, description) VALUES (?, ?)"
-                self.db.execute_query(query, (name, description))
+            category_id = self.get_category_id(name)
+            if category_id is None:
+                category_id = self._insert_category(name, description)
                 self.db.commit()
+            return category_id
         except Exception as e:
+            self.invalidate_category_cache()
             print(f"Error adding category: {e}")
+            return None
 
     def get_default_category_id(self):
-        res = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = 'General'")
-        return res[0][0] if res else 1
+        cid = self.get_category_id("General")
+        return cid if cid is not None else 1
 
     def add_book(self, book, auto_commit=True):
         query = """
@@ -78,104 +329,345 @@ class BookManager:
                          quantity_available, shelf_location)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        values = (book.title, book.author, book.category_id, book.isbn, 
-                  book.publisher, book.publication_year, book.language, 
-                  book.pages, book.quantity_total, book.quantity_available, 
-                  book.shelf_location)
         try:
-            self.db.execute_query(query, values)
+            self.db.execute_query(query, book.to_params())
             if auto_commit:
+                # an uncommitted row may still roll back: the next add or
+                # import indexes it once the caller has committed
                 self.db.commit()
                 print(f"Book '{book.title}' added.")
+                self.sync_search_terms()
+                self._sync_typeahead()
         except Exception as e:
             if "UNIQUE constraint" not in str(e):
                 print(f"Error adding book {book.title}: {e}")
 
-    def import_books_from_csv(self, filename):
-        
+    def _resolve_category(self, name):
+        # cached lookup; unknown names are created in the current import chunk
+        cid = self.get_category_id(name)
+        if cid is None:
+            cid = self._insert_category(name)
+        return cid
+
+    @staticmethod
+    def _book_params_from_row(row, category_id):
+        raw_year = row.get("Year-Of-Publication", "") or row.get("Publication-Year", "") or row.get("Year", "")
+        try:
+            year = int(raw_year)
+        except (ValueError, TypeError):
+            year = 0
+        quantity = int(row.get("Quantity", 5) or 5)  # ValueError -> row rejected
+        return (
+            (row.get("Book-Title") or row.get("Title") or "Unknown")[:99],
+            (row.get("Book-Author") or row.get("Author") or "Unknown")[:99],
+            category_id,
+            (row.get("ISBN") or row.get("Isbn") or "")[:19],
+            (row.get("Publisher") or "Unknown")[:49],
+            year,
+            (row.get("Language") or "English"),
+            0,
+            quantity,
+            quantity,
+            (row.get("Shelf", "Stack A") or "Stack A"),
+        )
+
+    def import_books_from_csv(self, filename, chunk_size=5000, workers=1):
+        """
+        Bulk import books from a CSV file.
+
+        Rows are buffered and written with executemany, one transaction per
+        chunk of `chunk_size` rows. Rows whose ISBN already exists are counted
+        as duplicates; rows that cannot be parsed are rejected. With
+        `workers` > 1 parsing runs in that many processes (scripts.ingest)
+        with the same result.
+        Returns a dict with the import statistics (None on failure).
+        """
+        import csv
+        from scripts.ingest import ingest_csv
         print("Starting Book Import... Please wait.")
-        default_cat_id = self.get_default_category_id()
-        
+        stats = {"rows": 0, "inserted": 0, "duplicates": 0, "rejected": 0}
+        started = time.perf_counter()
+
         try:
+            default_cat_id = self.get_default_category_id()
+
             # detect delimiter
             with open(filename, "r", encoding="latin-1", errors="replace") as f_check:
                 first_line = f_check.readline()
                 delimiter = ';' if ';' in first_line else ','
-            
-            with open(filename, "r", encoding="latin-1", errors="replace") as f:
-                reader = csv.DictReader(f, delimiter=delimiter)
-                count = 0
-                for row in reader:
-                    raw_year = row.get("Year-Of-Publication", "") or row.get("Publication-Year", "") or row.get("Year", "")
-                    try:
-                        year = int(raw_year)
-                    except (ValueError, TypeError):
-                        year = 0
-
-                    # Determine category name from common headers if present
-                    category_name = ""
-                    for key in ("Category", "Book-Category", "Genre"):
-                        if row.get(key):
-                            category_name = row.get(key).strip()
-                            break
-
-                    # If category provided, ensure it exists and get id
-                    if category_name:
-                        cat_res = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = ?", (category_name,))
-                        if not cat_res:
-                            # create category
-                            try:
-                                self.add_category(category_name)
-                            except Exception:
-                                pass
-                            cat_res = self.db.fetch_all("SELECT category_id FROM category WHERE category_name = ?", (category_name,))
-                        category_id = cat_res[0][0] if cat_res else default_cat_id
-                    else:
-                        category_id = default_cat_id
-
-                    new_book = Book(
-                        title=(row.get("Book-Title") or row.get("Title") or "Unknown")[:99],
-                        author=(row.get("Book-Author") or row.get("Author") or "Unknown")[:99],
-                        category_id=category_id,
-                        isbn=(row.get("ISBN") or row.get("Isbn") or "")[:19],
-                        publisher=(row.get("Publisher") or "Unknown")[:49],
-                        publication_year=year,
-                        language=(row.get("Language") or "English"),
-                        pages=0,
-                        quantity_total=int(row.get("Quantity", 5) or 5),
-                        shelf_location=(row.get("Shelf", "Stack A") or "Stack A")
-                    )
-                    self.add_book(new_book, auto_commit=False)
-                    count += 1
-                    if count % 1000 == 0:
-                        print(f"Processed {count} books...")
 
-            self.db.commit()
-            print(f"SUCCESS: Imported {count} books!")
+            if workers > 1:
+                stats.update(ingest_csv(
+                    self.db, filename, _parse_book_row, BOOK_INSERT_QUERY, workers=workers,
+                    encoding="latin-1", delimiter=delimiter, batch_rows=max(chunk_size, 20_000),
+                    prepare_batch=lambda rows: self._resolve_batch_categories(rows, default_cat_id),
+                    label="books"))
+            else:
+                with open(filename, "r", encoding="latin-1", errors="replace") as f:
+                    reader = csv.DictReader(f, delimiter=delimiter)
+                    batch = []
+                    for row in reader:
+                        stats["rows"] += 1
+                        try:
+                            batch.append(_parse_book_row(row))
+                        except (ValueError, TypeError):
+                            stats["rejected"] += 1
+                            continue
+
+                        if len(batch) >= chunk_size:
+                            stats["inserted"] += self._flush_book_batch(batch, default_cat_id)
+                            batch = []
+                            print(f"Processed {stats['rows']} books...")
+
+                    if batch:
+                        stats["inserted"] += self._flush_book_batch(batch, default_cat_id)
+            self.sync_search_terms()
         except FileNotFoundError:
             print("Error: File not found.")
+            return None
         except Exception as e:
+            self.db.connection.rollback()
+            self.invalidate_category_cache()  # may hold rolled-back categories
             print(f"Error importing books: {e}")
+            return None
+
+        self._sync_typeahead()
+        elapsed = time.perf_counter() - started
+        stats["duplicates"] = stats["rows"] - stats["rejected"] - stats["inserted"]
+        stats["seconds"] = elapsed
+        stats["rows_per_sec"] = stats["rows"] / elapsed if elapsed > 0 else 0.0
+        print(f"SUCCESS: Imported {stats['inserted']} books "
+              f"({stats['duplicates']} duplicates, {stats['rejected']} rejected) "
+              f"from {stats['rows']} rows in {elapsed:.2f}s "
+              f"({stats['rows_per_sec']:.0f} rows/sec).")
+        return stats
+
+    def _resolve_batch_categories(self, batch, default_cat_id):
+        # parsed rows carry the category name; swap in its id (creating new
+        # categories inside the caller's transaction)
+        return [row[:2] + (self._resolve_category(row[2]) if row[2] else default_cat_id,) + row[3:]
+                for row in batch]
+
+    def _flush_book_batch(self, batch, default_cat_id, query=BOOK_INSERT_QUERY):
+        # one transaction per chunk; rowcount only counts rows actually written
+        with self.db.transaction():
+            return self.db.execute_many(query, self._resolve_batch_categories(batch, default_cat_id))
+
+    @staticmethod
+    def add_content_hash_column(db):
+        """Migration step: give older `book` tables the content_hash column."""
+        columns = [row[1] for row in db.fetch_all("PRAGMA table_info(book)")]
+        if columns and "content_hash" not in columns:
+            db.execute_query("ALTER TABLE book ADD COLUMN content_hash VARCHAR(16)")
+
+    @staticmethod
+    def _file_fingerprint(filename):
+        import hashlib
+        st = os.stat(filename)
+        with open(filename, "rb") as f:
+            head = hashlib.blake2b(f.read(1 << 16), digest_size=8).hexdigest()
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "head": head}
+
+    @staticmethod
+    def _save_checkpoint(path, checkpoint):
+        # write-then-rename so a crash never leaves a half-written checkpoint
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, path)
+
+    def upsert_books_from_csv(self, filename, chunk_size=5000, checkpoint_path=None, restart=False):
+        """
+        Incremental import keyed on ISBN: new ISBNs are inserted, existing
+        books are updated only when their content hash changed, unchanged
+        rows cost no write. Rows without an ISBN are rejected.
+
+        Progress is checkpointed to `checkpoint_path` (default
+        <filename>.checkpoint) after every committed chunk, so an interrupted
+        import of the same file resumes at the last committed row; the
+        checkpoint is removed when the import finishes. `restart=True`
+        ignores an existing checkpoint.
+        Returns a dict with the import statistics (None on failure).
+        """
+        import csv
+        checkpoint_path = checkpoint_path or filename + ".checkpoint"
+        stats = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0}
+        started = time.perf_counter()
+        # updated_at is CURRENT_TIMESTAMP (UTC); rows touched from here on are re-indexed
+        sync_since = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        try:
+            fingerprint = self._file_fingerprint(filename)
+            checkpoint = None
+            if not restart and os.path.exists(checkpoint_path):
+                with open(checkpoint_path, encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+                if checkpoint.get("fingerprint") != fingerprint:
+                    print("Checkpoint is for a different version of the file; starting over.")
+                    checkpoint = None
+            default_cat_id = self.get_default_category_id()
+
+            with open(filename, "rb") as f:
+                header = f.readline()
+                text = header.decode("latin-1")
+                delimiter = ';' if ';' in text else ','
+                fieldnames = next(csv.reader([text], delimiter=delimiter))
+                offset = len(header)
+                if checkpoint:
+                    offset = checkpoint["offset"]
+                    stats.update(checkpoint["stats"])
+                    f.seek(offset)
+                    print(f"Resuming import at row {stats['rows']} (byte {offset}).")
+
+                # lines are decoded and parsed a chunk at a time; records must
+                # not contain embedded newlines, as in books.csv
+                lines = []
+                for line in f:
+                    lines.append(line.decode("latin-1"))
+                    offset += len(line)
+                    if len(lines) >= chunk_size:
+                        self._upsert_chunk(lines, fieldnames, delimiter, default_cat_id, stats)
+                        self._save_checkpoint(checkpoint_path, {
+                            "fingerprint": fingerprint, "offset": offset, "stats": stats})
+                        lines = []
+                        print(f"Processed {stats['rows']} books...")
+                if lines:
+                    self._upsert_chunk(lines, fieldnames, delimiter, default_cat_id, stats)
+            self.sync_search_terms()
+        except FileNotFoundError:
+            print("Error: File not found.")
+            return None
+        except Exception as e:
+            self.invalidate_category_cache()  # may hold rolled-back categories
+            print(f"Error importing books: {e} (re-run to resume from the last checkpoint)")
+            return None
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self._sync_typeahead(since=sync_since)
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = elapsed
+        print(f"SUCCESS: {stats['inserted']} new, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged, {stats['rejected']} rejected "
+              f"from {stats['rows']} rows in {elapsed:.2f}s.")
+        return stats
+
+    def _upsert_chunk(self, lines, fieldnames, delimiter, default_cat_id, stats):
+        import csv
+        batch = []
+        for row in csv.DictReader(lines, fieldnames=fieldnames, delimiter=delimiter):
+            stats["rows"] += 1
+            try:
+                batch.append(_parse_book_row_hashed(row))
+            except (ValueError, TypeError):
+                stats["rejected"] += 1
+        with self.db.transaction():
+            last_id = self.db.fetch_all("SELECT COALESCE(MAX(book_id), 0) FROM book")[0][0]
+            written = self._flush_book_batch(batch, default_cat_id, BOOK_UPSERT_QUERY)
+            # new rows are the ones past the old max id; the rest of `written` were updates
+            inserted = self.db.fetch_all("SELECT COUNT(*) FROM book WHERE book_id > ?", (last_id,))[0][0]
+        stats["inserted"] += inserted
+        stats["updated"] += written - inserted
+        stats["unchanged"] += len(batch) - written
+
+    @staticmethod
+    def _encode_page_token(direction, key, scope):
+        payload = json.dumps({"d": direction, "k": list(key), "s": scope}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def _decode_page_token(token, scope):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            direction, key = payload["d"], payload["k"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid page token")
+        if payload.get("s") != scope or direction not in ("next", "prev"):
+            raise ValueError("Page token does not belong to this listing")
+        return direction, key
+
+    def _keyset_page(self, select_from, conditions, params, key_columns, key_of,
+                     token, page_size, scope):
+        """
+        Seek pagination on `key_columns`. Every page is a single index range
+        scan of page_size + 1 rows, however deep it is.
+        Returns (rows, next_token, prev_token); tokens are None at either end.
+        """
+        direction, boundary = ("next", None) if token is None else self._decode_page_token(token, scope)
+        conditions = list(conditions)
+        params = list(params)
+        key = ", ".join(key_columns)
+        if boundary is not None:
+            op = ">" if direction == "next" else "<"
+            conditions.append(f"({key}) {op} ({', '.join('?' * len(key_columns))})")
+            params.extend(boundary)
+        order = " ASC" if direction == "next" else " DESC"
+        query = select_from
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(c + order for c in key_columns) + " LIMIT ?"
+        params.append(page_size + 1)
+
+        rows = self.db.fetch_all(query, tuple(params))
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "prev":
+            rows.reverse()
+        if not rows:
+            return rows, None, None
+
+        if direction == "next":
+            has_next, has_prev = more, boundary is not None
+        else:
+            has_next, has_prev = True, more
+        next_token = self._encode_page_token("next", key_of(rows[-1]), scope) if has_next else None
+        prev_token = self._encode_page_token("prev", key_of(rows[0]), scope) if has_prev else None
+        return rows, next_token, prev_token
+
+    def get_books_page(self, token=None, page_size=100):
+        """
+        One page of (book_id, title, author, category_name, quantity_available,
+        shelf_location) ordered by book_id.
+        """
+        select_from = """
+        SELECT b.book_id, b.title, b.author, c.category_name, b.quantity_available, b.shelf_location
+        FROM book b
+        LEFT JOIN category c ON b.category_id = c.category_id
+        """
+        return self._keyset_page(select_from, [], [], ["b.book_id"],
+                                 lambda r: (r[0],), token, page_size, "all")
+
+    def get_category_books_page(self, category_id, token=None, page_size=100):
+        """
+        One page of (book_id, title, author, quantity_available, shelf_location)
+        in `category_id`, ordered by title.
+        """
+        select_from = """
+        SELECT book_id, title, author, quantity_available, shelf_location
+        FROM book
+        """
+        return self._keyset_page(select_from, ["category_id = ?"], [category_id],
+                                 ["title", "book_id"], lambda r: (r[1], r[0]),
+                                 token, page_size, f"cat:{category_id}")
+
+    @staticmethod
+    def _page_prompt(next_token, prev_token):
+        options = []
+        if next_token:
+            options.append("[Enter] next")
+        if prev_token:
+            options.append("'p' previous")
+        options.append("'q' to Quit")
+        return ", ".join(options) + ": "
+
+    def show_all_books(self, page_size=100):
+        token = None
+        first_row = 1
 
-    def show_all_books(self):
-        limit = 100  # <--- CHANGED TO 100 PER PAGE
-        offset = 0
-        
         while True:
-            # Fetch batch of 100
-            query = """
-            SELECT b.book_id, b.title, b.author, c.category_name, b.quantity_available, b.shelf_location
-            FROM book b
-            LEFT JOIN category c ON b.category_id = c.category_id
-            LIMIT ? OFFSET ?
-            """
-            books = self.db.fetch_all(query, (limit, offset))
-            
+            books, next_token, prev_token = self.get_books_page(token, page_size)
+
             if not books:
-                if offset == 0:
-                    print("No books found.")
-                else:
-                    print("\n--- End of List ---")
+                print("No books found.")
                 break
 
             header_fmt = "{:<5} {:<30} {:<20} {:<15} {:<8} {:<10}"
@@ -191,64 +683,153 @@ class BookManager:
             print("="*100)
             
             # Show current range
-            print(f"\nDisplaying rows {offset + 1} - {offset + len(books)}")
-            
-            # Check if we reached the end
-            if len(books) < limit:
+            print(f"\nDisplaying rows {first_row} - {first_row + len(books) - 1}")
+            if not next_token:
                 print("--- End of List ---")
-                break
+                if not prev_token:
+                    break
 
             # Navigation
-            cont = input("Press [Enter] for next 100, or 'q' to Quit: ")
-            if cont.lower() == 'q':
+            cont = input(self._page_prompt(next_token, prev_token)).lower()
+            if cont == 'q':
+                break
+            if cont == 'p' and prev_token:
+                token = prev_token
+                first_row = max(1, first_row - page_size)
+            elif next_token:
+                token = next_token
+                first_row += len(books)
+            else:
                 break
-            
-            # Move offset forward
-            offset += limit
 
-    def show_books_by_category(self, category_id):
+    def show_books_by_category(self, category_id, page_size=100):
         """
-        Print books for a given category_id.
+        Print books for a given category_id, one page at a time.
         """
         # Get category name for header
-        cat_res = self.db.fetch_all("SELECT category_name FROM category WHERE category_id = ?", (category_id,))
-        cat_name = cat_res[0][0] if cat_res else f"ID {category_id}"
+        cat_name = self.get_category_name(category_id) or f"ID {category_id}"
 
-        query = """
-        SELECT book_id, title, author, quantity_available, shelf_location
-        FROM book
-        WHERE category_id = ?
-        ORDER BY title
-        LIMIT 1000
-        """
-        books = self.db.fetch_all(query, (category_id,))
+        token = None
+        while True:
+            books, next_token, prev_token = self.get_category_books_page(category_id, token, page_size)
 
-        if not books:
-            print(f"No books found for category: {cat_name}")
-            return
+            if not books:
+                print(f"No books found for category: {cat_name}")
+                return
 
-        header_fmt = "{:<6} {:<40} {:<25} {:<7} {:<10}"
-        print("\n" + "="*100)
-        print(f"Category: {cat_name}")
-        print(header_fmt.format("ID", "Title", "Author", "Avail", "Loc"))
-        print("-" * 100)
+            header_fmt = "{:<6} {:<40} {:<25} {:<7} {:<10}"
+            print("\n" + "="*100)
+            print(f"Category: {cat_name}")
+            print(header_fmt.format("ID", "Title", "Author", "Avail", "Loc"))
+            print("-" * 100)
 
-        for b in books:
-            b_id, title, author, avail, loc = b
-            print(header_fmt.format(b_id, str(title).strip()[:38], str(author).strip()[:23], avail, loc))
-        print("="*100 + "\n")
+            for b in books:
+                b_id, title, author, avail, loc = b
+                print(header_fmt.format(b_id, str(title).strip()[:38], str(author).strip()[:23], avail, loc))
+            print("="*100 + "\n")
+
+            if not next_token and not prev_token:
+                return
+            cont = input(self._page_prompt(next_token, prev_token)).lower()
+            if cont == 'q':
+                return
+            if cont == 'p' and prev_token:
+                token = prev_token
+            elif next_token:
+                token = next_token
+            else:
+                return
 
-    def search_books(self, keyword):
-        keyword = f"%{keyword}%"
+    def find_books(self, keyword, limit=20, fuzzy=False):
+        """
+        Return (book_id, title, author, category_name, quantity_available)
+        rows matching `keyword`, best matches first. With `fuzzy`, words of
+        four letters or more may be misspelt (see scripts/fuzzy.py) and the
+        books needing the fewest corrections come first.
+        """
+        if fuzzy:
+            return self._find_books_fuzzy(keyword, limit)
+        tokens = re.findall(r"\w+", keyword)
+        if self.fts_enabled and tokens:
+            # every word must match, each as a prefix: "harr pot" -> "harr"* "pot"*
+            match = " ".join(f'"{t}"*' for t in tokens)
+            return self.db.fetch_all(BOOK_FTS_QUERY, (match, limit))
+
+        pattern = f"%{keyword}%"
         query = """
         SELECT b.book_id, b.title, b.author, c.category_name, b.quantity_available
         FROM book b
         LEFT JOIN category c ON b.category_id = c.category_id
         WHERE b.title LIKE ? OR b.author LIKE ?
-        LIMIT 20
+        LIMIT ?
         """
-        books = self.db.fetch_all(query, (keyword, keyword))
-        
+        return self.db.fetch_all(query, (pattern, pattern, limit))
+
+    def _find_books_fuzzy(self, keyword, limit):
+        if not self.fts_enabled:
+            print("Fuzzy search needs SQLite FTS5.")
+            return []
+        from scripts.fuzzy import FuzzyIndex, max_edits
+        expanded = FuzzyIndex.as_typed(keyword)
+        if not expanded:
+            return []
+        found, seen, tried = [], set(), set()
+        # as typed first, then allowing one edit per word, then two
+        for max_edit in range(max(max_edits(word) for word, _ in expanded) + 1):
+            if max_edit == 1:
+                expanded = self._fuzzy_index().expand(keyword)
+            match = FuzzyIndex.match(expanded, max_edit)
+            if match in tried:
+                continue
+            tried.add(match)
+            rows = [row for row in self.db.fetch_all(BOOK_FTS_QUERY, (match, 4 * limit))
+                    if row[0] not in seen]
+            # fewest edits first; sort is stable, so bm25 order within
+            rows.sort(key=lambda row: FuzzyIndex.edits(expanded, f"{row[1]} {row[2]}"))
+            seen.update(row[0] for row in rows)
+            found.extend(rows)
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def _fuzzy_index(self):
+        if self.fuzzy is None:
+            from scripts.fuzzy import FuzzyIndex
+            self.fuzzy = FuzzyIndex(self.db)
+        return self.fuzzy
+
+    def sync_search_terms(self):
+        """
+        Index the words of new and renamed books for fuzzy search. This
+        writes, so it belongs on the write path (adds and imports call it);
+        searches use the index as it stands.
+        """
+        return self._fuzzy_index().catch_up()
+
+    def enable_typeahead(self):
+        """Build the in-memory typeahead; inserts through this manager keep it current."""
+        from scripts.typeahead import TypeaheadIndex
+        self.typeahead = TypeaheadIndex.build(self.db)
+        return self.typeahead
+
+    def _sync_typeahead(self, since=None):
+        if self.typeahead is not None:
+            self.typeahead.catch_up(self.db, since)
+
+    def suggest_books(self, text, k=10):
+        """(book_id, title, author, loans) typeahead suggestions for `text`."""
+        if self.typeahead is None:
+            self.enable_typeahead()
+        return self.typeahead.suggest(text, k)
+
+    def search_books(self, keyword, fuzzy=False):
+        books = self.find_books(keyword, fuzzy=fuzzy)
+        if not books and not fuzzy and self.fts_enabled:
+            # most likely a misspelt title or author: offer the closest ones
+            books = self.find_books(keyword, fuzzy=True)
+            if books:
+                print("No exact matches. Closest spellings:")
+
         if not books:
             print("No matching books found.")
             return
@@ -263,22 +844,33 @@ class BookManager:
 
     def update_category(self, category_id, new_name):
         try:
-            self.db.execute_query(
+            cur = self.db.execute_query(
                 "UPDATE category SET category_name = ? WHERE category_id = ?",
                 (new_name, category_id)
             )
             self.db.commit()
+            if cur.rowcount:
+                self._cache_category(category_id, new_name)
             print(f"Category {category_id} updated to '{new_name}'.")
         except Exception as e:
+            self.invalidate_category_cache()
             print(f"Error updating category: {e}")
 
     def assign_book_to_category(self, book_id, category_id):
+        if self.get_category_name(category_id) is None:
+            print(f"Category ID {category_id} not found.")
+            return False
         try:
-            self.db.execute_query(
+            cur = self.db.execute_query(
                 "UPDATE book SET category_id = ? WHERE book_id = ?",
                 (category_id, book_id)
             )
             self.db.commit()
-            print(f"Book {book_id} moved to category {category_id}.")
         except Exception as e:
-            print(f"Error assigning book to category: {e}")
\ No newline at end of file
+            print(f"Error assigning book to category: {e}")
+            return False
+        if cur.rowcount == 0:
+            print("Book ID not found.")
+            return False
+        print(f"Book {book_id} moved to category {category_id}.")
+        return True
\ No newline at end of file
@@ -1,4 +1,22 @@
+import sqlite3
 from datetime import datetime, timedelta
+from itertools import chain
+
+# fine policy, shared by returns and the overdue report (scripts.overdue);
+# main.py takes it from LIBRARY_FINE_PER_DAY / LIBRARY_GRACE_DAYS
+FINE_PER_DAY = 10.0  # currency units per overdue day
+GRACE_DAYS = 0       # days past due before a loan is fined
+
+
+def set_fine_policy(fine_per_day=None, grace_days=None):
+    """Change the fine rate and/or grace period for every manager."""
+    global FINE_PER_DAY, GRACE_DAYS
+    if fine_per_day is not None:
+        FINE_PER_DAY = float(fine_per_day)
+    if grace_days is not None:
+        GRACE_DAYS = int(grace_days)
+
+
 class BorrowManager:
     def __init__(self, db_manager):
         self.db = db_manager
@@ -21,56 +39,205 @@ class BorrowManager:
         self.db.execute_query(query)
 
     def issue_book(self, member_id, book_id, days_to_return=14):
-        check_query = "SELECT quantity_available, title FROM book WHERE book_id = ?"
-        book_data = self.db.fetch_all(check_query, (book_id,))
-        
-        if not book_data:
-            print("Error: Book ID not found.")
-            return
-        qty, title = book_data[0]
-        if qty <= 0:
-            print(f"Sorry, '{title}' is out of stock.")
-            return
-
+        """
+        Issue one copy atomically: the stock decrement only succeeds while a
+        copy is available, so concurrent desks can never over-issue.
+        Returns the new borrow_id, or None if nothing was issued.
+        """
         today = datetime.now().strftime("%Y-%m-%d")
         due = (datetime.now() + timedelta(days=days_to_return)).strftime("%Y-%m-%d")
 
         try:
-            # Issue Book
-            self.db.execute_query("INSERT INTO borrow(member_id, book_id, borrow_date, due_date, borrow_status) VALUES(?, ?, ?, ?, 'Issued')", 
-                                  (member_id, book_id, today, due))
-            # Decrease Stock
-            self.db.execute_query("UPDATE book SET quantity_available = quantity_available - 1 WHERE book_id = ?", (book_id,))
-            self.db.commit()
-            print(f"SUCCESS: '{title}' issued to Member ID {member_id}. Due: {due}")
-        except Exception as e:
+            with self.db.transaction(immediate=True):
+                member = self.db.fetch_all("SELECT active_status FROM member WHERE member_id = ?", (member_id,))
+                if not member:
+                    print("Error: Member ID not found.")
+                    return None
+                if member[0][0] != 'Active':
+                    print(f"Error: Member ID {member_id} is {member[0][0]}.")
+                    return None
+
+                # Decrease Stock, only if a copy is left
+                cur = self.db.execute_query(
+                    "UPDATE book SET quantity_available = quantity_available - 1 "
+                    "WHERE book_id = ? AND quantity_available > 0", (book_id,))
+                decremented = cur.rowcount
+                book_data = self.db.fetch_all("SELECT title FROM book WHERE book_id = ?", (book_id,))
+                if not book_data:
+                    print("Error: Book ID not found.")
+                    return None
+                title = book_data[0][0]
+                if decremented == 0:
+                    print(f"Sorry, '{title}' is out of stock.")
+                    return None
+
+                # Issue Book
+                cur = self.db.execute_query(
+                    "INSERT INTO borrow(member_id, book_id, borrow_date, due_date, borrow_status) "
+                    "VALUES(?, ?, ?, ?, 'Issued')", (member_id, book_id, today, due))
+                borrow_id = cur.lastrowid
+        except sqlite3.Error as e:
             print(f"Transaction Failed: {e}")
+            return None
+
+        print(f"SUCCESS: '{title}' issued to Member ID {member_id}. Due: {due}")
+        return borrow_id
 
     def return_book(self, borrow_id):
-        record = self.db.fetch_all("SELECT book_id, due_date, borrow_status FROM borrow WHERE borrow_id = ?", (borrow_id,))
-        if not record:
-            print("Transaction ID not found.")
-            return
-        book_id, due_date_str, status = record[0]
-        
-        if status == 'Returned':
-            print("Book already returned.")
-            return
+        """
+        Return a loan atomically: only a loan still 'Issued' is closed, so it
+        can't be returned (and restocked) twice. The fine is computed in SQL:
+        FINE_PER_DAY for each day past due after GRACE_DAYS.
+        Returns the fine, or None if nothing was returned.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
 
-        today_obj = datetime.now()
-        due_obj = datetime.strptime(due_date_str, "%Y-%m-%d")
-        fine = max(0, (today_obj - due_obj).days * 10.0) # 10 currency units fine per day
+        try:
+            with self.db.transaction(immediate=True):
+                # Update Return
+                cur = self.db.execute_query("""
+                    UPDATE borrow
+                    SET return_date = ?, borrow_status = 'Returned',
+                        fine_amount = COALESCE(MAX(0, julianday(?) - julianday(due_date) - ?), 0) * ?
+                    WHERE borrow_id = ? AND borrow_status = 'Issued'
+                    """, (today, today, GRACE_DAYS, FINE_PER_DAY, borrow_id))
+                if cur.rowcount == 0:
+                    exists = self.db.fetch_all("SELECT 1 FROM borrow WHERE borrow_id = ?", (borrow_id,))
+                    print("Book already returned." if exists else "Transaction ID not found.")
+                    return None
+                # Increase Stock
+                self.db.execute_query(
+                    "UPDATE book SET quantity_available = quantity_available + 1 "
+                    "WHERE book_id = (SELECT book_id FROM borrow WHERE borrow_id = ?)", (borrow_id,))
+                fine = self.db.fetch_all("SELECT fine_amount FROM borrow WHERE borrow_id = ?", (borrow_id,))[0][0]
+        except sqlite3.Error as e:
+            print(f"Error: {e}")
+            return None
+
+        print(f"Book returned. Fine: {fine}")
+        return fine
+
+    def issue_books(self, member_id, book_ids, days_to_return=14):
+        """
+        Issue several books to one member in a single transaction.
+        Returns one result dict per requested book_id, in order, with a
+        status of 'issued', 'out_of_stock', 'not_found', 'member_not_found'
+        or 'member_inactive'.
+        """
+        book_ids = list(book_ids)
+        if not book_ids:
+            return []
+        today = datetime.now().strftime("%Y-%m-%d")
+        due = (datetime.now() + timedelta(days=days_to_return)).strftime("%Y-%m-%d")
+        results = [{"book_id": b_id, "status": "not_found", "borrow_id": None, "title": None}
+                   for b_id in book_ids]
+
+        try:
+            with self.db.transaction(immediate=True):
+                member = self.db.fetch_all("SELECT active_status FROM member WHERE member_id = ?", (member_id,))
+                if not member or member[0][0] != 'Active':
+                    for r in results:
+                        r["status"] = "member_inactive" if member else "member_not_found"
+                else:
+                    distinct = list(dict.fromkeys(book_ids))
+                    marks = ", ".join("?" * len(distinct))
+                    stock = {b_id: [title, qty] for b_id, title, qty in self.db.fetch_all(
+                        f"SELECT book_id, title, quantity_available FROM book WHERE book_id IN ({marks})",
+                        distinct)}
+
+                    taken = {}
+                    for r in results:
+                        entry = stock.get(r["book_id"])
+                        if entry is None:
+                            continue
+                        r["title"] = entry[0]
+                        if entry[1] <= 0:
+                            r["status"] = "out_of_stock"
+                            continue
+                        entry[1] -= 1
+                        taken[r["book_id"]] = taken.get(r["book_id"], 0) + 1
+                        cur = self.db.execute_query(
+                            "INSERT INTO borrow(member_id, book_id, borrow_date, due_date, borrow_status) "
+                            "VALUES(?, ?, ?, ?, 'Issued')", (member_id, r["book_id"], today, due))
+                        r["status"] = "issued"
+                        r["borrow_id"] = cur.lastrowid
+
+                    if taken:
+                        updated = self.db.execute_many(
+                            "UPDATE book SET quantity_available = quantity_available - ? "
+                            "WHERE book_id = ? AND quantity_available >= ?",
+                            [(n, b_id, n) for b_id, n in taken.items()])
+                        if updated != len(taken):
+                            raise sqlite3.IntegrityError("stock changed during batch issue")
+        except sqlite3.Error as e:
+            print(f"Transaction Failed: {e}")
+            for r in results:
+                r["status"], r["borrow_id"] = "failed", None
+            return results
+
+        for r in results:
+            if r["status"] == "issued":
+                print(f"SUCCESS: '{r['title']}' issued to Member ID {member_id}. Due: {due}")
+            else:
+                print(f"Book ID {r['book_id']}: {r['status'].replace('_', ' ')}")
+        return results
+
+    def return_books(self, borrow_ids):
+        """
+        Return several loans in a single transaction.
+        Returns one result dict per borrow_id, in order, with a status of
+        'returned' (plus the fine), 'already_returned' or 'not_found'.
+        """
+        borrow_ids = list(borrow_ids)
+        if not borrow_ids:
+            return []
+        today = datetime.now().strftime("%Y-%m-%d")
+        results = [{"borrow_id": b_id, "status": "not_found", "fine": None} for b_id in borrow_ids]
+        distinct = list(dict.fromkeys(borrow_ids))
+        marks = ", ".join("?" * len(distinct))
 
         try:
-            # Update Return
-            self.db.execute_query("UPDATE borrow SET return_date = ?, borrow_status = 'Returned', fine_amount = ? WHERE borrow_id = ?", 
-                                  (today_obj.strftime("%Y-%m-%d"), fine, borrow_id))
-            # Increase Stock
-            self.db.execute_query("UPDATE book SET quantity_available = quantity_available + 1 WHERE book_id = ?", (book_id,))
-            self.db.commit()
-            print(f"Book returned. Fine: {fine}")
-        except Exception as e:
+            with self.db.transaction(immediate=True):
+                loans = {b_id: (book_id, status) for b_id, book_id, status in self.db.fetch_all(
+                    f"SELECT borrow_id, book_id, borrow_status FROM borrow WHERE borrow_id IN ({marks})",
+                    distinct)}
+                open_ids = [b_id for b_id in distinct if loans.get(b_id, (None, None))[1] == 'Issued']
+                if open_ids:
+                    open_marks = ", ".join("?" * len(open_ids))
+                    self.db.execute_query(f"""
+                        UPDATE borrow
+                        SET return_date = ?, borrow_status = 'Returned',
+                            fine_amount = COALESCE(MAX(0, julianday(?) - julianday(due_date) - ?), 0) * ?
+                        WHERE borrow_id IN ({open_marks}) AND borrow_status = 'Issued'
+                        """, (today, today, GRACE_DAYS, FINE_PER_DAY, *open_ids))
+                    restock = {}
+                    for b_id in open_ids:
+                        restock[loans[b_id][0]] = restock.get(loans[b_id][0], 0) + 1
+                    self.db.execute_many(
+                        "UPDATE book SET quantity_available = quantity_available + ? WHERE book_id = ?",
+                        [(n, book_id) for book_id, n in restock.items()])
+                    fines = dict(self.db.fetch_all(
+                        f"SELECT borrow_id, fine_amount FROM borrow WHERE borrow_id IN ({open_marks})",
+                        open_ids))
+        except sqlite3.Error as e:
             print(f"Error: {e}")
+            for r in results:
+                r["status"] = "failed"
+            return results
+
+        pending = set(open_ids)
+        for r in results:
+            b_id = r["borrow_id"]
+            if b_id in pending:
+                pending.discard(b_id)  # a repeated scan of the same loan is already returned
+                r["status"], r["fine"] = "returned", fines[b_id]
+                print(f"Borrow ID {b_id}: returned. Fine: {r['fine']}")
+            elif b_id in loans:
+                r["status"] = "already_returned"
+                print(f"Borrow ID {b_id}: already returned.")
+            else:
+                print(f"Borrow ID {b_id}: not found.")
+        return results
 
     def show_active_borrows(self):
         query = """
@@ -80,13 +247,14 @@ class BorrowManager:
         JOIN book b ON br.book_id = b.book_id
         WHERE br.borrow_status = 'Issued'
         """
-        records = self.db.fetch_all(query)
-        if not records:
+        records = self.db.iter_query(query)
+        first = next(records, None)
+        if first is None:
             print("No books currently issued.")
             return
         print("\n" + "="*90)
         print(f"{'ID':<5} {'Member Name':<20} {'Book Title':<30} {'Issued':<15} {'Due':<15}")
         print("-" * 90)
-        for r in records:
+        for r in chain((first,), records):
             print(f"{r[0]:<5} {r[1][:18]:<20} {r[2][:28]:<30} {r[3]:<15} {r[4]:<15}")
         print("="*90 + "\n")
\ No newline at end of file
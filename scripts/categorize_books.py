@@ -4,9 +4,20 @@ Populate 'Category' and 'Category ID' for books.csv using simple keyword rules.
 
 Input:  books.csv (semicolon-delimited)
 Output: books_categorized.csv (semicolon-delimited) - same columns with Category and Category ID filled
+
+Usage: python -m scripts.categorize_books [--infile F] [--outfile F] [--workers N]
+   or: python scripts/categorize_books.py [...]
+--workers N classifies byte-range chunks in N processes; output is identical
+to the serial run.
 """
+import argparse
 import csv
+import io
+import os
+import re
+import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 INFILE = "books.csv"
 OUTFILE = "books_categorized.csv"
@@ -50,7 +61,64 @@ KEYWORD_RULES = [
     ("Non-Fiction", ["essay", "report", "investig", "study", "manual", "handbook", "reference", "guidebook", "how-to"]),
 ]
 
+def _trie_pattern(words):
+    # Factor keywords into a prefix trie so the regex branches on one
+    # character at a time; optional tails are greedy, so the longest
+    # keyword starting at a position wins.
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+def compile_rules(rules):
+    """
+    Precompile ordered (category, keywords) rules into one matcher.
+
+    Returns (regex, rank): the regex finds the longest keyword at a position,
+    and rank[keyword] is the first rule hit by that keyword or any keyword
+    that is a prefix of it (every keyword matching at one position is a
+    prefix of the longest one). The lowest rank over all positions is the
+    first rule in order that has any keyword in the text.
+    """
+    first_rule = {}
+    for idx, (_cat, keywords) in enumerate(rules):
+        for kw in keywords:
+            first_rule.setdefault(kw, idx)
+    rank = {kw: min(i for p, i in first_rule.items() if kw.startswith(p)) for kw in first_rule}
+    return re.compile(_trie_pattern(first_rule)), rank
+
+_MATCHER, _RANK = compile_rules(KEYWORD_RULES)
+
 def classify_text(text: str):
+    t = text.lower()
+    search = _MATCHER.search
+    best = None
+    pos = 0
+    while True:
+        m = search(t, pos)
+        if m is None:
+            break
+        r = _RANK[m.group()]
+        if best is None or r < best:
+            best = r
+            if r == 0:
+                break
+        pos = m.start() + 1
+    return KEYWORD_RULES[best][0] if best is not None else "General"
+
+def classify_text_reference(text: str):
+    # Original nested-loop classifier, kept as the parity baseline.
     t = text.lower()
     for cat, keywords in KEYWORD_RULES:
         for kw in keywords:
@@ -58,37 +126,86 @@ def classify_text(text: str):
                 return cat
     return "General"
 
-def process():
+def _output_fieldnames(fieldnames):
+    # ensure header contains Category and Category ID
+    fieldnames = list(fieldnames) if fieldnames else []
+    if "Category" not in fieldnames:
+        fieldnames.append("Category")
+    if "Category ID" not in fieldnames:
+        fieldnames.append("Category ID")
+    return fieldnames
+
+def _categorize_rows(reader, writer, counts):
+    for row in reader:
+        # if a category already present, keep it; otherwise infer
+        existing_cat = (row.get("Category") or "").strip()
+        if existing_cat:
+            category = existing_cat
+        else:
+            text = " ".join([row.get("Book-Title",""), row.get("Book-Author",""), row.get("Publisher","")])
+            category = classify_text(text)
+        row["Category"] = category
+        row["Category ID"] = str(CATEGORY_IDS.get(category, 0))
+        counts[category] += 1
+        writer.writerow(row)
+
+def _process_range(args):
+    infile, start, end, fieldnames, out_fieldnames = args
+    with open(infile, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8", errors="replace")
+    counts = Counter()
+    out = io.StringIO(newline='')
+    reader = csv.DictReader(io.StringIO(data, newline=''), fieldnames=fieldnames, delimiter=DELIM)
+    writer = csv.DictWriter(out, fieldnames=out_fieldnames, delimiter=DELIM, quoting=csv.QUOTE_MINIMAL)
+    _categorize_rows(reader, writer, counts)
+    return out.getvalue(), counts
+
+def _process_parallel(infile, outfile, workers):
+    from scripts.ingest import byte_ranges, read_header
+    fieldnames, data_start = read_header(infile, "utf-8", DELIM)
+    out_fieldnames = _output_fieldnames(fieldnames)
+    # a few ranges per worker keeps the pool busy when chunks are uneven
+    ranges = byte_ranges(infile, data_start, workers * 4)
+
     counts = Counter()
-    with open(INFILE, newline='', encoding="utf-8", errors="replace") as inf, \
-         open(OUTFILE, "w", newline='', encoding="utf-8") as outf:
-        reader = csv.DictReader(inf, delimiter=DELIM)
-        # ensure header contains Category and Category ID
-        fieldnames = list(reader.fieldnames) if reader.fieldnames else []
-        if "Category" not in fieldnames:
-            fieldnames.append("Category")
-        if "Category ID" not in fieldnames:
-            fieldnames.append("Category ID")
-        writer = csv.DictWriter(outf, fieldnames=fieldnames, delimiter=DELIM, quoting=csv.QUOTE_MINIMAL)
-        writer.writeheader()
-
-        for row in reader:
-            # if a category already present, keep it; otherwise infer
-            existing_cat = (row.get("Category") or "").strip()
-            if existing_cat:
-                category = existing_cat
-            else:
-                text = " ".join([row.get("Book-Title",""), row.get("Book-Author",""), row.get("Publisher","")])
-                category = classify_text(text)
-            row["Category"] = category
-            row["Category ID"] = str(CATEGORY_IDS.get(category, 0))
-            counts[category] += 1
-            writer.writerow(row)
-
-    print("Wrote:", OUTFILE)
+    with open(outfile, "w", newline='', encoding="utf-8") as outf, \
+         ProcessPoolExecutor(max_workers=workers) as pool:
+        csv.DictWriter(outf, fieldnames=out_fieldnames, delimiter=DELIM).writeheader()
+        tasks = [(infile, start, end, fieldnames, out_fieldnames) for start, end in ranges]
+        # map() yields in submission order, so output matches the serial run
+        for text, chunk_counts in pool.map(_process_range, tasks):
+            outf.write(text)
+            counts.update(chunk_counts)
+    return counts
+
+def process(infile=INFILE, outfile=OUTFILE, workers=1):
+    if workers > 1:
+        counts = _process_parallel(infile, outfile, workers)
+    else:
+        counts = Counter()
+        with open(infile, newline='', encoding="utf-8", errors="replace") as inf, \
+             open(outfile, "w", newline='', encoding="utf-8") as outf:
+            reader = csv.DictReader(inf, delimiter=DELIM)
+            fieldnames = _output_fieldnames(reader.fieldnames)
+            writer = csv.DictWriter(outf, fieldnames=fieldnames, delimiter=DELIM, quoting=csv.QUOTE_MINIMAL)
+            writer.writeheader()
+            _categorize_rows(reader, writer, counts)
+
+    print("Wrote:", outfile)
     print("Summary:")
     for cat, cnt in counts.most_common():
         print(f"  {cat}: {cnt}")
+    return counts
 
 if __name__ == "__main__":
-    process()
\ No newline at end of file
+    if not __package__:
+        # run as a file (python scripts/categorize_books.py): scripts.* lives under the repo root
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Fill Category / Category ID in a books CSV.")
+    parser.add_argument("--infile", default=INFILE)
+    parser.add_argument("--outfile", default=OUTFILE)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (0 = one per CPU, 1 = serial)")
+    args = parser.parse_args()
+    process(args.infile, args.outfile, args.workers or os.cpu_count() or 1)
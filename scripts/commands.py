@@ -0,0 +1,359 @@
+"""
+Non-interactive command line: one subcommand per operation, plus --batch.
+
+    python main.py issue 12 345
+    python main.py search "harry potter" --limit 5
+    python main.py --batch dropbox.txt --commit-every 1000
+
+Every command prints one JSON object on stdout:
+    {"command": "issue", "ok": true, "result": {"borrow_id": 981}, "message": "SUCCESS: ..."}
+where "message" is what the interactive menu would have printed. The exit
+status is 1 if any command failed.
+
+A batch file has one command per line, written as on the command line
+("return 981", "move-category 345 7"); blank lines and lines starting with
+'#' are skipped ('-' reads stdin). The whole file runs in one write
+transaction, committed every --commit-every commands (0 = once at the end).
+Each command runs in its own savepoint, so a failed one leaves nothing
+behind and the rest carry on; --stop-on-error instead rolls back everything
+since the last commit and stops. Batch results carry the line number, and a
+final {"summary": {...}} line gives the totals.
+"""
+import argparse
+import importlib
+import io
+import json
+import shlex
+import sys
+import time
+from contextlib import redirect_stdout
+from itertools import islice
+
+MANAGERS = {
+    "analytics": ("scripts.analytics", "AnalyticsManager"),
+    "books": ("scripts.book", "BookManager"),
+    "borrows": ("scripts.borrow", "BorrowManager"),
+    "employees": ("scripts.employee", "EmployeeManager"),
+    "members": ("scripts.member", "MemberManager"),
+}
+
+SEARCH_COLUMNS = ("book_id", "title", "author", "category", "available")
+
+
+class CommandError(ValueError):
+    """A command line that could not be parsed."""
+
+
+class _Failed(Exception):
+    """Raised inside a command's savepoint to undo a failed command."""
+
+
+class CommandParser(argparse.ArgumentParser):
+    """Raises CommandError instead of exiting, for batch lines."""
+
+    def error(self, message):
+        raise CommandError(f"{self.prog}: {message}")
+
+    def exit(self, status=0, message=None):
+        raise CommandError(message or f"{self.prog}: exited")
+
+
+class Session:
+    """The database plus managers, each created the first time it is used."""
+
+    def __init__(self, db):
+        self.db = db
+        self._managers = {}
+
+    def __getattr__(self, name):
+        if name not in MANAGERS:
+            raise AttributeError(name)
+        if name not in self._managers:
+            module, cls = MANAGERS[name]
+            self._managers[name] = getattr(importlib.import_module(module), cls)(self.db)
+        return self._managers[name]
+
+
+# Handlers return a JSON-able result, or None when the command failed (the
+# manager has already printed why).
+
+def _issue(s, args):
+    borrow_id = s.borrows.issue_book(args.member_id, args.book_id, args.days)
+    return None if borrow_id is None else {"borrow_id": borrow_id}
+
+
+def _return(s, args):
+    fine = s.borrows.return_book(args.borrow_id)
+    return None if fine is None else {"borrow_id": args.borrow_id, "fine": fine}
+
+
+def _move_category(s, args):
+    if not s.books.assign_book_to_category(args.book_id, args.category_id):
+        return None
+    return {"book_id": args.book_id, "category_id": args.category_id}
+
+
+def _deactivate(s, args):
+    return {"member_id": args.member_id} if s.members.deactivate_member(args.member_id) else None
+
+
+def _add_category(s, args):
+    category_id = s.books.add_category(args.name, args.description)
+    return None if category_id is None else {"category_id": category_id}
+
+
+def _search(s, args):
+    rows = s.books.find_books(args.keyword, args.limit, fuzzy=args.fuzzy)
+    return {"books": [dict(zip(SEARCH_COLUMNS, row)) for row in rows]}
+
+
+def _import_books(s, args):
+    if args.upsert:
+        return s.books.upsert_books_from_csv(args.file, restart=args.restart)
+    return s.books.import_books_from_csv(args.file, workers=args.workers)
+
+
+def _import_members(s, args):
+    return s.members.import_from_csv(args.file, workers=args.workers)
+
+
+def _import_employees(s, args):
+    return s.employees.import_from_csv(args.file, workers=args.workers)
+
+
+def _export(s, args):
+    from scripts.export import export
+    count = export(s.db, args.dataset, args.output, filters={
+        "since": args.since, "status": args.status, "category": args.category})
+    return {"dataset": args.dataset, "path": args.output, "rows": count}
+
+
+def _rebuild_analytics(s, args):
+    s.analytics.rebuild()
+    return {}
+
+
+def add_commands(parser):
+    """Add the subcommands to `parser`; each sets `handler` and `batchable`."""
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    def command(name, handler, help, batchable=True):
+        p = sub.add_parser(name, help=help, description=help)
+        # long-running commands manage their own transactions (and threads)
+        p.set_defaults(handler=handler, batchable=batchable)
+        return p
+
+    p = command("issue", _issue, "issue a book to a member")
+    p.add_argument("member_id", type=int)
+    p.add_argument("book_id", type=int)
+    p.add_argument("--days", type=int, default=14, help="loan period (default 14)")
+    p = command("return", _return, "return a loan")
+    p.add_argument("borrow_id", type=int)
+    p = command("move-category", _move_category, "move a book to another category")
+    p.add_argument("book_id", type=int)
+    p.add_argument("category_id", type=int)
+    p = command("deactivate", _deactivate, "deactivate a member")
+    p.add_argument("member_id", type=int)
+    p = command("add-category", _add_category, "add a category (prints its id)")
+    p.add_argument("name")
+    p.add_argument("--description", default="")
+    p = command("search", _search, "search the catalog by title/author")
+    p.add_argument("keyword")
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--fuzzy", action="store_true", help="tolerate misspelt words")
+
+    p = command("import-books", _import_books, "import books.csv", batchable=False)
+    p.add_argument("--file", default="books.csv")
+    p.add_argument("--workers", type=int, default=1,
+                   help="parser processes (default 1; more need records without embedded newlines)")
+    p.add_argument("--upsert", action="store_true", help="new/changed rows only, resumable")
+    p.add_argument("--restart", action="store_true", help="with --upsert: ignore the checkpoint")
+    p = command("import-members", _import_members, "import members.csv", batchable=False)
+    p.add_argument("--file", default="members.csv")
+    p.add_argument("--workers", type=int, default=1)
+    p = command("import-employees", _import_employees, "import emp.csv", batchable=False)
+    p.add_argument("--file", default="emp.csv")
+    p.add_argument("--workers", type=int, default=1)
+    p = command("export", _export, "export books/members/loans to CSV or JSONL", batchable=False)
+    p.add_argument("dataset", choices=["books", "loans", "members"])
+    p.add_argument("output", help=".csv or .jsonl, optionally with .gz")
+    p.add_argument("--since")
+    p.add_argument("--status")
+    p.add_argument("--category")
+    command("rebuild-analytics", _rebuild_analytics, "recompute the report tables", batchable=False)
+    return sub
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py", description="Library management. Without arguments the interactive menu starts.")
+    parser.add_argument("--db", default="library.db")
+    parser.add_argument("--batch", metavar="FILE", help="run the commands in FILE ('-' = stdin)")
+    parser.add_argument("--commit-every", type=int, default=0, metavar="N",
+                        help="batch: commit every N commands (default 0 = once at the end)")
+    parser.add_argument("--stop-on-error", action="store_true",
+                        help="batch: roll back to the last commit and stop at the first failure")
+    parser.add_argument("--fine-per-day", type=float, metavar="AMOUNT",
+                        help="fine per overdue day (default $LIBRARY_FINE_PER_DAY or 10)")
+    parser.add_argument("--grace-days", type=int, metavar="DAYS",
+                        help="days past due before fines start (default $LIBRARY_GRACE_DAYS or 0)")
+    add_commands(parser)
+    return parser
+
+
+def run_command(session, args, capture=True):
+    """
+    Run one parsed command. Returns {"command", "ok", "result"/"error",
+    "message"}. With `capture`, what the managers print is collected into
+    "message"; otherwise it goes to stderr as it happens (imports).
+    """
+    out = io.StringIO() if capture else sys.stderr
+    record = {"command": args.command, "ok": False}
+    try:
+        with redirect_stdout(out):
+            result = args.handler(session, args)
+    except Exception as e:
+        record["error"] = str(e)
+    else:
+        record["ok"] = result is not None
+        if result is not None:
+            record["result"] = result
+    if capture:
+        record["message"] = out.getvalue().strip()
+    return record
+
+
+class BatchParser:
+    """
+    Parses batch lines with the subcommand parsers. Lines that are just the
+    command and its positional arguments ("return 981") are converted
+    directly: argparse and shlex would otherwise cost more than the command.
+    """
+
+    def __init__(self):
+        self.parser = CommandParser(prog="batch", add_help=False)
+        self.fast = {}
+        for name, p in add_commands(self.parser).choices.items():
+            positionals = [a for a in p._actions if not a.option_strings]
+            defaults = {a.dest: p.get_default(a.dest) for a in p._actions if a.option_strings}
+            defaults.update(command=name, handler=p.get_default("handler"),
+                            batchable=p.get_default("batchable"))
+            self.fast[name] = (positionals, defaults)
+
+    def parse(self, line):
+        tokens = shlex.split(line) if any(c in line for c in "'\"\\") else line.split()
+        if not tokens:
+            raise CommandError("no command given")
+        positionals, defaults = self.fast.get(tokens[0], (None, None))
+        if (positionals is not None and len(tokens) == len(positionals) + 1
+                and not any(t.startswith("-") for t in tokens[1:])):
+            try:
+                values = {a.dest: a.type(t) if a.type else t for a, t in zip(positionals, tokens[1:])}
+            except ValueError:
+                pass  # let argparse word the error
+            else:
+                if all(not a.choices or values[a.dest] in a.choices for a in positionals):
+                    return argparse.Namespace(**defaults, **values)
+        return self.parser.parse_args(tokens)
+
+
+def _batch_lines(lines):
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield lineno, line
+
+
+def _run_batch_line(session, parser, line):
+    try:
+        args = parser.parse(line)
+        if args.command is None:
+            raise CommandError("no command given")
+        if not args.batchable:
+            raise CommandError(f"{args.command} cannot run inside a batch")
+    except ValueError as e:  # CommandError, or shlex on an unclosed quote
+        return {"command": line.split()[0], "ok": False, "error": str(e)}
+    # a savepoint per command: undo a failed one without touching the rest
+    try:
+        with session.db.transaction():
+            record = run_command(session, args)
+            if not record["ok"]:
+                raise _Failed
+    except _Failed:
+        pass
+    return record
+
+
+def run_batch(session, lines, commit_every=0, stop_on_error=False, out=None):
+    """
+    Run batch `lines` (see the module docstring), writing one JSON line per
+    command to `out` and a summary line at the end. Returns the summary.
+    """
+    out = out or sys.stdout
+    parser = BatchParser()
+    summary = {"commands": 0, "ok": 0, "failed": 0, "committed": 0, "rolled_back": 0}
+    started = time.perf_counter()
+    pending = _batch_lines(lines)
+    stopped = False
+    while not stopped:
+        chunk = list(islice(pending, commit_every or None))
+        if not chunk:
+            break
+        done = 0
+        try:
+            with session.db.transaction(immediate=True):
+                for lineno, line in chunk:
+                    record = {"line": lineno, **_run_batch_line(session, parser, line)}
+                    out.write(json.dumps(record, default=str) + "\n")
+                    done += 1
+                    summary["commands"] += 1
+                    summary["ok" if record["ok"] else "failed"] += 1
+                    if stop_on_error and not record["ok"]:
+                        raise _Failed
+        except _Failed:
+            summary["rolled_back"] += done
+            summary["stopped_at_line"] = lineno
+            stopped = True
+        else:
+            summary["committed"] += done
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    out.write(json.dumps({"summary": summary}) + "\n")
+    out.flush()
+    return summary
+
+
+def cli(argv, open_db):
+    """Entry point for main.py with arguments; `open_db(path)` connects."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.batch is None and args.command is None:
+        parser.error("give a COMMAND or --batch FILE")
+    if args.batch is not None and args.command is not None:
+        parser.error("--batch takes its commands from the file")
+    if args.commit_every < 0:
+        parser.error("--commit-every must be >= 0")
+    if (args.fine_per_day or 0) < 0 or (args.grace_days or 0) < 0:
+        parser.error("--fine-per-day and --grace-days must be >= 0")
+
+    # stdout carries only the JSON records: schema setup on a new or older
+    # database ("Applied schema migration ...") reports to stderr
+    with redirect_stdout(sys.stderr):
+        db = open_db(args.db)
+    if args.fine_per_day is not None or args.grace_days is not None:
+        from scripts.borrow import set_fine_policy
+        set_fine_policy(args.fine_per_day, args.grace_days)
+    try:
+        session = Session(db)
+        if args.batch is not None:
+            if args.batch == "-":
+                summary = run_batch(session, sys.stdin, args.commit_every, args.stop_on_error)
+            else:
+                with open(args.batch, encoding="utf-8") as f:
+                    summary = run_batch(session, f, args.commit_every, args.stop_on_error)
+            return 1 if summary["failed"] else 0
+        # imports and exports report progress as they go
+        record = run_command(session, args, capture=args.batchable)
+        print(json.dumps(record, default=str))
+        return 0 if record["ok"] else 1
+    finally:
+        db.close()
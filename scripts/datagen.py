@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data for benchmarks and load tests.
+
+Everything is driven by a seed, so two runs with the same arguments produce
+identical files and tables.
+
+Run from the project root, e.g.:
+    python -m scripts.datagen --csv books.csv --books 1000000
+    python -m scripts.datagen --db library.db --books 1000000 --members 200000 --borrows 10000000
+"""
+import argparse
+import csv
+import random
+from datetime import date, timedelta
+
+from database import DatabaseManager
+from migrations import ensure_schema
+from scripts.analytics import AnalyticsManager
+from scripts.book import BookManager
+from scripts.categorize_books import CATEGORY_IDS
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "dor", "sa", "tha", "vel", "qui", "mon",
+             "ar", "bel", "cor", "den", "fi", "gal", "hol", "ist", "jun", "wyn"]
+# ~8000 pseudo-words so search selectivity looks like a real catalog
+WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+SURNAMES = ["Grisham", "Tolkien", "Austen", "King", "Rowling", "Christie", "Dickens",
+            "Patterson", "Roberts", "Steel", "Clancy", "Koontz", "Sparks", "Brown"]
+# real words that the categorize_books rules react to
+GENRE_WORDS = ["Love", "Murder", "History", "Cooking", "Dragon", "Guide", "Journey",
+               "Science", "Poems", "Business", "Children", "Mystery", "Life", "War"]
+PUBLISHERS = ["Penguin Books", "Harlequin", "Scholastic", "Ballantine Books", "Dover Publications",
+              "Tor Books", "Bantam", "Vintage", "HarperCollins", "Random House"]
+BOOK_CSV_HEADER = ["ISBN", "Book-Title", "Book-Author", "Year-Of-Publication", "Publisher",
+                   "Image-URL-S", "Image-URL-M", "Image-URL-L"]
+
+
+def create_schema(db):
+    ensure_schema(db, force=True)
+
+
+def _books(count, seed):
+    # (isbn, title, author, year, publisher)
+    rng = random.Random(seed)
+    for i in range(count):
+        words = [rng.choice(WORDS).title() for _ in range(rng.randint(2, 5))]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(GENRE_WORDS))
+        surname = rng.choice(SURNAMES) if rng.random() < 0.01 else rng.choice(WORDS).title()
+        author = f"{rng.choice('ABCDEFGHJKLMNPRST')}. {surname}"
+        publisher = rng.choice(PUBLISHERS) if rng.random() < 0.5 else f"Publisher {i % 997}"
+        yield f"{i:010d}", " ".join(words), author, 1950 + rng.randrange(75), publisher
+
+
+def write_books_csv(path, count, seed=42):
+    """Write a Book-Crossing style, semicolon-delimited books.csv."""
+    with open(path, "w", newline="", encoding="latin-1") as f:
+        writer = csv.writer(f, delimiter=";", quoting=csv.QUOTE_ALL)
+        writer.writerow(BOOK_CSV_HEADER)
+        for isbn, title, author, year, publisher in _books(count, seed):
+            url = f"http://images.example.com/{isbn}"
+            writer.writerow([isbn, title, author, year, publisher,
+                             f"{url}.S.jpg", f"{url}.M.jpg", f"{url}.L.jpg"])
+
+
+def fill_books(db, count, seed=42):
+    """Insert `count` books spread over the categorize_books categories."""
+    rng = random.Random(seed + 1)
+    books = BookManager(db)
+    for name in CATEGORY_IDS:
+        books.add_category(name)
+    category_ids = [books.get_category_id(name) for name in CATEGORY_IDS]
+
+    def rows():
+        for isbn, title, author, year, publisher in _books(count, seed):
+            yield (title, author, rng.choice(category_ids), isbn, publisher,
+                   year, "English", 0, 5, 5, f"Stack {rng.choice('ABCDEF')}")
+
+    db.execute_many("""
+        INSERT INTO book(title, author, category_id, isbn, publisher, publication_year,
+                         language, pages, quantity_total, quantity_available, shelf_location)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+    db.commit()
+
+
+def fill_members(db, count, seed=42):
+    rng = random.Random(seed)
+
+    def rows():
+        for i in range(count):
+            name = f"{rng.choice(WORDS).title()} {rng.choice(SURNAMES)}"
+            yield (name, f"{i} {rng.choice(WORDS).title()} Street", f"+1-555-{i:07d}",
+                   f"member{i}@example.com", "Student ID", f"ID{i:09d}",
+                   f"20{rng.randint(10, 25)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+                   "Active" if rng.random() < 0.95 else "Deactivated")
+
+    db.execute_many("""
+        INSERT INTO member(name, address, contact_number, email, id_proof_type,
+                           id_proof_number, membership_date, active_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+    db.commit()
+
+
+def fill_borrows(db, count, members, books, open_ratio=0.02, years=5, seed=42,
+                 today=None, chunk_size=100_000):
+    """
+    Insert `count` loans over the last `years` years: mostly returned history
+    plus `open_ratio` still issued (some overdue). Stock is then adjusted so
+    quantity_available reflects the open loans.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    span = years * 365
+
+    def rows():
+        for _ in range(count):
+            borrowed = today - timedelta(days=rng.randrange(span))
+            due = borrowed + timedelta(days=14)
+            member_id, book_id = rng.randint(1, members), rng.randint(1, books)
+            if rng.random() < open_ratio:
+                # open loans are recent; a share of them already overdue
+                borrowed = today - timedelta(days=rng.randrange(30))
+                due = borrowed + timedelta(days=14)
+                yield (member_id, book_id, borrowed.isoformat(), due.isoformat(), None, 0.0, "Issued")
+            else:
+                returned = borrowed + timedelta(days=rng.randrange(21))
+                fine = max(0, (returned - due).days) * 10.0
+                yield (member_id, book_id, borrowed.isoformat(), due.isoformat(),
+                       returned.isoformat(), fine, "Returned")
+
+    query = """
+        INSERT INTO borrow(member_id, book_id, borrow_date, due_date, return_date,
+                           fine_amount, borrow_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+    # bulk history: rebuild the analytics once instead of per-row triggers
+    with AnalyticsManager(db).paused():
+        batch = []
+        for row in rows():
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                with db.transaction():
+                    db.execute_many(query, batch)
+                batch = []
+        with db.transaction():
+            if batch:
+                db.execute_many(query, batch)
+            # bulk history is not "recent activity"; overdue summaries start fresh
+            db.execute_query("DELETE FROM overdue_dirty_member")
+            db.execute_query("DELETE FROM overdue_dirty_book")
+            db.execute_query("DELETE FROM overdue_state")
+            db.execute_query("""
+                UPDATE book SET quantity_available = MAX(0, quantity_total - (
+                    SELECT COUNT(*) FROM borrow br
+                    WHERE br.book_id = book.book_id AND br.borrow_status = 'Issued'))
+            """)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic library data.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv", help="write a books.csv with --books rows")
+    parser.add_argument("--db", help="fill this database (schema is created if missing)")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--members", type=int, default=200_000)
+    parser.add_argument("--borrows", type=int, default=10_000_000)
+    args = parser.parse_args()
+    if not args.csv and not args.db:
+        parser.error("nothing to do: pass --csv and/or --db")
+
+    if args.csv:
+        write_books_csv(args.csv, args.books, args.seed)
+        print(f"Wrote {args.books:,} books to {args.csv}")
+    if args.db:
+        db = DatabaseManager(args.db)
+        db.connect()
+        create_schema(db)
+        fill_books(db, args.books, args.seed)
+        fill_members(db, args.members, args.seed)
+        fill_borrows(db, args.borrows, args.members, args.books, seed=args.seed)
+        db.close()
+        print(f"Filled {args.db}: {args.books:,} books, {args.members:,} members, "
+              f"{args.borrows:,} loans")
+
+
+if __name__ == "__main__":
+    main()
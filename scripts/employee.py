@@ -1,7 +1,48 @@
-import csv
+import re
+from datetime import date, datetime
+from itertools import chain
+from database import record_factory
+
+def parse_salary(value):
+    """'1,06,826' / '106826' / 106826 -> 106826; None if there is no number."""
+    if value is None or isinstance(value, int):
+        return value
+    digits = re.sub(r"[^\d.]", "", str(value))
+    try:
+        return int(round(float(digits)))
+    except ValueError:
+        return None
+
+def parse_date(value):
+    """'27-01-2019' (day first, '-', '/' or '.') or '2019-01-27' -> '2019-01-27'."""
+    value = str(value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+def parse_years(value):
+    """'6.8 years' -> 6.8; None if there is no number."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.search(r"\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+def _employee_params(row):
+    # module level so ingest worker processes can use it
+    return EmployeeManager.employee_from_csv_row(row).to_params()
 
 class Employee:
-    def __init__(self, name, phone, salary, role, age, working_from, years_worked):
+    __slots__ = ("e_id", "name", "phone", "salary", "role", "age", "working_from", "years_worked")
+    # INSERT column order used by to_params()
+    COLUMNS = ("name", "phone", "salary", "role", "age", "working_from", "year_worked")
+    # `SELECT * FROM employee` column order
+    TABLE_COLUMNS = ("e_id",) + COLUMNS
+
+    def __init__(self, name, phone, salary, role, age, working_from, years_worked, e_id=None):
+        self.e_id = e_id
         self.name = name
         self.phone = phone
         self.salary = salary
@@ -10,6 +51,18 @@ class Employee:
         self.working_from = working_from
         self.years_worked = years_worked
 
+    @classmethod
+    def from_row(cls, row, columns=TABLE_COLUMNS):
+        """Build an Employee from a row whose column names are `columns`."""
+        d = dict(zip(columns, row))
+        return cls(d.get("name"), d.get("phone"), d.get("salary"), d.get("role"), d.get("age"),
+                   d.get("working_from"), d.get("year_worked"), d.get("e_id"))
+
+    def to_params(self):
+        """Values in COLUMNS order, for INSERT statements."""
+        return (self.name, self.phone, self.salary, self.role, self.age,
+                self.working_from, self.years_worked)
+
 class EmployeeManager:
     def __init__(self, db_manager):
         self.db = db_manager
@@ -20,54 +73,155 @@ class EmployeeManager:
             e_id INTEGER PRIMARY KEY AUTOINCREMENT,
             name VARCHAR(30) NOT NULL,
             phone VARCHAR(40) NOT NULL,
-            salary VARCHAR(20) NOT NULL,
+            salary INTEGER,
             role VARCHAR(15) NOT NULL,
             age INTEGER NOT NULL,
-            working_from VARCHAR(12) NOT NULL,
-            year_worked VARCHAR(15) 
+            working_from VARCHAR(10),
+            year_worked REAL
         );
         """
         self.db.execute_query(query)
 
+    @staticmethod
+    def normalize_table(db):
+        """
+        Migration step: rebuild `employee` with typed columns (integer salary,
+        ISO working_from, numeric year_worked), converting the text values
+        older imports stored. Values that cannot be parsed become NULL.
+        """
+        if not db.fetch_all("SELECT 1 FROM sqlite_master WHERE type='table' AND name='employee'"):
+            return
+        rows = db.fetch_all("SELECT e_id, name, phone, salary, role, age, working_from, year_worked "
+                            "FROM employee")
+        db.execute_query("DROP TABLE employee")
+        EmployeeManager(db).create_table()
+        db.execute_many("""
+            INSERT INTO employee(e_id, name, phone, salary, role, age, working_from, year_worked)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(e_id, name, phone, parse_salary(salary), role, age,
+               parse_date(working_from), parse_years(years))
+              for e_id, name, phone, salary, role, age, working_from, years in rows])
+
     def add_employee(self, emp, auto_commit=True):
         query = """
         INSERT INTO employee(name, phone, salary, role, age, working_from, year_worked)
         VALUES(?, ?, ?, ?, ?, ?, ?)
         """
-        values = (emp.name, emp.phone, emp.salary, emp.role, emp.age, emp.working_from, emp.years_worked)
-        
         try:
-            self.db.execute_query(query, values)
+            self.db.execute_query(query, emp.to_params())
             if auto_commit:
                 self.db.commit()
                 print(f"Employee {emp.name} added successfully.")
         except Exception as e:
             print(f"Error adding employee: {e}")
 
-    def import_from_csv(self, filename):
+    @staticmethod
+    def employee_from_csv_row(row):
+        """Typed Employee from an emp.csv row; ValueError if salary or date is unusable."""
+        salary = parse_salary(row["Salary"])
+        working_from = parse_date(row["Working_From"])
+        if salary is None or working_from is None:
+            raise ValueError("bad salary or date")
+        return Employee(row["Name"].strip(), row["Phone"].strip(), salary, row["Role"].strip(),
+                        int(row["Age"]), working_from, parse_years(row.get("Years_Worked")))
+
+    def import_from_csv(self, filename, workers=1):
+        """
+        Bulk import employees through scripts.ingest (executemany in large
+        transactions, `workers` parser processes). Rows with an unparseable
+        salary, age or date are rejected.
+        Returns a dict with the import statistics (None on failure).
+        """
+        insert_query = f"""
+        INSERT INTO employee({", ".join(Employee.COLUMNS)})
+        VALUES({", ".join("?" * len(Employee.COLUMNS))})
+        """
+        from scripts.ingest import ingest_csv
         try:
-            with open(filename, "r") as f:
-                reader = csv.DictReader(f)
-                count = 0
-                for row in reader:
-                    new_emp = Employee(
-                        row["Name"], row["Phone"], row["Salary"], 
-                        row["Role"], row["Age"], row["Working_From"], 
-                        row["Years_Worked"]
-                    )
-                    self.add_employee(new_emp, auto_commit=False)
-                    count += 1
-            self.db.commit()
-            print(f"Successfully imported {count} employees.")
+            stats = ingest_csv(self.db, filename, _employee_params, insert_query,
+                               workers=workers, label="employees")
         except FileNotFoundError:
             print("Error: CSV file not found.")
+            return None
+        except Exception as e:
+            print(f"Error importing employees: {e}")
+            return None
+        print(f"Successfully imported {stats['inserted']} employees "
+              f"({stats['rejected']} rejected).")
+        return stats
 
-    def show_all_employees(self):
-        employees = self.db.fetch_all("SELECT * FROM employee")
-        
+    def get_employees_by_role(self, role):
+        """Employees in `role`, highest paid first (idx_employee_role_salary)."""
+        return list(self.db.iter_query(
+            "SELECT * FROM employee WHERE role = ? ORDER BY salary DESC",
+            (role,), row_factory=record_factory(Employee)))
+
+    def get_employees_joined(self, since=None, until=None):
+        """Employees with since <= working_from <= until (ISO dates or DD-MM-YYYY), oldest first."""
+        since = parse_date(since) if since else "0000-01-01"
+        until = parse_date(until) if until else "9999-12-31"
+        if since is None or until is None:
+            raise ValueError("Dates must be YYYY-MM-DD or DD-MM-YYYY")
+        return list(self.db.iter_query(
+            "SELECT * FROM employee WHERE working_from BETWEEN ? AND ? ORDER BY working_from",
+            (since, until), row_factory=record_factory(Employee)))
+
+    def payroll_by_role(self):
+        """(role, headcount, total, average, min, max) per role, largest payroll first."""
+        return self.db.fetch_all("""
+            SELECT role, COUNT(*), SUM(salary), AVG(salary), MIN(salary), MAX(salary)
+            FROM employee
+            GROUP BY role
+            ORDER BY SUM(salary) DESC
+        """)
+
+    def hires_by_year(self):
+        """(year, hires, average tenure in years as of today) per joining year."""
+        return self.db.fetch_all("""
+            SELECT substr(working_from, 1, 4) AS year, COUNT(*),
+                   AVG((julianday(?) - julianday(working_from)) / 365.25)
+            FROM employee
+            WHERE working_from IS NOT NULL
+            GROUP BY year
+            ORDER BY year
+        """, (date.today().isoformat(),))
+
+    def show_payroll_report(self):
+        roles = self.payroll_by_role()
+        if not roles:
+            print("No employees found.")
+            return
+        header_fmt = "{:<22} {:>6} {:>14} {:>12} {:>12} {:>12}"
+        print("\n" + "="*85)
+        print(header_fmt.format("Role", "Staff", "Payroll", "Average", "Min", "Max"))
+        print("-" * 85)
+        for role, staff, total, avg, low, high in roles:
+            print(header_fmt.format(str(role)[:20], staff, f"{total or 0:,}", f"{avg or 0:,.0f}",
+                                    f"{low or 0:,}", f"{high or 0:,}"))
+        print("-" * 85)
+        print(header_fmt.format("Total", sum(r[1] for r in roles),
+                                f"{sum(r[2] or 0 for r in roles):,}", "", "", ""))
+        print("\nHires by year (avg tenure today):")
+        for year, hires, tenure in self.hires_by_year():
+            print(f"  {year}: {hires:>4}  {tenure:.1f} years")
+        print("="*85 + "\n")
+
+    def show_employees(self, employees):
         if not employees:
             print("No employees found.")
             return
+        self._print_employees(iter(employees))
+
+    def show_all_employees(self):
+        self._print_employees(self.db.iter_query("SELECT * FROM employee",
+                                                 row_factory=record_factory(Employee)))
+
+    def _print_employees(self, employees):
+        first = next(employees, None)
+
+        if first is None:
+            print("No employees found.")
+            return
 
         header_fmt = "{:<5} {:<22} {:<22} {:<22} {:>12} {:^12} {:^10}"
         headers = ("ID", "Name", "Role", "Phone", "Salary", "Joined", "Exp")
@@ -76,11 +230,10 @@ class EmployeeManager:
         print(header_fmt.format(*headers))
         print("-" * 115)
 
-        for emp in employees:
-            e_id, name, phone, salary, role, age, joined, exp = emp
+        for emp in chain((first,), employees):
             print(header_fmt.format(
-                e_id, str(name).strip()[:20], str(role).strip()[:20], 
-                str(phone).strip()[:20], str(salary).strip(), 
-                str(joined).strip(), str(exp).strip()
+                emp.e_id, str(emp.name).strip()[:20], str(emp.role).strip()[:20], 
+                str(emp.phone).strip()[:20], f"{emp.salary:,}" if emp.salary is not None else "-",
+                str(emp.working_from), f"{emp.years_worked} yrs" if emp.years_worked is not None else "-"
             ))
         print("="*115 + "\n")
\ No newline at end of file
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Streaming exports of the catalog, members and loans to CSV or JSONL.
+
+Rows are read in chunks with DatabaseManager.iter_query and written through
+a large buffer, so memory stays flat however big the tables are. Output goes
+to "<file>.tmp" first and is renamed into place when complete, so a sync job
+never picks up a half-written file. A ".gz" suffix (or --gzip) compresses.
+
+The books CSV uses the headers, delimiter and encoding import_books_from_csv
+expects, and the members CSV those of MemberManager.import_from_csv, so both
+can be imported again. Like the importer, the books CSV is Latin-1:
+characters outside it are written as "?" (JSONL is always UTF-8).
+
+Run from the project root, e.g.:
+    python -m scripts.export books -o books_export.csv
+    python -m scripts.export loans --status Issued -o open_loans.jsonl.gz
+    python -m scripts.export members --since 2025-06-01 -o members.jsonl
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+from itertools import islice
+
+from database import DatabaseManager
+
+# dataset -> columns (header, SQL expression), FROM clause, filters, key
+# filter name -> SQL condition taking one parameter
+DATASETS = {
+    "books": {
+        "columns": [
+            ("Book-ID", "b.book_id"), ("ISBN", "b.isbn"), ("Book-Title", "b.title"),
+            ("Book-Author", "b.author"), ("Year-Of-Publication", "b.publication_year"),
+            ("Publisher", "b.publisher"), ("Category", "c.category_name"),
+            ("Language", "b.language"), ("Pages", "b.pages"), ("Quantity", "b.quantity_total"),
+            ("Available", "b.quantity_available"), ("Shelf", "b.shelf_location"),
+            ("Updated", "b.updated_at"),
+        ],
+        "from": "book b LEFT JOIN category c ON c.category_id = b.category_id",
+        "filters": {"since": "b.updated_at >= ?", "category": "c.category_name = ?"},
+        "key": "b.book_id",
+        # what import_books_from_csv reads (Book-Crossing style)
+        "csv": {"delimiter": ";", "encoding": "latin-1"},
+    },
+    "members": {
+        "columns": [
+            ("Member-ID", "m.member_id"), ("Name", "m.name"), ("Address", "m.address"),
+            ("Phone", "m.contact_number"), ("Email", "m.email"), ("ID_Proof_Type", "m.id_proof_type"),
+            ("ID_Proof_Number", "m.id_proof_number"), ("Membership_Date", "m.membership_date"),
+            ("Status", "m.active_status"), ("Updated", "m.updated_at"),
+        ],
+        "from": "member m",
+        "filters": {"since": "m.updated_at >= ?", "status": "m.active_status = ?"},
+        "key": "m.member_id",
+        "csv": {"delimiter": ",", "encoding": "utf-8"},
+    },
+    "loans": {
+        "columns": [
+            ("Borrow-ID", "br.borrow_id"), ("Member-ID", "br.member_id"), ("Member", "m.name"),
+            ("Book-ID", "br.book_id"), ("ISBN", "b.isbn"), ("Book-Title", "b.title"),
+            ("Borrow-Date", "br.borrow_date"), ("Due-Date", "br.due_date"),
+            ("Return-Date", "br.return_date"), ("Fine", "br.fine_amount"),
+            ("Status", "br.borrow_status"),
+        ],
+        "from": """borrow br
+                   LEFT JOIN member m ON m.member_id = br.member_id
+                   LEFT JOIN book b ON b.book_id = br.book_id""",
+        # a loan changes when it is issued and when it is returned
+        "filters": {"since": "MAX(br.borrow_date, COALESCE(br.return_date, '')) >= ?",
+                    "status": "br.borrow_status = ?"},
+        "key": "br.borrow_id",
+        "csv": {"delimiter": ",", "encoding": "utf-8"},
+    },
+}
+
+
+def build_query(dataset, filters=None):
+    """(headers, SQL, params) for `dataset` with the given {filter: value}."""
+    spec = DATASETS[dataset]
+    where, params = [], []
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name not in spec["filters"]:
+            raise ValueError(f"{dataset} cannot be filtered by {name}")
+        where.append(spec["filters"][name])
+        params.append(value)
+    sql = (f"SELECT {', '.join(expr for _, expr in spec['columns'])} FROM {spec['from']}"
+           + (f" WHERE {' AND '.join(where)}" if where else "")
+           + f" ORDER BY {spec['key']}")
+    return [header for header, _ in spec["columns"]], sql, tuple(params)
+
+
+def _open_output(path, compress, encoding):
+    if compress:
+        return gzip.open(path, "wt", encoding=encoding, errors="replace", newline="", compresslevel=6)
+    return open(path, "w", encoding=encoding, errors="replace", newline="", buffering=1 << 20)
+
+
+def export(db, dataset, path, fmt=None, compress=None, filters=None, chunk_rows=5000):
+    """
+    Stream `dataset` ("books", "members" or "loans") to `path`.
+
+    `fmt` is "csv" or "jsonl" and `compress` a bool; both default from the
+    file name (e.g. "loans.jsonl.gz"). `filters` maps filter names
+    (since, status, category) to values. Returns the number of rows written.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    fmt = fmt or ("jsonl" if name.endswith((".jsonl", ".json")) else "csv")
+    compress = path.endswith(".gz") if compress is None else compress
+    headers, sql, params = build_query(dataset, filters)
+    csv_opts = DATASETS[dataset]["csv"]
+    encoding = csv_opts["encoding"] if fmt == "csv" else "utf-8"
+
+    rows = db.iter_query(sql, params, batch_size=chunk_rows)
+    count = 0
+    tmp = path + ".tmp"
+    try:
+        with _open_output(tmp, compress, encoding) as out:
+            if fmt == "csv":
+                writer = csv.writer(out, delimiter=csv_opts["delimiter"], quoting=csv.QUOTE_MINIMAL)
+                writer.writerow(headers)
+                while chunk := list(islice(rows, chunk_rows)):
+                    writer.writerows(chunk)
+                    count += len(chunk)
+            elif fmt == "jsonl":
+                while chunk := list(islice(rows, chunk_rows)):
+                    out.write("".join(json.dumps(dict(zip(headers, row)), ensure_ascii=False) + "\n"
+                                      for row in chunk))
+                    count += len(chunk)
+            else:
+                raise ValueError(f"Unknown export format: {fmt}")
+        os.replace(tmp, path)
+    finally:
+        rows.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export library data to CSV / JSONL.")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("-o", "--output", required=True,
+                        help="output file; .csv, .jsonl, optionally with .gz")
+    parser.add_argument("--db", default="library.db")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file name")
+    parser.add_argument("--gzip", action="store_true", help="compress even without a .gz suffix")
+    parser.add_argument("--since", help="only rows changed on/after this date (YYYY-MM-DD)")
+    parser.add_argument("--status", help="members: Active/Deactivated; loans: Issued/Returned")
+    parser.add_argument("--category", help="books: category name")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    db.connect()
+    try:
+        filters = {"since": args.since, "status": args.status, "category": args.category}
+        count = export(db, args.dataset, args.output, args.format, args.gzip or None, filters)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        db.close()
+    print(f"Exported {count} {args.dataset} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Typo-tolerant catalog search: "grisam" finds Grisham, "tolkein" Tolkien.
+
+Every distinct word of the titles and authors is stored once in search_term,
+and each of its trigrams (padded as in pg_trgm: "  g", " gr", "gri", ...,
+"am ") in search_term_gram. A query word is looked up by its own trigrams:
+words of about its length sharing enough of them are the candidates, and
+those within max_edits() (optimal string alignment, so a swapped pair of
+letters is one edit) are its corrections. Each query word then goes to the
+FTS5 index as an OR group of itself as a prefix (as in keyword search) and
+its corrections, so books always come from an index, never from scanning
+`book`.
+
+catch_up() brings the word tables up to date: books with an id past the
+last one indexed, plus those whose title or author changed since
+(search_term_pending, filled by a trigger). It writes, so the write paths
+call it (BookManager.sync_search_terms after adds and imports); searches
+only read the tables as they stand. Words that no book uses any more stay
+until rebuild(); they only cost a correction that matches nothing.
+"""
+from scripts.typeahead import words
+
+MIN_FUZZY = 4          # shorter query words get no corrections
+MIN_PREFIX = 3         # shorter ones (initials, "of") only match whole words
+MAX_CORRECTIONS = 20   # per query word, nearest first
+FULL_CHECKS = 40       # candidates (most shared trigrams first) checked for two edits
+_IN_CHUNK = 500        # terms per IN (...) lookup
+
+# The guard is in WHEN, not INSERT OR IGNORE: the conflict policy of the
+# statement firing the trigger (the upsert's ON CONFLICT ... DO UPDATE) would
+# override the OR IGNORE and fail on a book already queued.
+PENDING_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS search_term_book_au AFTER UPDATE OF title, author ON book
+WHEN NOT EXISTS (SELECT 1 FROM search_term_pending WHERE book_id = new.book_id) BEGIN
+    INSERT INTO search_term_pending(book_id) VALUES (new.book_id);
+END
+"""
+
+
+def max_edits(word):
+    """Edits allowed for a query word of this length."""
+    if len(word) < MIN_FUZZY:
+        return 0
+    return 1 if len(word) < 7 else 2
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _one_edit(a, b):
+    """True if one insertion, deletion, substitution or swap turns `a` into `b`."""
+    if len(a) < len(b):
+        a, b = b, a
+    i = 0
+    while i < len(b) and a[i] == b[i]:
+        i += 1
+    if len(a) != len(b):
+        return len(a) == len(b) + 1 and a[i + 1:] == b[i:]
+    if i == len(a):
+        return False
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance of `a` and `b`, or limit + 1 if more."""
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    if a == b:
+        return 0
+    # most candidates are judged here: one slip, or not close at all
+    if _one_edit(a, b):
+        return min(1, over)
+    if limit <= 1:
+        return over
+    # only cells within `limit` of the diagonal can stay within `limit`
+    before, previous = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        current[0] = best = i if i <= limit else over
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cb = b[j - 1]
+            cost = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and before[j - 2] + 1 < cost:
+                cost = before[j - 2] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return over
+        before, previous = previous, current
+    return min(previous[-1], over)
+
+
+class FuzzyIndex:
+    def __init__(self, db_manager):
+        self.db = db_manager
+
+    @staticmethod
+    def create_tables(db):
+        db.execute_query("CREATE TABLE IF NOT EXISTS search_term (term TEXT PRIMARY KEY) WITHOUT ROWID")
+        # trigram -> words of each length: a lookup reads only nearby lengths
+        db.execute_query("""
+        CREATE TABLE IF NOT EXISTS search_term_gram (
+            gram TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            term TEXT NOT NULL,
+            PRIMARY KEY (gram, length, term)
+        ) WITHOUT ROWID
+        """)
+        db.execute_query("""
+        CREATE TABLE IF NOT EXISTS search_term_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_book_id INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        db.execute_query("INSERT OR IGNORE INTO search_term_state(id) VALUES (1)")
+        # books added later are found by id; edits are queued here
+        db.execute_query("CREATE TABLE IF NOT EXISTS search_term_pending (book_id INTEGER PRIMARY KEY)")
+        db.execute_query(PENDING_TRIGGER)
+
+    def catch_up(self):
+        """Add the words of new and edited books. Returns the number of books read."""
+        last = self.db.fetch_all("SELECT last_book_id FROM search_term_state")[0][0]
+        stale = self.db.fetch_all(
+            "SELECT EXISTS (SELECT 1 FROM book WHERE book_id > ?) "
+            "OR EXISTS (SELECT 1 FROM search_term_pending)", (last,))[0][0]
+        if not stale:
+            return 0  # the common case: two index probes, no write lock
+        with self.db.transaction(immediate=True):
+            found, books = set(), 0
+            for book_id, title, author in self.db.iter_query("""
+                SELECT book_id, title, author FROM book WHERE book_id > ?
+                UNION ALL
+                SELECT b.book_id, b.title, b.author
+                FROM search_term_pending p JOIN book b ON b.book_id = p.book_id
+                """, (last,), batch_size=10_000):
+                found.update(words(f"{title} {author}"))
+                last = max(last, book_id)
+                books += 1
+            new = sorted(found - self._known(found))
+            self.db.execute_many("INSERT INTO search_term(term) VALUES (?)", [(t,) for t in new])
+            self.db.execute_many("INSERT INTO search_term_gram(gram, length, term) VALUES (?, ?, ?)",
+                                 [(g, len(t), t) for t in new for g in trigrams(t)])
+            self.db.execute_query("DELETE FROM search_term_pending")
+            self.db.execute_query("UPDATE search_term_state SET last_book_id = ?", (last,))
+        return books
+
+    def rebuild(self):
+        """Re-read every book, dropping words no longer used."""
+        with self.db.transaction(immediate=True):
+            for table in ("search_term", "search_term_gram", "search_term_pending"):
+                self.db.execute_query(f"DELETE FROM {table}")
+            self.db.execute_query("UPDATE search_term_state SET last_book_id = 0")
+        return self.catch_up()
+
+    def _known(self, terms):
+        terms, known = list(terms), set()
+        for i in range(0, len(terms), _IN_CHUNK):
+            chunk = terms[i:i + _IN_CHUNK]
+            known.update(row[0] for row in self.db.fetch_all(
+                f"SELECT term FROM search_term WHERE term IN ({','.join('?' * len(chunk))})", chunk))
+        return known
+
+    def corrections(self, word):
+        """{term: edits} for the indexed words within max_edits(word) of `word`."""
+        limit = max_edits(word)
+        grams = trigrams(word)
+        # each edit changes at most three trigrams (four for a swap); asking
+        # for half of them keeps the candidate list short and still finds
+        # the usual one- or two-letter slips
+        rows = self.db.fetch_all(f"""
+            SELECT term, COUNT(*) FROM search_term_gram
+            WHERE gram IN ({','.join('?' * len(grams))}) AND length BETWEEN ? AND ?
+            GROUP BY term HAVING COUNT(*) >= ?
+            ORDER BY COUNT(*) DESC
+            """, (*grams, len(word) - limit, len(word) + limit, max(1, (len(grams) + 1) // 2 - 1)))
+        near = []
+        for i, (term, shared) in enumerate(rows):
+            # a single slip is cheap to spot; two edits need the full table
+            edits = edit_distance(word, term, limit if i < FULL_CHECKS else min(limit, 1))
+            if edits <= limit:
+                near.append((edits, -shared, term))
+        near.sort()
+        return {term: edits for edits, _, term in near[:MAX_CORRECTIONS]}
+
+    @staticmethod
+    def as_typed(text):
+        """expand() without corrections: the query words as prefixes."""
+        return [(word, {}) for word in dict.fromkeys(words(text))]
+
+    def expand(self, text):
+        """
+        [(query word, {term: edits})] for `text`. Every query word also
+        matches as a prefix, as in keyword search, unless it is shorter than
+        MIN_PREFIX: "d"* would read the postings of every word starting with
+        d. Words shorter than MIN_FUZZY get no corrections. Read-only.
+        """
+        return [(word, self.corrections(word) if len(word) >= MIN_FUZZY else {})
+                for word, _ in self.as_typed(text)]
+
+    @staticmethod
+    def match(expanded, max_edit):
+        """FTS5 query for books with every query word within `max_edit` edits."""
+        groups = []
+        for word, terms in expanded:
+            near = [f'"{word}"*' if len(word) >= MIN_PREFIX else f'"{word}"']
+            near += [f'"{term}"' for term, edits in terms.items()
+                     if edits <= max_edit and not term.startswith(word)]
+            groups.append(near[0] if len(near) == 1 else f"({' OR '.join(near)})")
+        return "{title author} : (" + " AND ".join(groups) + ")"
+
+    @staticmethod
+    def edits(expanded, text):
+        """Total edits between the query and a book's title/author `text`."""
+        have = words(text)
+        total = 0
+        for word, terms in expanded:
+            if not any(w == word or len(word) >= MIN_PREFIX and w.startswith(word) for w in have):
+                total += min((terms[w] for w in have if w in terms), default=max_edits(word) + 1)
+        return total
@@ -0,0 +1,204 @@
+"""
+Parallel CSV ingestion: worker processes parse, one thread writes.
+
+The file is split into byte ranges on line boundaries. Each range is decoded,
+parsed and normalized in a worker process by `parse_row(row_dict) -> tuple`
+(raise ValueError/TypeError/KeyError to reject a row). Results come back in
+file order and go through a bounded queue to a single writer thread, which
+inserts them with executemany in large transactions, so SQLite only ever
+sees one writer and the outcome matches a serial import of the same file.
+
+Splitting assumes no record contains an embedded newline. With one worker
+the file goes through a single csv reader instead, so quoted multi-line
+fields are safe there; the menu and the CLI import with one by default.
+"""
+import csv
+import io
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+REJECTED_ERRORS = (ValueError, TypeError, KeyError, AttributeError, IndexError)
+
+
+def byte_ranges(path, data_start, parts, min_chunk=1 << 20):
+    """
+    Split path[data_start:] into byte ranges that each start right after a
+    newline, so no record (or UTF-8 sequence) straddles two ranges.
+    Assumes records contain no embedded newlines, as in books.csv.
+    """
+    size = os.path.getsize(path)
+    step = max(min_chunk, (size - data_start) // max(1, parts))
+    ranges = []
+    with open(path, "rb") as f:
+        start = data_start
+        while start < size:
+            f.seek(min(size, start + step))
+            f.readline()
+            end = min(size, f.tell())
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def read_header(path, encoding, delimiter):
+    """(fieldnames, offset of the first data byte)."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+    fieldnames = next(csv.reader([header.decode(encoding, errors="replace")], delimiter=delimiter), [])
+    return fieldnames, data_start
+
+
+def _parse_range(args):
+    path, start, end, encoding, delimiter, fieldnames, parse_row = args
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode(encoding, errors="replace")
+    reader = csv.DictReader(io.StringIO(data, newline=""), fieldnames=fieldnames, delimiter=delimiter)
+    rows, total = [], 0
+    for row in reader:
+        total += 1
+        try:
+            rows.append(parse_row(row))
+        except REJECTED_ERRORS:
+            pass
+    return rows, total
+
+
+def _parse_stream(path, encoding, delimiter, parse_row, chunk_rows):
+    # one csv reader over the whole file: quoted fields may span lines
+    with open(path, encoding=encoding, errors="replace", newline="") as f:
+        rows, total = [], 0
+        for row in csv.DictReader(f, delimiter=delimiter):
+            total += 1
+            try:
+                rows.append(parse_row(row))
+            except REJECTED_ERRORS:
+                pass
+            if total == chunk_rows:
+                yield rows, total
+                rows, total = [], 0
+        if total:
+            yield rows, total
+
+
+class _Writer(threading.Thread):
+    """Drains parsed chunks from the queue into the DB, batch_rows per transaction."""
+
+    def __init__(self, db, insert_query, chunks, batch_rows, prepare_batch, progress_every, label):
+        super().__init__(name="ingest-writer", daemon=True)
+        self.db = db
+        self.insert_query = insert_query
+        self.chunks = chunks
+        self.batch_rows = batch_rows
+        self.prepare_batch = prepare_batch
+        self.progress_every = progress_every
+        self.label = label
+        self.inserted = 0
+        self.written = 0
+        self.error = None
+        self.started = time.perf_counter()
+
+    def _flush(self, batch):
+        with self.db.transaction():
+            if self.prepare_batch:
+                batch = self.prepare_batch(batch)
+            self.inserted += self.db.execute_many(self.insert_query, batch)
+        before, self.written = self.written, self.written + len(batch)
+        if self.progress_every and before // self.progress_every != self.written // self.progress_every:
+            rate = self.written / (time.perf_counter() - self.started)
+            print(f"Processed {self.written} {self.label}... ({rate:.0f} rows/sec)")
+
+    def run(self):
+        # hold one pooled connection for the whole import
+        with self.db.checkout():
+            self._drain()
+
+    def _drain(self):
+        batch = []
+        while True:
+            rows = self.chunks.get()
+            if rows is None:
+                break
+            if self.error is not None:
+                continue  # keep draining so the producer never blocks
+            batch.extend(rows)
+            try:
+                if len(batch) >= self.batch_rows:
+                    self._flush(batch)
+                    batch = []
+            except Exception as e:
+                self.error = e
+        if batch and self.error is None:
+            try:
+                self._flush(batch)
+            except Exception as e:
+                self.error = e
+
+
+def ingest_csv(db, path, parse_row, insert_query, workers=None, encoding="utf-8", delimiter=",",
+               prepare_batch=None, batch_rows=20_000, queue_chunks=8, progress_every=100_000,
+               label="rows"):
+    """
+    Import `path` into the database with `workers` parser processes (1 =
+    parse inline with one csv reader) and a single writer thread.
+
+    `parse_row` must be a module-level function (it is sent to the worker
+    processes). `prepare_batch(rows) -> rows`, if given, runs on the writer
+    thread inside each transaction, for lookups that need the database.
+    At most `queue_chunks` parsed chunks wait for the writer; beyond that the
+    parsers are held back. Returns a dict with rows, inserted, rejected,
+    seconds and rows_per_sec; raises whatever the writer raised.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    chunks = queue.Queue(maxsize=queue_chunks)
+    writer = _Writer(db, insert_query, chunks, batch_rows, prepare_batch, progress_every, label)
+    stats = {"rows": 0, "inserted": 0, "rejected": 0}
+    started = time.perf_counter()
+    writer.start()
+    try:
+        if workers <= 1:
+            for rows, total in _parse_stream(path, encoding, delimiter, parse_row, batch_rows):
+                stats["rows"] += total
+                stats["rejected"] += total - len(rows)
+                chunks.put(rows)  # blocks while the writer is queue_chunks behind
+                if writer.error is not None:
+                    break
+        else:
+            from concurrent.futures import ProcessPoolExecutor  # heavy; only parallel runs need it
+            fieldnames, data_start = read_header(path, encoding, delimiter)
+            # a few ranges per worker keeps the pool busy when chunks are uneven
+            ranges = byte_ranges(path, data_start, workers * 4, min_chunk=1 << 18)
+            tasks = [(path, start, end, encoding, delimiter, fieldnames, parse_row) for start, end in ranges]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                tasks = iter(tasks)
+                for task in tasks:
+                    pending.append(pool.submit(_parse_range, task))
+                    if len(pending) >= workers + queue_chunks:
+                        break
+                # consume in submission order, topping the window up as we go
+                while pending and writer.error is None:
+                    rows, total = pending.popleft().result()
+                    stats["rows"] += total
+                    stats["rejected"] += total - len(rows)
+                    chunks.put(rows)
+                    task = next(tasks, None)
+                    if task is not None:
+                        pending.append(pool.submit(_parse_range, task))
+                for future in pending:
+                    future.cancel()
+    finally:
+        chunks.put(None)
+        writer.join()
+    if writer.error is not None:
+        raise writer.error
+
+    stats["inserted"] = writer.inserted
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return stats
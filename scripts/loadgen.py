@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Load generator for scripts/service.py.
+
+Opens --clients connections, each sending requests back to back, and reports
+requests/sec and latency percentiles per operation.
+
+    python -m scripts.loadgen --port 8765 --clients 16 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+
+SEARCH_TERMS = ["the", "love", "war", "king", "night", "harry", "tolk", "grisham", "star", "house"]
+
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(pct / 100 * (len(sorted_samples) - 1))))]
+
+
+async def client(conn_args, count, mix, latencies, errors, seed):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_unix_connection(conn_args["unix"]) if conn_args["unix"] \
+        else await asyncio.open_connection(conn_args["host"], conn_args["port"])
+    try:
+        for i in range(count):
+            op = rng.choices(list(mix), weights=list(mix.values()))[0]
+            if op == "search_books":
+                args = {"keyword": rng.choice(SEARCH_TERMS)}
+            elif op == "get_books_page":
+                args = {"page_size": 50}
+            elif op == "get_member":
+                args = {"m_id": rng.randint(1, conn_args["members"])}
+            else:  # issue_book
+                args = {"member_id": rng.randint(1, conn_args["members"]),
+                        "book_id": rng.randint(1, conn_args["books"])}
+            start = time.perf_counter()
+            writer.write((json.dumps({"id": i, "op": op, "args": args}) + "\n").encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies[op].append((time.perf_counter() - start) * 1000)
+            if not response.get("ok"):
+                errors[op] += 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    mix = {"search_books": args.search, "get_books_page": args.page,
+           "get_member": args.member, "issue_book": args.issue}
+    mix = {op: w for op, w in mix.items() if w > 0}
+    conn_args = {"host": args.host, "port": args.port, "unix": args.unix,
+                 "members": args.members, "books": args.books}
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    per_client = max(1, args.requests // args.clients)
+    start = time.perf_counter()
+    await asyncio.gather(*(client(conn_args, per_client, mix, latencies, errors, seed)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"{total} requests from {args.clients} clients in {elapsed:.2f}s: {total / elapsed:,.0f} req/s")
+    print(f"{'op':<16} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    everything = []
+    for op, samples in sorted(latencies.items()):
+        samples.sort()
+        everything.extend(samples)
+        print(f"{op:<16} {len(samples):>7} {percentile(samples, 50):>8.2f} "
+              f"{percentile(samples, 95):>8.2f} {percentile(samples, 99):>8.2f} {errors[op]:>7}")
+    everything.sort()
+    print(f"{'all':<16} {total:>7} {percentile(everything, 50):>8.2f} "
+          f"{percentile(everything, 95):>8.2f} {percentile(everything, 99):>8.2f} {sum(errors.values()):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the library service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--members", type=int, default=1000, help="member_id range to draw from")
+    parser.add_argument("--books", type=int, default=1000, help="book_id range to draw from")
+    parser.add_argument("--search", type=float, default=70, help="weight of search_books")
+    parser.add_argument("--page", type=float, default=15, help="weight of get_books_page")
+    parser.add_argument("--member", type=float, default=10, help="weight of get_member")
+    parser.add_argument("--issue", type=float, default=5, help="weight of issue_book")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
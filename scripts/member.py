@@ -1,8 +1,19 @@
 from datetime import datetime
+from itertools import chain
+from database import record_factory
 
 class Member:
+    __slots__ = ("member_id", "name", "address", "contact_number", "email", "id_proof_type",
+                 "id_proof_number", "membership_date", "active_status")
+    # INSERT column order used by to_params()
+    COLUMNS = ("name", "address", "contact_number", "email", "id_proof_type",
+               "id_proof_number", "membership_date", "active_status")
+    # `SELECT * FROM member` column order
+    TABLE_COLUMNS = ("member_id",) + COLUMNS
+
     def __init__(self, name, address, contact_number, email, id_proof_type, 
-                 id_proof_number, membership_date, active_status="Active"):
+                 id_proof_number, membership_date, active_status="Active", member_id=None):
+        self.member_id = member_id
         self.name = name
         self.address = address
         self.contact_number = contact_number
@@ -12,6 +23,29 @@ class Member:
         self.membership_date = membership_date
         self.active_status = active_status
 
+    @classmethod
+    def from_row(cls, row, columns=TABLE_COLUMNS):
+        """Build a Member from a row whose column names are `columns`."""
+        d = dict(zip(columns, row))
+        return cls(d.get("name"), d.get("address"), d.get("contact_number"), d.get("email"),
+                   d.get("id_proof_type"), d.get("id_proof_number"), d.get("membership_date"),
+                   d.get("active_status"), d.get("member_id"))
+
+    def to_params(self):
+        """Values in COLUMNS order, for INSERT statements."""
+        return (self.name, self.address, self.contact_number, self.email, self.id_proof_type,
+                self.id_proof_number, self.membership_date, self.active_status)
+
+def _member_params(row):
+    # members.csv row -> INSERT params; module level so ingest workers can use it
+    name, phone = row["Name"].strip(), row["Phone"].strip()
+    if not name or not phone:
+        raise ValueError("name and phone are required")
+    return Member(name, (row.get("Address") or "").strip(), phone, (row.get("Email") or "").strip(),
+                  (row.get("ID_Proof_Type") or "").strip(), (row.get("ID_Proof_Number") or "").strip() or None,
+                  (row.get("Membership_Date") or "").strip() or datetime.now().strftime("%Y-%m-%d"),
+                  (row.get("Status") or "").strip() or "Active").to_params()
+
 class MemberManager:
     def __init__(self, db_manager):
         self.db = db_manager
@@ -27,7 +61,8 @@ class MemberManager:
             id_proof_type VARCHAR(20),
             id_proof_number VARCHAR(30) UNIQUE,
             membership_date VARCHAR(20),
-            active_status VARCHAR(10) DEFAULT 'Active'
+            active_status VARCHAR(10) DEFAULT 'Active',
+            updated_at VARCHAR(20) DEFAULT CURRENT_TIMESTAMP
         );
         """
         self.db.execute_query(query)
@@ -38,16 +73,40 @@ class MemberManager:
                            id_proof_number, membership_date, active_status)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """
-        values = (member.name, member.address, member.contact_number, member.email,
-                  member.id_proof_type, member.id_proof_number, member.membership_date,
-                  member.active_status)
         try:
-            self.db.execute_query(query, values)
+            self.db.execute_query(query, member.to_params())
             self.db.commit()
             print(f"Success: Member '{member.name}' registered.")
         except Exception as e:
             print(f"Error registering member: {e}")
 
+    def import_from_csv(self, filename, workers=1):
+        """
+        Bulk import members (Name, Address, Phone, Email, ID_Proof_Type,
+        ID_Proof_Number, Membership_Date, Status) through scripts.ingest.
+        Rows whose ID proof number is already registered are skipped.
+        Returns a dict with the import statistics (None on failure).
+        """
+        insert_query = f"""
+        INSERT OR IGNORE INTO member({", ".join(Member.COLUMNS)})
+        VALUES ({", ".join("?" * len(Member.COLUMNS))})
+        """
+        from scripts.ingest import ingest_csv
+        try:
+            stats = ingest_csv(self.db, filename, _member_params, insert_query,
+                               workers=workers, label="members")
+        except FileNotFoundError:
+            print("Error: CSV file not found.")
+            return None
+        except Exception as e:
+            print(f"Error importing members: {e}")
+            return None
+        stats["duplicates"] = stats["rows"] - stats["rejected"] - stats["inserted"]
+        print(f"Imported {stats['inserted']} members ({stats['duplicates']} already registered, "
+              f"{stats['rejected']} rejected) in {stats['seconds']:.2f}s "
+              f"({stats['rows_per_sec']:.0f} rows/sec).")
+        return stats
+
     def update_member(self, m_id, name, phone, email, address, status):
         query = """
         UPDATE member 
@@ -64,21 +123,29 @@ class MemberManager:
     def deactivate_member(self, m_id):
         query = "UPDATE member SET active_status='Deactivated' WHERE member_id=?"
         try:
-            self.db.execute_query(query, (m_id,))
+            cur = self.db.execute_query(query, (m_id,))
             self.db.commit()
-            print(f"Member {m_id} has been Deactivated.")
         except Exception as e:
             print(f"Error: {e}")
+            return False
+        if cur.rowcount == 0:
+            print("Member ID not found.")
+            return False
+        print(f"Member {m_id} has been Deactivated.")
+        return True
 
     def get_member_by_id(self, m_id):
         # Helper to fetch current details before updating
-        res = self.db.fetch_all("SELECT * FROM member WHERE member_id=?", (m_id,))
-        return res[0] if res else None
+        # named columns, so the row matches TABLE_COLUMNS whatever the table's order
+        res = self.db.fetch_all(f"SELECT {', '.join(Member.TABLE_COLUMNS)} FROM member WHERE member_id=?",
+                                (m_id,))
+        return Member.from_row(res[0]) if res else None
 
     def show_all_members(self):
-        members = self.db.fetch_all("SELECT * FROM member")
-        
-        if not members:
+        members = self.db.iter_query("SELECT * FROM member", row_factory=record_factory(Member))
+        first = next(members, None)
+
+        if first is None:
             print("No members found.")
             return
 
@@ -89,15 +156,12 @@ class MemberManager:
         print("-" * 100)
         # print(f"\n{'='*100}\n{'ID':<5} {'Name':<20} {'Phone':<15} {'Email':<25} {'ID Proof':<15} {'Status':<10}\n{'-'*100}")
 
-        for m in members:
-            # m = (id, name, address, phone, email, id_type, id_num, date, status)
-            m_id, name, _, phone, email, _, id_num, _, status = m
-            
+        for m in chain((first,), members):
             # Clean data
-            name = str(name).strip()[:18]
-            phone = str(phone).strip()[:14]
-            email = str(email).strip()[:24]
-            id_num = str(id_num).strip()[:14]
+            name = str(m.name).strip()[:18]
+            phone = str(m.contact_number).strip()[:14]
+            email = str(m.email).strip()[:24]
+            id_num = str(m.id_proof_number).strip()[:14]
             
-            print(header_fmt.format(m_id, name, phone, email, id_num, status))
+            print(header_fmt.format(m.member_id, name, phone, email, id_num, m.active_status))
         print("="*100 + "\n")
\ No newline at end of file
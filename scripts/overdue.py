@@ -0,0 +1,186 @@
+from datetime import datetime
+from itertools import chain
+from scripts import borrow
+
+class OverdueManager:
+    """
+    Set-based overdue / fine engine.
+
+    Fines are computed in SQL over open loans only (the partial index on
+    borrow_status = 'Issued' keeps that independent of loan history) and
+    materialized per member and per book. A loan is overdue once it is more
+    than `grace_days` past its due date; the fine accrues for the days after
+    the grace period.
+    """
+    # days past due minus grace, times rate; params: as_of, grace_days, fine_per_day
+    FINE_SQL = "SUM((julianday(?) - julianday(due_date) - ?) * ?)"
+
+    def __init__(self, db_manager, fine_per_day=None, grace_days=None):
+        self.db = db_manager
+        # by default the policy return_book charges (scripts.borrow)
+        self.fine_per_day = borrow.FINE_PER_DAY if fine_per_day is None else fine_per_day
+        self.grace_days = borrow.GRACE_DAYS if grace_days is None else grace_days
+
+    def create_tables(self):
+        query_member = """
+        CREATE TABLE IF NOT EXISTS overdue_member(
+            member_id INTEGER PRIMARY KEY,
+            overdue_loans INTEGER NOT NULL,
+            fine_due REAL NOT NULL,
+            oldest_due VARCHAR(20)
+        );
+        """
+        self.db.execute_query(query_member)
+
+        query_book = """
+        CREATE TABLE IF NOT EXISTS overdue_book(
+            book_id INTEGER PRIMARY KEY,
+            overdue_loans INTEGER NOT NULL,
+            fine_due REAL NOT NULL
+        );
+        """
+        self.db.execute_query(query_book)
+
+        # single row: the date and rates the summaries were computed for
+        query_state = """
+        CREATE TABLE IF NOT EXISTS overdue_state(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            as_of VARCHAR(20),
+            fine_per_day REAL,
+            grace_days INTEGER
+        );
+        """
+        self.db.execute_query(query_state)
+
+        # members / books whose loans changed since the last refresh, one
+        # row each however often their loans change
+        self.db.execute_query("CREATE TABLE IF NOT EXISTS overdue_dirty_member(member_id INTEGER PRIMARY KEY)")
+        self.db.execute_query("CREATE TABLE IF NOT EXISTS overdue_dirty_book(book_id INTEGER PRIMARY KEY)")
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS overdue_dirty_ai AFTER INSERT ON borrow BEGIN
+            {self._mark_dirty("new")}
+        END;
+        """)
+        self.db.execute_query(f"""
+        CREATE TRIGGER IF NOT EXISTS overdue_dirty_au
+        AFTER UPDATE OF borrow_status, due_date, member_id, book_id ON borrow BEGIN
+            {self._mark_dirty("old")}
+            {self._mark_dirty("new")}
+        END;
+        """)
+
+    @staticmethod
+    def _mark_dirty(row):
+        # trigger statements queueing the member and book of `row` (old/new);
+        # NOT EXISTS rather than OR IGNORE, as in scripts.fuzzy
+        return "\n".join(
+            f"INSERT INTO overdue_dirty_{key[:-3]}({key}) SELECT {row}.{key} "
+            f"WHERE {row}.{key} IS NOT NULL AND NOT EXISTS "
+            f"(SELECT 1 FROM overdue_dirty_{key[:-3]} WHERE {key} = {row}.{key});"
+            for key in ("member_id", "book_id"))
+
+    def _cutoff(self, as_of):
+        # due_date < cutoff  <=>  more than grace_days overdue on as_of
+        res = self.db.fetch_all("SELECT date(?, ?)", (as_of, f"-{int(self.grace_days)} days"))
+        return res[0][0]
+
+    def _summarize(self, as_of, member_ids=None, book_ids=None):
+        cutoff = self._cutoff(as_of)
+        fine_params = (as_of, self.grace_days, self.fine_per_day)
+        for table, key, extra_cols, ids in (
+                ("overdue_member", "member_id", ", MIN(due_date)", member_ids),
+                ("overdue_book", "book_id", "", book_ids)):
+            cols = "overdue_loans, fine_due" + (", oldest_due" if extra_cols else "")
+            # "+key" stops the planner from walking the whole member/book
+            # index for GROUP BY order instead of the open-loan partial index
+            where = "borrow_status = 'Issued' AND due_date < ?"
+            params = [*fine_params, cutoff]
+            if ids is not None:
+                if not ids:
+                    continue
+                marks = ", ".join("?" * len(ids))
+                self.db.execute_query(f"DELETE FROM {table} WHERE {key} IN ({marks})", tuple(ids))
+                where += f" AND {key} IN ({marks})"
+                params.extend(ids)
+            else:
+                self.db.execute_query(f"DELETE FROM {table}")
+            self.db.execute_query(f"""
+                INSERT INTO {table}({key}, {cols})
+                SELECT {key}, COUNT(*), {self.FINE_SQL}{extra_cols}
+                FROM borrow
+                WHERE {where}
+                GROUP BY +{key}
+                """, tuple(params))
+
+    def refresh(self, as_of=None, full=False):
+        """
+        Bring the overdue summaries up to date for `as_of` (default today).
+        If the summaries were already computed for the same day and rates,
+        only members/books whose loans changed since then are recomputed;
+        otherwise every open overdue loan is re-aggregated in one pass.
+        Returns 'full' or 'incremental'.
+        """
+        as_of = as_of or datetime.now().strftime("%Y-%m-%d")
+        with self.db.transaction(immediate=True):
+            state = self.db.fetch_all("SELECT as_of, fine_per_day, grace_days FROM overdue_state WHERE id = 1")
+            current = bool(state) and tuple(state[0]) == (as_of, self.fine_per_day, self.grace_days)
+            if full or not current:
+                self._summarize(as_of)
+                mode = "full"
+            else:
+                members = [r[0] for r in self.db.fetch_all("SELECT member_id FROM overdue_dirty_member")]
+                books = [r[0] for r in self.db.fetch_all("SELECT book_id FROM overdue_dirty_book")]
+                self._summarize(as_of, members, books)
+                mode = "incremental"
+            self.db.execute_query("DELETE FROM overdue_dirty_member")
+            self.db.execute_query("DELETE FROM overdue_dirty_book")
+            self.db.execute_query(
+                "INSERT OR REPLACE INTO overdue_state(id, as_of, fine_per_day, grace_days) VALUES (1, ?, ?, ?)",
+                (as_of, self.fine_per_day, self.grace_days))
+        return mode
+
+    def member_fines(self, member_id):
+        res = self.db.fetch_all(
+            "SELECT overdue_loans, fine_due FROM overdue_member WHERE member_id = ?", (member_id,))
+        return res[0] if res else (0, 0.0)
+
+    def show_overdue_report(self, limit=50):
+        self.refresh()
+        totals = self.db.fetch_all("SELECT COUNT(*), COALESCE(SUM(overdue_loans), 0), "
+                                   "COALESCE(SUM(fine_due), 0) FROM overdue_member")[0]
+        if not totals[0]:
+            print("No overdue loans.")
+            return
+
+        print("\n" + "="*90)
+        print(f"Overdue: {totals[1]} loans, {totals[0]} members, outstanding fines {totals[2]:.2f}")
+        print(f"(rate {self.fine_per_day}/day, grace {self.grace_days} days)")
+        print("-" * 90)
+        header_fmt = "{:<6} {:<25} {:<15} {:>8} {:>12} {:<12}"
+        print(header_fmt.format("ID", "Member Name", "Phone", "Loans", "Fine", "Oldest Due"))
+        print("-" * 90)
+        rows = self.db.iter_query("""
+            SELECT o.member_id, m.name, m.contact_number, o.overdue_loans, o.fine_due, o.oldest_due
+            FROM overdue_member o
+            LEFT JOIN member m ON m.member_id = o.member_id
+            ORDER BY o.fine_due DESC
+            LIMIT ?
+            """, (limit,))
+        for m_id, name, phone, loans, fine, oldest in rows:
+            print(header_fmt.format(m_id, str(name).strip()[:23], str(phone).strip()[:14],
+                                    loans, f"{fine:.2f}", oldest))
+
+        books = self.db.iter_query("""
+            SELECT o.book_id, b.title, o.overdue_loans, o.fine_due
+            FROM overdue_book o
+            LEFT JOIN book b ON b.book_id = o.book_id
+            ORDER BY o.overdue_loans DESC
+            LIMIT 10
+            """)
+        first = next(books, None)
+        if first is not None:
+            print("-" * 90)
+            print("Most overdue titles:")
+            for b_id, title, loans, fine in chain((first,), books):
+                print(f"{b_id:<6} {str(title).strip()[:50]:<52} {loans:>6} {fine:>12.2f}")
+        print("="*90 + "\n")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+asyncio service exposing the library managers over a local socket.
+
+Protocol: newline-delimited JSON. Each request is
+    {"id": 1, "op": "search_books", "args": {"keyword": "tolkien"}}
+and gets one response line
+    {"id": 1, "ok": true, "result": [...]}   or   {"id": 1, "ok": false, "error": "..."}
+Requests on one connection may be pipelined; responses carry the request id.
+
+Reads run in a bounded thread pool; writes go through a single writer queue
+so only one thread ever writes to SQLite. The database must already have its
+schema (run main.py once).
+
+Run from the project root:
+    python -m scripts.service --port 8765
+    python -m scripts.service --unix /tmp/library.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+from scripts.book import BookManager
+from scripts.borrow import BorrowManager
+from scripts.member import Member, MemberManager
+
+def _to_json(obj):
+    # slotted records (Book, Member, ...) go out as objects
+    if hasattr(obj, "__slots__"):
+        return {name: getattr(obj, name) for name in obj.__slots__}
+    return str(obj)
+
+class LibraryService:
+    def __init__(self, db_manager, read_workers=4, write_queue_size=1000):
+        self.db = db_manager
+        self.books = BookManager(db_manager)
+        self.members = MemberManager(db_manager)
+        self.borrows = BorrowManager(db_manager)
+        self.read_workers = read_workers
+        self.write_queue_size = write_queue_size
+        self._reader_pool = None
+        self._writer_pool = None
+        self._write_queue = None
+        self._writer_task = None
+        # op -> (callable, is_write)
+        self.operations = {
+            "search_books": (self.books.find_books, False),
+            "get_books_page": (self.books.get_books_page, False),
+            "get_category_books_page": (self.books.get_category_books_page, False),
+            "list_categories": (self.books.get_all_categories, False),
+            "get_member": (self.members.get_member_by_id, False),
+            "add_category": (self.books.add_category, True),
+            "add_member": (self._add_member, True),
+            "deactivate_member": (self.members.deactivate_member, True),
+            "issue_book": (self.borrows.issue_book, True),
+            "return_book": (self.borrows.return_book, True),
+            "issue_books": (self.borrows.issue_books, True),
+            "return_books": (self.borrows.return_books, True),
+        }
+
+    def _add_member(self, **fields):
+        self.members.add_member(Member(**fields))
+
+    async def start(self):
+        self._reader_pool = ThreadPoolExecutor(self.read_workers, thread_name_prefix="db-read")
+        self._writer_pool = ThreadPoolExecutor(1, thread_name_prefix="db-write")
+        self._write_queue = asyncio.Queue(self.write_queue_size)
+        self._writer_task = asyncio.create_task(self._writer())
+        # books added behind the service's back: index their words for fuzzy
+        # search on the writer, never from a reader
+        self._write_queue.put_nowait((self.books.sync_search_terms, {},
+                                      asyncio.get_running_loop().create_future()))
+
+    async def stop(self):
+        if self._writer_task:
+            self._writer_task.cancel()
+        self._reader_pool.shutdown(wait=True)
+        self._writer_pool.shutdown(wait=True)
+
+    async def _writer(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            fn, kwargs, future = await self._write_queue.get()
+            try:
+                result = await loop.run_in_executor(self._writer_pool, lambda: fn(**kwargs))
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._write_queue.task_done()
+
+    async def call(self, op, args=None):
+        if op not in self.operations:
+            raise ValueError(f"Unknown operation: {op}")
+        fn, is_write = self.operations[op]
+        args = args or {}
+        if is_write:
+            future = asyncio.get_running_loop().create_future()
+            await self._write_queue.put((fn, args, future))  # blocks when the queue is full
+            return await future
+        return await asyncio.get_running_loop().run_in_executor(self._reader_pool, lambda: fn(**args))
+
+    async def _handle_request(self, line, writer, write_lock):
+        req_id = None
+        try:
+            request = json.loads(line)
+            req_id = request.get("id")
+            result = await self.call(request["op"], request.get("args"))
+            response = {"id": req_id, "ok": True, "result": result}
+        except Exception as e:
+            response = {"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+        data = (json.dumps(response, default=_to_json) + "\n").encode()
+        async with write_lock:
+            writer.write(data)
+            await writer.drain()
+
+    async def handle_client(self, reader, writer):
+        write_lock = asyncio.Lock()
+        pending = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.create_task(self._handle_request(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+
+async def serve(db_name="library.db", host="127.0.0.1", port=8765, unix_path=None, read_workers=4):
+    # one pooled connection per reader thread, the writer, and the main thread
+    db = DatabaseManager(db_name, pool_size=read_workers + 2)
+    db.connect()
+    service = LibraryService(db, read_workers=read_workers)
+    await service.start()
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_client, path=unix_path)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(service.handle_client, host, port)
+        where = f"{host}:{port}"
+    print(f"Library service listening on {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Library JSON-over-socket service.")
+    parser.add_argument("--db", default="library.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on a Unix socket path instead of TCP")
+    parser.add_argument("--read-workers", type=int, default=4)
+    parser.add_argument("--verbose", action="store_true",
+                        help="keep the managers' console messages on stdout")
+    args = parser.parse_args()
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.unix, args.read_workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
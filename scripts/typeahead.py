@@ -0,0 +1,338 @@
+"""
+In-process typeahead over book titles and authors.
+
+Every book gets a rank: its position when the catalog is ordered by
+popularity (loans in stats_book, most first, then book_id). Titles and
+authors are split into normalized words (lower case, accents stripped), and
+each word keeps an array of the ranks of the books containing it, in
+ascending order. The words are held in one sorted list, so a prefix is a
+bisect range and the best matches are the smallest ranks in that range.
+
+A short prefix like "a" covers thousands of words. For any prefix whose
+range has more than FANOUT words, the best HEAD ranks (and the number of
+postings) are precomputed from its children, so a one-word lookup merges at
+most FANOUT short lists. Several words are answered by walking the word with
+the fewest postings in rank order, head first, and checking the others per
+candidate against the book's text, or, when that looks cheaper, by
+intersecting the words' postings a window of ranks at a time, best ranks
+first, widening the window until k books are found.
+
+New books get the next rank (0 loans, highest id: they really are last),
+so adds only append. A changed title keeps its rank and moves between
+postings. Popularity itself is a snapshot: rebuild() to re-rank after a lot
+of circulation.
+"""
+import heapq
+import re
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from itertools import chain
+
+HEAD = 256     # best ranks precomputed per crowded prefix
+FANOUT = 64    # prefixes covering more words than this get a precomputed head
+_WORD = re.compile(r"\w+")
+_LAST = "\U0010ffff"
+_SEP = "\x1f"  # between title and author in the text buffer
+
+
+def normalize(text):
+    text = text.lower()
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text
+
+
+def words(text):
+    return _WORD.findall(normalize(text))
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._book_ids = array("i")   # rank -> book_id
+        self._loans = array("i")      # rank -> loans when ranked
+        # "title<US>author" per rank, UTF-8, in one buffer: a million small
+        # strings would cost ~50 bytes each and a full GC pass would walk them all
+        self._text = bytearray()
+        self._start = array("I")      # rank -> offset of its text
+        self._end = array("I")
+        self._rank_of = array("i")    # book_id -> rank, -1 if not indexed
+        self._postings = {}           # word -> array of ranks, ascending
+        self._words = []              # sorted words, for prefix ranges
+        self._top = {}                # crowded prefix -> array of up to HEAD best ranks
+        self._count = {}              # crowded prefix -> postings under it
+        self.max_book_id = 0
+        self.build_seconds = 0.0
+
+    @classmethod
+    def build(cls, db):
+        """Index every book in `db`, most borrowed first."""
+        index = cls()
+        index.rebuild(db)
+        return index
+
+    def rebuild(self, db):
+        started = time.perf_counter()
+        self.__init__()
+        if db.fetch_all("SELECT 1 FROM sqlite_master WHERE name = 'stats_book'"):
+            query = """
+            SELECT b.book_id, b.title, b.author, COALESCE(s.loans, 0) AS loans
+            FROM book b LEFT JOIN stats_book s ON s.book_id = b.book_id
+            ORDER BY loans DESC, b.book_id
+            """
+        else:
+            query = "SELECT book_id, title, author, 0 FROM book ORDER BY book_id"
+        postings = self._postings
+        for book_id, title, author, loans in db.iter_query(query, batch_size=10_000):
+            rank = self._append(book_id, title, author, loans)
+            for word in set(words(f"{title} {author}")):
+                p = postings.get(word)
+                if p is None:
+                    p = postings[word] = array("i")
+                p.append(rank)
+        self._words = sorted(postings)
+        self._crowded("", 0, len(self._words))  # precomputes every crowded prefix
+        self.build_seconds = time.perf_counter() - started
+
+    def _append(self, book_id, title, author, loans):
+        rank = len(self._book_ids)
+        self._book_ids.append(book_id)
+        self._loans.append(loans)
+        self._start.append(0)
+        self._end.append(0)
+        self._set_text(rank, title, author)
+        if book_id >= len(self._rank_of):
+            self._rank_of.extend([-1] * (book_id + 1 - len(self._rank_of)))
+        self._rank_of[book_id] = rank
+        self.max_book_id = max(self.max_book_id, book_id)
+        return rank
+
+    def _set_text(self, rank, title, author):
+        start = len(self._text)
+        title, author = (title or "").replace(_SEP, " "), (author or "").replace(_SEP, " ")
+        self._text += f"{title}{_SEP}{author}".encode()
+        self._start[rank], self._end[rank] = start, len(self._text)
+
+    def _record(self, rank):
+        """(title, author) of `rank`."""
+        title, _, author = self._text[self._start[rank]:self._end[rank]].decode().partition(_SEP)
+        return title, author
+
+    def __len__(self):
+        return len(self._book_ids)
+
+    # -- updates --------------------------------------------------------------
+
+    def add(self, book_id, title, author, loans=0):
+        """Index a new book as the least popular, or re-index a changed one in place."""
+        title, author = title or "", author or ""
+        if book_id < len(self._rank_of) and self._rank_of[book_id] >= 0:
+            self._update(self._rank_of[book_id], title, author)
+            return
+        rank = self._append(book_id, title, author, loans)
+        for word in set(words(f"{title} {author}")):
+            p = self._postings.get(word)
+            if p is None:
+                p = self._postings[word] = array("i")
+                insort(self._words, word)
+            p.append(rank)
+            # the new rank is the largest, so it only joins lists not yet full
+            for i in range(len(word) + 1):
+                top = self._top.get(word[:i])
+                if top is not None:
+                    self._count[word[:i]] += 1
+                    if len(top) < HEAD and (not top or top[-1] != rank):
+                        top.append(rank)
+
+    def _update(self, rank, title, author):
+        old_title, old_author = self._record(rank)
+        if (old_title, old_author) == (title, author):
+            return
+        old = set(words(f"{old_title} {old_author}"))
+        new = set(words(f"{title} {author}"))
+        self._set_text(rank, title, author)  # the old text stays until rebuild()
+        for word in old - new:
+            p = self._postings[word]
+            del p[bisect_left(p, rank)]
+            if not p:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+        for word in new - old:
+            p = self._postings.get(word)
+            if p is None:
+                p = self._postings[word] = array("i")
+                insort(self._words, word)
+            insort(p, rank)
+        for word in old ^ new:
+            for i in range(len(word) + 1):
+                self._top.pop(word[:i], None)  # recomputed on the next lookup
+                self._count.pop(word[:i], None)
+
+    def catch_up(self, db, since=None):
+        """
+        Add books inserted since the index was built or last caught up, and
+        re-index those changed at or after `since` (an updated_at timestamp).
+        Returns the number of books (re)indexed.
+        """
+        rows = db.fetch_all("SELECT book_id, title, author FROM book WHERE book_id > ? ORDER BY book_id",
+                            (self.max_book_id,))
+        if since is not None:
+            rows = db.fetch_all("SELECT book_id, title, author FROM book "
+                                "WHERE updated_at >= ? AND book_id <= ? ORDER BY book_id",
+                                (since, self.max_book_id)) + rows
+        if len(rows) > max(10_000, len(self) // 4):
+            self.rebuild(db)  # cheaper than that many sorted inserts
+            return len(rows)
+        for book_id, title, author in rows:
+            self.add(book_id, title, author)
+        return len(rows)
+
+    # -- lookups --------------------------------------------------------------
+
+    def _span(self, prefix):
+        lo = bisect_left(self._words, prefix)
+        return lo, bisect_left(self._words, prefix + _LAST, lo)
+
+    def _crowded(self, prefix, lo, hi):
+        """(best HEAD ranks, postings) for the words in _words[lo:hi]."""
+        top = self._top.get(prefix)
+        if top is not None:
+            return top, self._count[prefix]
+        ranks, count = set(), 0
+        if hi - lo <= FANOUT:
+            for word in self._words[lo:hi]:
+                p = self._postings[word]
+                ranks.update(p[:HEAD])
+                count += len(p)
+            return array("i", sorted(ranks)[:HEAD]), count
+        i, n = lo, len(prefix)
+        if self._words[i] == prefix:
+            p = self._postings[prefix]
+            ranks.update(p[:HEAD])
+            count += len(p)
+            i += 1
+        while i < hi:
+            child = self._words[i][:n + 1]
+            j = bisect_left(self._words, child + _LAST, i, hi)
+            child_top, child_count = self._crowded(child, i, j)
+            ranks.update(child_top)
+            count += child_count
+            i = j
+        top = self._top[prefix] = array("i", sorted(ranks)[:HEAD])
+        self._count[prefix] = count
+        return top, count
+
+    def _postings_in(self, prefix, lo, hi):
+        if hi - lo > FANOUT:
+            return self._crowded(prefix, lo, hi)[1]
+        return sum(len(self._postings[w]) for w in self._words[lo:hi])
+
+    def _intersect(self, spans, k, stop):
+        """
+        Ranks, ascending, of the books with a word in every span: first those
+        below `stop`, then doubling windows until there are `k`.
+        """
+        found, start = [], 0
+        while len(found) < k and start < len(self):
+            ranks = None
+            for _, _, lo, hi in spans:
+                window = chain.from_iterable(
+                    p[bisect_left(p, start):bisect_left(p, stop)]
+                    for p in map(self._postings.__getitem__, self._words[lo:hi]))
+                ranks = set(window) if ranks is None else ranks.intersection(window)
+                if not ranks:
+                    break
+            found.extend(sorted(ranks))
+            start, stop = stop, 2 * stop
+        return found
+
+    def _ranks(self, prefix, lo, hi, count):
+        """
+        Every rank in _words[lo:hi], ascending, the head first. A book with
+        two words in the range comes twice in a row.
+        """
+        if hi - lo <= FANOUT:
+            yield from heapq.merge(*(self._postings[w] for w in self._words[lo:hi]))
+            return
+        head = self._crowded(prefix, lo, hi)[0]
+        yield from head
+        if len(head) == count or not head:
+            return
+        # past the head: merge everything (only for rare combinations)
+        for rank in heapq.merge(*(self._postings[w] for w in self._words[lo:hi])):
+            if rank > head[-1]:
+                yield rank
+
+    def suggest(self, text, k=10):
+        """
+        Up to `k` (book_id, title, author, loans) for books where every word
+        of `text` starts a word of the title or author, most borrowed first.
+        """
+        query = set(words(text))
+        # a word that starts another query word adds nothing
+        query = [w for w in query if not any(o != w and o.startswith(w) for o in query)]
+        if not query or k <= 0:
+            return []
+        spans = []
+        for word in query:
+            lo, hi = self._span(word)
+            if lo == hi:
+                return []
+            spans.append((self._postings_in(word, lo, hi), word, lo, hi))
+        # walk the rarest word in rank order; check the others per candidate
+        spans.sort()
+        count, driver, lo, hi = spans[0]
+        others = spans[1:]
+        # share of the rank order to get through before k matches, if the
+        # other words occur independently of the driver
+        expected = 1.0
+        for other_count, *_ in others:
+            expected *= min(1.0, other_count / max(1, len(self)))
+        share = min(1.0, k / (expected * count))
+        # cost in microseconds: walking ~3 a candidate; intersecting ~0.07 a
+        # posting inside the window plus ~0.5 a word to bisect its postings
+        walk_cost = 3 * share * count
+        intersect_cost = sum(0.07 * share * c + 0.5 * (h - l) for c, _, l, h in spans)
+        if others and intersect_cost < walk_cost:
+            stop = max(1024, int(2 * share * len(self)))
+            candidates, prefixes = self._intersect(spans, k, stop), []
+        else:
+            candidates, prefixes = self._ranks(driver, lo, hi, count), [w for _, w, _, _ in others]
+
+        results, last = [], -1
+        for rank in candidates:
+            if rank == last:
+                continue
+            last = rank
+            title, author = self._record(rank)
+            if prefixes:
+                text = f"{title} {author}".lower()
+                # a plain substring test rules out most candidates cheaply
+                if text.isascii() and not all(p in text for p in prefixes):
+                    continue
+                have = words(text)
+                if not all(any(w.startswith(p) for w in have) for p in prefixes):
+                    continue
+            results.append((self._book_ids[rank], title, author, self._loans[rank]))
+            if len(results) == k:
+                break
+        return results
+
+    def memory_bytes(self):
+        """Approximate memory held by the index, by part."""
+        size = sys.getsizeof
+        postings = size(self._postings) + sum(size(w) + size(p) for w, p in self._postings.items())
+        books = (size(self._book_ids) + size(self._loans) + size(self._rank_of)
+                 + size(self._text) + size(self._start) + size(self._end))
+        top = (size(self._top) + size(self._count)
+               + sum(size(p) + size(t) for p, t in self._top.items()))
+        parts = {"words": size(self._words) + postings, "books": books, "top": top}
+        parts["total"] = sum(parts.values())
+        return parts
+
+    def stats(self):
+        return {"books": len(self), "words": len(self._words), "crowded_prefixes": len(self._top),
+                "build_seconds": self.build_seconds,
+                "memory_mib": self.memory_bytes()["total"] / (1 << 20)}